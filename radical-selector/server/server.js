@@ -6,6 +6,8 @@ const yaml = require('js-yaml');
 
 const app = express();
 const PORT = 3001;
+// Python generation service (scripts/img/generation_service.py) keeping the diffusion model loaded
+const GENERATION_SERVICE_URL = process.env.GENERATION_SERVICE_URL || 'http://127.0.0.1:3002';
 
 app.use(cors());
 app.use(express.json());
@@ -63,6 +65,56 @@ app.get('/api/radicals', async (req, res) => {
   }
 });
 
+// Per-folder manifests written by scripts/img/build_thumbnails.py and score tables written by
+// scripts/img/score_candidates.py, re-checked at most every few seconds
+const MANIFEST_TTL_MS = 5000;
+let imageIndex = { loadedAt: 0, folders: [], manifests: new Map(), scores: new Map() };
+
+async function loadImageIndex() {
+  if (Date.now() - imageIndex.loadedAt < MANIFEST_TTL_MS) {
+    return imageIndex;
+  }
+  
+  const radicalsPath = path.join(__dirname, '../../_data/assets/img/radical');
+  const entries = await fs.readdir(radicalsPath, { withFileTypes: true });
+  const folders = entries
+    .filter(entry => entry.isDirectory() && entry.name.startsWith('generated-'))
+    .map(entry => entry.name)
+    .sort();
+  
+  const manifests = new Map();
+  const scores = new Map();
+  for (const folder of folders) {
+    const manifestPath = path.join(radicalsPath, folder, 'selector_manifest.json');
+    try {
+      const { mtimeMs } = await fs.stat(manifestPath);
+      const cached = imageIndex.manifests.get(folder);
+      manifests.set(folder, cached && cached.mtimeMs === mtimeMs
+        ? cached
+        : { mtimeMs, radicals: (await fs.readJson(manifestPath)).radicals });
+    } catch {
+      // No manifest yet (build_thumbnails.py not run): the folder is checked file by file
+    }
+    
+    const scoresPath = path.join(radicalsPath, folder, 'candidate_scores.json');
+    try {
+      const { mtimeMs } = await fs.stat(scoresPath);
+      const cached = imageIndex.scores.get(folder);
+      if (cached && cached.mtimeMs === mtimeMs) {
+        scores.set(folder, cached);
+      } else {
+        const { candidates } = await fs.readJson(scoresPath);
+        scores.set(folder, { mtimeMs, byFilename: new Map(candidates.map(entry => [entry.filename, entry])) });
+      }
+    } catch {
+      // Not scored yet: candidates are listed without a score
+    }
+  }
+  
+  imageIndex = { loadedAt: Date.now(), folders, manifests, scores };
+  return imageIndex;
+}
+
 // Get images for a specific radical number
 app.get('/api/images/:radicalNumber', async (req, res) => {
   try {
@@ -70,24 +122,76 @@ app.get('/api/images/:radicalNumber', async (req, res) => {
     const radicalFileName = `radical_${radicalNumber.toString().padStart(3, '0')}.png`;
     
     const radicalsPath = path.join(__dirname, '../../_data/assets/img/radical');
-    const entries = await fs.readdir(radicalsPath, { withFileTypes: true });
+    const { folders, manifests, scores } = await loadImageIndex();
     
     const images = [];
     
-    for (const entry of entries) {
-      if (entry.isDirectory() && entry.name.startsWith('generated-')) {
-        const imagePath = path.join(radicalsPath, entry.name, radicalFileName);
-        
-        if (await fs.pathExists(imagePath)) {
+    for (const folder of folders) {
+      const manifest = manifests.get(folder);
+      
+      if (manifest) {
+        const entry = manifest.radicals[radicalNumber];
+        if (entry) {
           images.push({
-            folder: entry.name,
-            filename: radicalFileName,
-            url: `/images/${entry.name}/${radicalFileName}`
+            folder,
+            filename: entry.filename,
+            url: `/images/${folder}/${entry.filename}`,
+            thumbnailUrl: `/images/${folder}/${entry.thumbnail}`,
+            width: entry.width,
+            height: entry.height,
+            bytes: entry.bytes,
+            seed: entry.seed,
+            sha256: entry.sha256
           });
         }
+      } else if (await fs.pathExists(path.join(radicalsPath, folder, radicalFileName))) {
+        images.push({
+          folder,
+          filename: radicalFileName,
+          url: `/images/${folder}/${radicalFileName}`
+        });
       }
     }
     
+    for (const image of images) {
+      const score = scores.get(image.folder)?.byFilename.get(image.filename);
+      if (score) {
+        image.score = score.score;
+        image.flags = score.flags;
+      }
+    }
+    
+    // Ranks are computed here, over every folder listed, so they never go stale when one folder is rescored
+    images.filter(image => image.score !== undefined)
+      .sort((a, b) => b.score - a.score)
+      .forEach((image, index) => { image.scoreRank = index + 1; });
+    
+    // ?sort=score lists the best-scored candidates first, unscored ones last
+    if (req.query.sort === 'score') {
+      images.sort((a, b) => (b.score ?? -1) - (a.score ?? -1));
+    }
+    
+    // ?collapse=1 keeps one candidate per near-duplicate cluster (written by scripts/img/image_index.py)
+    const clustersPath = path.join(radicalsPath, 'perceptual_clusters.json');
+    if (req.query.collapse === '1' && await fs.pathExists(clustersPath)) {
+      const { radicals } = await fs.readJson(clustersPath);
+      const byUrl = new Map(images.map(image => [`/images/${image.folder}/${image.filename}`, image]));
+      const order = new Map(images.map((image, index) => [image, index]));
+      const hidden = new Set();
+      
+      for (const cluster of radicals[radicalNumber] || []) {
+        // Keep the best-scored member, then the first in the listing order
+        const members = cluster.map(key => byUrl.get(`/images/${key}`)).filter(Boolean)
+          .sort((a, b) => (b.score ?? -1) - (a.score ?? -1) || order.get(a) - order.get(b));
+        if (members.length > 1) {
+          members[0].duplicates = members.slice(1).map(image => image.folder);
+          members.slice(1).forEach(image => hidden.add(image));
+        }
+      }
+      
+      return res.json(images.filter(image => !hidden.has(image)));
+    }
+    
     res.json(images);
   } catch (error) {
     console.error('Error reading images:', error);
@@ -112,7 +216,9 @@ app.post('/api/select-image', async (req, res) => {
     
     const destPath = path.join(selectedDir, filename);
     
-    // Copy the file
+    // Copy the file, replacing any previous selection rather than writing into it:
+    // scripts/img/dedup_images.py may have hard-linked it to its generated candidate
+    await fs.remove(destPath);
     await fs.copy(sourcePath, destPath);
     
     res.json({ success: true, message: `Image copied to selected folder` });
@@ -170,6 +276,57 @@ app.get('/api/selected/:radicalNumber', async (req, res) => {
   }
 });
 
+// Ask the generation service to regenerate candidates for a radical
+app.post('/api/regenerate/:radicalNumber', async (req, res) => {
+  try {
+    const radicalNumber = parseInt(req.params.radicalNumber);
+    const { candidates = 4, seeds = [], priority = 0 } = req.body || {};
+    
+    const response = await fetch(`${GENERATION_SERVICE_URL}/jobs`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ radical: radicalNumber, candidates, seeds, priority })
+    });
+    
+    res.status(response.status).json(await response.json());
+  } catch (error) {
+    console.error('Error contacting generation service:', error);
+    res.status(502).json({ error: 'Generation service unavailable' });
+  }
+});
+
+// Get the status and results of a regeneration job
+app.get('/api/regenerate/jobs/:jobId', async (req, res) => {
+  try {
+    const response = await fetch(`${GENERATION_SERVICE_URL}/jobs/${encodeURIComponent(req.params.jobId)}`);
+    res.status(response.status).json(await response.json());
+  } catch (error) {
+    console.error('Error contacting generation service:', error);
+    res.status(502).json({ error: 'Generation service unavailable' });
+  }
+});
+
+// Stream regeneration progress events (JSON lines) until the job finishes
+app.get('/api/regenerate/jobs/:jobId/events', async (req, res) => {
+  try {
+    const response = await fetch(`${GENERATION_SERVICE_URL}/jobs/${encodeURIComponent(req.params.jobId)}/events`);
+    res.status(response.status);
+    res.setHeader('Content-Type', response.headers.get('content-type') || 'application/x-ndjson');
+    
+    for await (const chunk of response.body) {
+      res.write(chunk);
+    }
+    res.end();
+  } catch (error) {
+    console.error('Error streaming generation events:', error);
+    if (!res.headersSent) {
+      res.status(502).json({ error: 'Generation service unavailable' });
+    } else {
+      res.end();
+    }
+  }
+});
+
 app.listen(PORT, () => {
   console.log(`🚀 Server running on http://localhost:${PORT}`);
 });
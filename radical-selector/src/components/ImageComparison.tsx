@@ -50,7 +50,8 @@ const ImageComparison: React.FC<ImageComparisonProps> = ({
           <div key={`${image.folder}-${index}`} className="image-card">
             <div className="image-container">
               <img 
-                src={`http://localhost:3001${image.url}`} 
+                src={`http://localhost:3001${image.thumbnailUrl ?? image.url}`} 
+                loading="lazy"
                 alt={`Radical by ${getModelName(image.folder)}`}
                 className="radical-image"
                 onError={(e) => {
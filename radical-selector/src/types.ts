@@ -15,6 +15,16 @@ export interface ImageInfo {
   folder: string;
   filename: string;
   url: string;
+  thumbnailUrl?: string; // WebP thumbnail from scripts/img/build_thumbnails.py
+  width?: number;
+  height?: number;
+  bytes?: number;
+  seed?: number | null;
+  sha256?: string;
+  duplicates?: string[]; // Folders of near-identical candidates hidden behind this one
+  score?: number; // 0-100 triage score from scripts/img/score_candidates.py
+  scoreRank?: number; // Rank among this radical's candidates, 1 is the best scored
+  flags?: string[]; // blank, uniform, dark, clipped, noisy
 }
 
 export interface SelectedImage {
@@ -10,6 +10,8 @@ import argparse
 from PIL import Image
 import glob
 
+import profiling
+
 def resize_with_center_crop(input_path, output_path, target_size=512):
     """
     Crop the image to a square (center crop) and then resize to target_size x target_size.
@@ -23,6 +25,8 @@ def resize_with_center_crop(input_path, output_path, target_size=512):
             print(f"  Original size: {img.size}")
             
             original_width, original_height = img.size
+            with profiling.stage('load'):
+                img.load()
             
             # Determine the size of the square crop (smallest dimension)
             crop_size = min(original_width, original_height)
@@ -43,8 +47,10 @@ def resize_with_center_crop(input_path, output_path, target_size=512):
             
             print(f"  Final size: {target_size}x{target_size}")
             
-            # Save the final image
-            final_img.save(output_path, 'PNG', optimize=True)
+            # Save the final image (replaced, not written into: the output may be hard-linked by dedup_images.py)
+            with profiling.stage('write'):
+                final_img.save(f"{output_path}.tmp", 'PNG', optimize=True)
+                os.replace(f"{output_path}.tmp", output_path)
             print(f"  ✓ Saved: {output_path}")
             return True
             
@@ -90,6 +96,7 @@ def main():
     parser.add_argument('-s', '--size', type=int, default=512,
                        help='Target size (default: 512)')
     # Removed bg-color since we're doing center crop instead of padding
+    profiling.add_arguments(parser)
     
     args = parser.parse_args()
     
@@ -126,4 +133,4 @@ def main():
     print(f"Results saved in: {os.path.abspath(args.output)}")
 
 if __name__ == "__main__":
-    main()
+    profiling.run(main)
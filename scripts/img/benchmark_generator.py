@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Offline Generator Benchmark
+===========================
+
+Measures M4OptimizedRadicalGenerator throughput without downloading a checkpoint.
+A tiny Stable Diffusion pipeline (UNet, VAE and CLIP text encoder with SD's layout
+but a few channels wide, random weights from a fixed seed, and a byte-level
+tokenizer written on the spot) is saved once to .cache/tiny-pipeline and loaded
+through the generator's normal from_pretrained path.
+
+For every device profile, CPU option and memory strategy the generator is loaded
+and timed on:
+    first_image   load + first _generate_with_validation (time to first image)
+    single        _generate_with_validation, one image per call
+    batch         generate_batch with --batch-size images per call
+    managed       generate_image: save, cleanup, pacing and memory events included
+    recycle       one forced _recycle_pipeline
+
+Reported: steps/s, images/min, peak RSS (and device memory) and time to first image.
+Results use the benchmark_tools.py format, so two runs can be compared with
+`python benchmark_tools.py compare`.
+
+Usage:
+    python benchmark_generator.py
+    python benchmark_generator.py --profiles float32 channels_last --memory-strategies none max-slicing
+    python benchmark_generator.py --devices cpu cuda --images 8 --batch-size 4 -o after.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+from pathlib import Path
+
+# Never reach the Hub: a failed tiny load must not fall back to downloading real checkpoints
+# (read when huggingface_hub is imported, so it is set before diffusers)
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+
+import psutil
+import torch
+import diffusers
+from diffusers import AutoencoderKL, DPMSolverMultistepScheduler, StableDiffusionPipeline, UNet2DConditionModel
+from transformers import CLIPTextConfig, CLIPTextModel, CLIPTokenizer
+from transformers.models.clip.tokenization_clip import bytes_to_unicode
+
+from radical_engine import M4OptimizedRadicalGenerator, PeakMemorySampler
+from radical_config import CPU_BENCHMARK_PROFILES, MEMORY_STRATEGIES, build_prompt, load_all_radicals
+from telemetry import EVENTS_ENV
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+TINY_PIPELINE_DIR = Path('.cache/tiny-pipeline')
+TINY_PIPELINE_VERSION = 1       # Bump when the architecture below changes
+RESULTS_DIR = Path('.cache/benchmarks')
+RESULTS_VERSION = 1
+WEIGHTS_SEED = 0
+
+DEFAULT_STEPS = 4
+DEFAULT_IMAGES = 4
+DEFAULT_BATCH_SIZE = 2
+# Offload cannot be undone on a loaded pipeline and is a no-op on CPU
+DEFAULT_MEMORY_STRATEGIES = [name for name in MEMORY_STRATEGIES if name != 'offload']
+
+# =============================================================================
+# TINY PIPELINE
+# =============================================================================
+
+def build_tokenizer(directory):
+    """CLIP tokenizer over single bytes (no merges), so any prompt encodes without a download."""
+    byte_tokens = list(bytes_to_unicode().values())
+    tokens = ['<|startoftext|>', '<|endoftext|>'] + byte_tokens + [token + '</w>' for token in byte_tokens]
+    with open(directory / 'vocab.json', 'w', encoding='utf-8') as f:
+        json.dump({token: index for index, token in enumerate(tokens)}, f)
+    with open(directory / 'merges.txt', 'w', encoding='utf-8') as f:
+        f.write('#version: 0.2\n')
+    return CLIPTokenizer(str(directory / 'vocab.json'), str(directory / 'merges.txt'), model_max_length=77), len(tokens)
+
+def build_tiny_pipeline(path=TINY_PIPELINE_DIR):
+    """
+    Save a random-weight Stable Diffusion pipeline with SD's structure at a fraction of its width.
+
+    The VAE keeps four blocks (8x downsampling), so the generator's 512x512 parameters
+    give the same 64x64 latents as a real SD1.x model.
+    """
+    marker = path / 'tiny_pipeline_version'
+    if marker.exists() and marker.read_text().strip() == str(TINY_PIPELINE_VERSION):
+        return path
+
+    print(f"🧪 Building tiny random-weight pipeline in {path}...")
+    torch.manual_seed(WEIGHTS_SEED)
+    with tempfile.TemporaryDirectory() as tokenizer_dir:
+        tokenizer, vocab_size = build_tokenizer(Path(tokenizer_dir))
+        text_encoder = CLIPTextModel(CLIPTextConfig(
+            vocab_size=vocab_size, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+            num_attention_heads=4, max_position_embeddings=77, bos_token_id=0, eos_token_id=1, pad_token_id=1))
+        unet = UNet2DConditionModel(
+            sample_size=64, in_channels=4, out_channels=4, layers_per_block=1,
+            block_out_channels=(32, 64),
+            down_block_types=('DownBlock2D', 'CrossAttnDownBlock2D'),
+            up_block_types=('CrossAttnUpBlock2D', 'UpBlock2D'),
+            cross_attention_dim=32, attention_head_dim=8, norm_num_groups=32)
+        vae = AutoencoderKL(
+            in_channels=3, out_channels=3, latent_channels=4, layers_per_block=1, sample_size=512,
+            block_out_channels=(8, 16, 32, 32), norm_num_groups=8,
+            down_block_types=('DownEncoderBlock2D',) * 4, up_block_types=('UpDecoderBlock2D',) * 4)
+        scheduler = DPMSolverMultistepScheduler(beta_start=0.00085, beta_end=0.012, beta_schedule='scaled_linear')
+
+        pipe = StableDiffusionPipeline(vae=vae, text_encoder=text_encoder, tokenizer=tokenizer, unet=unet,
+                                       scheduler=scheduler, safety_checker=None, feature_extractor=None,
+                                       requires_safety_checker=False)
+        pipe.save_pretrained(path, safe_serialization=True)
+    marker.write_text(str(TINY_PIPELINE_VERSION))
+    return path
+
+class BenchmarkGenerator(M4OptimizedRadicalGenerator):
+    """Generator pinned to one device, so each device profile can be measured on the same machine."""
+
+    def __init__(self, device, **kwargs):
+        self.forced_device = device
+        super().__init__(**kwargs)
+
+    def _detect_optimal_device(self):
+        return self.forced_device
+
+# =============================================================================
+# SCENARIOS
+# =============================================================================
+
+def _stats(per_image_seconds, steps):
+    """benchmark_tools.py-style timing entry, per image, with throughput added."""
+    mean = statistics.fmean(per_image_seconds)
+    return {
+        'rounds': len(per_image_seconds),
+        'min': min(per_image_seconds),
+        'median': statistics.median(per_image_seconds),
+        'mean': mean,
+        'stdev': statistics.stdev(per_image_seconds) if len(per_image_seconds) > 1 else 0.0,
+        'images_per_min': round(60 / mean, 2) if mean > 0 else None,
+        'steps_per_s': round(steps / mean, 2) if steps and mean > 0 else None
+    }
+
+def benchmark_config(model_path, device, profile_overrides, memory_strategy, prompts, radicals, steps,
+                     images, batch_size, output_dir):
+    """Load one generator configuration and time every scenario; returns (benchmarks, summary)."""
+    load_start = time.perf_counter()
+    generator = BenchmarkGenerator(
+        device,
+        model_id=str(model_path),
+        output_dir=output_dir,
+        scheduler='dpm++',
+        num_inference_steps=steps,
+        cpu_profile=profile_overrides,
+        memory_strategy=memory_strategy
+    )
+    results = {}
+    read_device = generator._current_memory if device != 'cpu' else lambda: 0
+    try:
+        with PeakMemorySampler(lambda: psutil.Process().memory_info().rss) as rss, \
+                PeakMemorySampler(read_device) as device_memory:
+            if not generator.initialize_pipeline():
+                raise RuntimeError('pipeline failed to load')
+            if generator.device != device:
+                raise RuntimeError(f'fell back to {generator.device}')
+            load_seconds = time.perf_counter() - load_start
+
+            start = time.perf_counter()
+            generator._generate_with_validation(prompts[0], seed=0)
+            first_image = time.perf_counter() - start
+            results['first_image'] = _stats([load_seconds + first_image], None)
+
+            timings, step_ms = [], []
+            for index in range(images):
+                start = time.perf_counter()
+                generator._generate_with_validation(prompts[index % len(prompts)], seed=index + 1)
+                timings.append(time.perf_counter() - start)
+                step_ms.extend(generator.last_step_ms[1:])  # The first step also covers prompt encoding
+            results['single'] = _stats(timings, steps)
+
+            timings = []
+            for start_index in range(0, images, batch_size):
+                batch_prompts = [prompts[(start_index + i) % len(prompts)] for i in range(batch_size)]
+                start = time.perf_counter()
+                generator.generate_batch(batch_prompts, [start_index + i + 1 for i in range(batch_size)])
+                timings.append((time.perf_counter() - start) / batch_size)
+            results['batch'] = _stats(timings, steps)
+
+            timings = []
+            for radical in radicals[:images]:
+                generator._check_memory_growth()
+                start = time.perf_counter()
+                generator.generate_image(radical)
+                timings.append(time.perf_counter() - start)
+            results['managed'] = _stats(timings, steps)
+
+            start = time.perf_counter()
+            generator._recycle_pipeline()
+            results['recycle'] = _stats([time.perf_counter() - start], None)
+    finally:
+        generator.pipe = None
+
+    summary = {
+        'load_seconds': round(load_seconds, 3),
+        'time_to_first_image': round(load_seconds + first_image, 3),
+        'step_ms_p50': round(statistics.median(step_ms), 2) if step_ms else None,
+        'peak_rss_gb': round(rss.peak / 1024**3, 3),
+        'peak_device_gb': round(device_memory.peak / 1024**3, 3) if device != 'cpu' else None,
+        'memory_strategy': generator.active_memory_strategy,
+        'bf16': generator.use_bf16_autocast
+    }
+    return results, summary
+
+def available_devices():
+    devices = ['cpu']
+    if torch.cuda.is_available():
+        devices.append('cuda')
+    if torch.backends.mps.is_available():
+        devices.append('mps')
+    return devices
+
+def benchmark_radicals(count):
+    """Real radicals when r214.yml is reachable, otherwise numbered placeholders."""
+    radicals = load_all_radicals()
+    if len(radicals) < count:
+        radicals = [{'number': number, 'radical': '一', 'meaning': f'radical {number}', 'category': 'Other',
+                     'interpretation': f'radical {number}'} for number in range(1, count + 1)]
+    return radicals[:count]
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    profile_names = [name for name, _ in CPU_BENCHMARK_PROFILES]
+    parser = argparse.ArgumentParser(
+        description='Offline throughput benchmark of the radical generator on a tiny random-weight pipeline',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python benchmark_generator.py -o before.json
+    python benchmark_generator.py --profiles float32 "int8 dynamic" --memory-strategies none
+    python benchmark_tools.py compare before.json after.json
+        """)
+    parser.add_argument('--devices', nargs='+', default=None,
+                        help=f'Devices to benchmark (default: every available one, here {available_devices()})')
+    parser.add_argument('--profiles', nargs='+', choices=profile_names, default=profile_names,
+                        help='CPU profiles (CPU device only; default: all)')
+    parser.add_argument('--memory-strategies', nargs='+', choices=list(MEMORY_STRATEGIES),
+                        default=DEFAULT_MEMORY_STRATEGIES, help='Memory strategies (default: all but offload)')
+    parser.add_argument('--steps', type=int, default=DEFAULT_STEPS,
+                        help=f'Denoising steps per image (default: {DEFAULT_STEPS})')
+    parser.add_argument('--images', type=int, default=DEFAULT_IMAGES,
+                        help=f'Images per scenario (default: {DEFAULT_IMAGES})')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Images per generate_batch call (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--cpu-threads', type=int, default=None, help='Torch threads for CPU profiles')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the tiny pipeline')
+    parser.add_argument('-o', '--output', default=None,
+                        help=f'Results file (default: {RESULTS_DIR}/generator_<time>.json)')
+
+    args = parser.parse_args()
+    random.seed(WEIGHTS_SEED)
+
+    print("Offline Generator Benchmark")
+    print("=" * 70)
+    if args.rebuild:
+        (TINY_PIPELINE_DIR / 'tiny_pipeline_version').unlink(missing_ok=True)
+    model_path = build_tiny_pipeline()
+    radicals = benchmark_radicals(args.images)
+    prompts = [build_prompt(str(model_path), radical) for radical in radicals]
+
+    benchmarks, configs = {}, {}
+    with tempfile.TemporaryDirectory(prefix='generator-bench-') as workdir:
+        # Keep benchmark events out of logs/
+        os.environ[EVENTS_ENV] = str(Path(workdir) / 'events.jsonl')
+        for device in args.devices or available_devices():
+            profiles = [(name, overrides) for name, overrides in CPU_BENCHMARK_PROFILES if name in args.profiles]
+            if device != 'cpu':
+                profiles = [('default', {})]  # CPU profiles only apply to the CPU device
+            for profile_name, overrides in profiles:
+                for strategy in args.memory_strategies:
+                    config = f"{device}/{profile_name}/{strategy}"
+                    print(f"\n⏱️  {config}")
+                    try:
+                        results, summary = benchmark_config(
+                            model_path, device, {**overrides, 'threads': args.cpu_threads}, strategy, prompts,
+                            radicals, args.steps, args.images, args.batch_size,
+                            Path(workdir) / config.replace('/', '_').replace(' ', '-'))
+                    except Exception as e:
+                        print(f"   ❌ {config} failed: {e}")
+                        configs[config] = {'error': str(e)}
+                        continue
+                    configs[config] = summary
+                    for scenario, stats in results.items():
+                        benchmarks[f"{config}.{scenario}"] = stats
+                    print(f"   🚀 first image {summary['time_to_first_image']:.2f}s, "
+                          f"single {results['single']['images_per_min']} img/min "
+                          f"({results['single']['steps_per_s']} steps/s), "
+                          f"batch {results['batch']['images_per_min']} img/min, "
+                          f"managed {results['managed']['images_per_min']} img/min, "
+                          f"peak RSS {summary['peak_rss_gb']:.2f}GB")
+
+    output = {
+        'version': RESULTS_VERSION,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'torch': torch.__version__,
+            'diffusers': diffusers.__version__
+        },
+        'settings': {'steps': args.steps, 'images': args.images, 'batch_size': args.batch_size,
+                     'cpu_threads': args.cpu_threads, 'tiny_pipeline_version': TINY_PIPELINE_VERSION},
+        'configs': configs,
+        'benchmarks': benchmarks
+    }
+    output_file = Path(args.output) if args.output else RESULTS_DIR / f"generator_{int(time.time())}.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2)
+
+    print(f"\n📋 {len(configs)} configurations, results saved to: {output_file}")
+    if not benchmarks:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
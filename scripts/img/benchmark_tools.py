@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Image Tool Benchmarks
+=====================
+
+Times the image-processing and SVG tools on synthetic, deterministic fixtures
+(random-noise and flat-colour PNGs at several sizes, and a synthetic r214 dataset
+that covers every background shape) so performance changes can be judged with
+numbers. Results are saved as JSON; `compare` flags benchmarks that got slower
+than a threshold.
+
+Benchmarked:
+    png.optimize_png_image     one noise / flat PNG per size (512px noise: one cold call)
+    png.process_folder         optimize_png_images.process_folder on the fixture folder
+    resize.resize_with_center_crop
+    resize.process_folder      batch_resize_images.process_folder on the fixture folder
+    svg.pattern.<shape>        PatternGenerator.generate_pattern for every shape type
+    svg.main / svg.main_outline  generate_radical_svgs.main on the synthetic r214
+
+Usage:
+    python benchmark_tools.py run
+    python benchmark_tools.py run --quick --filter svg -o baseline.json
+    python benchmark_tools.py compare baseline.json .cache/benchmarks/bench_1700000000.json --threshold 10
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import platform
+import argparse
+import statistics
+import contextlib
+from pathlib import Path
+
+import numpy as np
+import yaml
+from PIL import Image
+
+import batch_resize_images
+import optimize_png_images
+import generate_radical_svgs
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+RESULTS_DIR = Path('.cache/benchmarks')
+RESULTS_VERSION = 1
+
+FIXTURE_SIZES = [64, 256, 512, 1024]
+QUICK_FIXTURE_SIZES = [64, 256]
+# optimize_png_image tries ~90 quantise/save variants on images of 200k+ pixels;
+# on incompressible noise that takes over a minute at 512px, so those run one round
+# and 1024px noise is skipped for it
+SEARCH_PIXELS = 200000
+OPTIMIZE_NOISE_MAX_SIZE = 512
+FOLDER_SIZE = 256           # Size of the images in the process_folder fixtures
+FOLDER_IMAGES = 8
+SYNTHETIC_RADICALS = 214
+
+DEFAULT_REPEAT = 5
+QUICK_REPEAT = 2
+MIN_ROUND_SECONDS = 0.05    # Fast benchmarks loop until a round lasts this long
+DEFAULT_THRESHOLD = 10.0    # Percent slowdown reported as a regression
+FIXTURE_SEED = 1234
+
+# Every background shape generate_radical_svgs can pick
+SHAPE_TYPES = sorted({shape for _, shape, _ in generate_radical_svgs.MEANING_MAPPINGS.values()}
+                     | {shape for shape, _ in generate_radical_svgs.CATEGORY_MAPPINGS.values()})
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+def make_png_fixtures(directory, sizes):
+    """Write noise_{size}.png and flat_{size}.png (noise is incompressible, flat is trivial)."""
+    rng = np.random.default_rng(FIXTURE_SEED)
+    paths = {}
+    for size in sizes:
+        noise = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+        paths[f'noise_{size}'] = directory / f'noise_{size}.png'
+        Image.fromarray(noise).save(paths[f'noise_{size}'])
+        paths[f'flat_{size}'] = directory / f'flat_{size}.png'
+        Image.new('RGB', (size, size), (65, 105, 225)).save(paths[f'flat_{size}'])
+    return paths
+
+def make_folder_fixture(directory):
+    """A folder of mixed noise/flat images, non-square so the resize path crops."""
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(FIXTURE_SEED + 1)
+    for index in range(FOLDER_IMAGES):
+        shape = (FOLDER_SIZE, FOLDER_SIZE + FOLDER_SIZE // 2, 3)
+        if index % 2:
+            pixels = np.full(shape, rng.integers(0, 256, 3), dtype=np.uint8)
+        else:
+            pixels = rng.integers(0, 256, shape, dtype=np.uint8)
+        Image.fromarray(pixels).save(directory / f'radical_{index + 1:03d}.png')
+    return directory
+
+def make_synthetic_r214(path, count=SYNTHETIC_RADICALS):
+    """r214.yml-shaped data whose meanings and categories cycle through every mapping."""
+    rng = random.Random(FIXTURE_SEED)
+    meanings = [keywords[0] for keywords, _, _ in generate_radical_svgs.MEANING_MAPPINGS.values()]
+    categories = list(generate_radical_svgs.CATEGORY_MAPPINGS)
+    radicals = []
+    for number in range(1, count + 1):
+        # Half the entries fall through to the category mapping
+        meaning = meanings[number % len(meanings)] if number % 2 else f'abstract {number}'
+        radicals.append({
+            'Number': str(number),
+            'Strokes': str(rng.randint(1, 17)),
+            'Radical': chr(0x2F00 + number - 1),
+            'Category': categories[number % len(categories)],
+            'Meaning': meaning,
+        })
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(radicals, f, allow_unicode=True)
+    return path
+
+@contextlib.contextmanager
+def redirected_svg_paths(data_file, output_dir, outline_cache):
+    """Point generate_radical_svgs.main at the fixtures instead of the real data and assets."""
+    original = generate_radical_svgs.get_project_paths
+    project_root = original()['project_root']  # Fonts for --outline still come from the repo
+    generate_radical_svgs.get_project_paths = lambda: {
+        'project_root': project_root,
+        'data_file': str(data_file),
+        'output_dir': str(output_dir),
+        'outline_cache': str(outline_cache)
+    }
+    try:
+        yield
+    finally:
+        generate_radical_svgs.get_project_paths = original
+
+def run_svg_main(arguments):
+    original_argv = sys.argv
+    sys.argv = ['generate_radical_svgs.py'] + arguments
+    try:
+        generate_radical_svgs.main()
+    finally:
+        sys.argv = original_argv
+
+# =============================================================================
+# HARNESS
+# =============================================================================
+
+def time_benchmark(func, repeat, single=False):
+    """
+    Per-call timings of func over `repeat` rounds; tool output is discarded.
+
+    The first call warms up and calibrates: fast functions are called several
+    times per round so each round lasts at least MIN_ROUND_SECONDS. `single`
+    benchmarks are too slow for that and are timed on one cold call.
+    """
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func()
+        first_call = time.perf_counter() - start
+        if single:
+            return {'rounds': 1, 'loops': 1, 'min': first_call, 'median': first_call,
+                    'mean': first_call, 'stdev': 0.0}
+        loops = max(1, int(MIN_ROUND_SECONDS / max(first_call, 1e-6)))
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            timings.append((time.perf_counter() - start) / loops)
+    return {
+        'rounds': repeat,
+        'loops': loops,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0
+    }
+
+def build_benchmarks(workdir, quick=False):
+    """(name, callable, single) triples over fixtures created in workdir."""
+    sizes = QUICK_FIXTURE_SIZES if quick else FIXTURE_SIZES
+    images = make_png_fixtures(workdir, sizes)
+    folder = make_folder_fixture(workdir / 'folder')
+    out = workdir / 'out'
+    out.mkdir()
+    benchmarks = []
+
+    for key, path in images.items():
+        kind, size = key.split('_')
+        if kind == 'noise' and int(size) > OPTIMIZE_NOISE_MAX_SIZE:
+            continue
+        benchmarks.append((f'png.optimize_png_image[{key}]',
+                           lambda path=path: optimize_png_images.optimize_png_image(str(path), str(out / path.name)),
+                           kind == 'noise' and int(size) ** 2 >= SEARCH_PIXELS))
+    benchmarks.append(('png.process_folder',
+                       lambda: optimize_png_images.process_folder(str(folder), str(out / 'optimized')), False))
+
+    for key, path in images.items():
+        benchmarks.append((f'resize.resize_with_center_crop[{key}]',
+                           lambda path=path: batch_resize_images.resize_with_center_crop(str(path), str(out / path.name)),
+                           False))
+    benchmarks.append(('resize.process_folder',
+                       lambda: batch_resize_images.process_folder(str(folder), str(out / 'resized')), False))
+
+    for shape in SHAPE_TYPES:
+        def generate(shape=shape):
+            random.seed(FIXTURE_SEED)
+            generate_radical_svgs.PatternGenerator('#4169E1').generate_pattern(shape)
+        benchmarks.append((f'svg.pattern.{shape}', generate, False))
+
+    data_file = make_synthetic_r214(workdir / 'r214.yml', 32 if quick else SYNTHETIC_RADICALS)
+    svg_paths = (data_file, out / 'svg', workdir / 'radical_outlines.json')
+
+    def svg_main(arguments):
+        random.seed(FIXTURE_SEED)
+        with redirected_svg_paths(*svg_paths):
+            run_svg_main(arguments)
+
+    benchmarks.append(('svg.main', lambda: svg_main([]), False))
+    # Outline cache is warm after the first round, which matches repeat builds
+    benchmarks.append(('svg.main_outline', lambda: svg_main(['--outline']), False))
+    return benchmarks
+
+def run_benchmarks(quick=False, name_filter=None, repeat=None):
+    repeat = repeat or (QUICK_REPEAT if quick else DEFAULT_REPEAT)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='img-bench-') as workdir:
+        for name, func, single in build_benchmarks(Path(workdir), quick):
+            if name_filter and name_filter not in name:
+                continue
+            try:
+                results[name] = time_benchmark(func, repeat, single)
+                print(f"   ⏱️  {name:<48} median {results[name]['median'] * 1000:9.2f}ms  "
+                      f"min {results[name]['min'] * 1000:9.2f}ms")
+            except Exception as e:
+                print(f"   ❌ {name}: {e}")
+    return {
+        'version': RESULTS_VERSION,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'quick': quick,
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pillow': Image.__version__,
+            'numpy': np.__version__
+        },
+        'benchmarks': results
+    }
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD, stat='min'):
+    """
+    Change of `stat` (min or median per call) per benchmark present in both files.
+
+    Returns a list of (name, baseline_median, current_median, percent_change, status)
+    where status is 'regression', 'improvement' or 'ok'.
+    """
+    rows = []
+    for name in sorted(set(baseline['benchmarks']) & set(current['benchmarks'])):
+        before = baseline['benchmarks'][name][stat]
+        after = current['benchmarks'][name][stat]
+        change = (after - before) / before * 100 if before > 0 else 0.0
+        status = 'regression' if change > threshold else 'improvement' if change < -threshold else 'ok'
+        rows.append((name, before, after, change, status))
+    return rows
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmarks for the image-processing and SVG tools',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python benchmark_tools.py run -o baseline.json
+    python benchmark_tools.py run --quick --filter resize
+    python benchmark_tools.py compare baseline.json .cache/benchmarks/bench_1700000000.json
+        """)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks and save the results')
+    run_parser.add_argument('--quick', action='store_true', help='Small fixtures and fewer rounds')
+    run_parser.add_argument('--filter', default=None, help='Only run benchmarks whose name contains this')
+    run_parser.add_argument('-r', '--repeat', type=int, default=None,
+                            help=f'Timed rounds per benchmark (default: {DEFAULT_REPEAT}, {QUICK_REPEAT} with --quick)')
+    run_parser.add_argument('-o', '--output', default=None,
+                            help=f'Results file (default: {RESULTS_DIR}/bench_<time>.json)')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two results files')
+    compare_parser.add_argument('baseline', help='Results to compare against')
+    compare_parser.add_argument('current', help='New results')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help=f'Percent slowdown reported as a regression (default: {DEFAULT_THRESHOLD})')
+    compare_parser.add_argument('--stat', choices=['min', 'median'], default='min',
+                                help='Timing compared; min is the least noisy (default: min)')
+
+    args = parser.parse_args()
+    print("Image Tool Benchmarks")
+    print("=" * 70)
+
+    if args.command == 'run':
+        results = run_benchmarks(args.quick, args.filter, args.repeat)
+        output_file = Path(args.output) if args.output else RESULTS_DIR / f"bench_{int(time.time())}.json"
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"📋 {len(results['benchmarks'])} results saved to: {output_file}")
+        if not results['benchmarks']:
+            sys.exit(1)
+        return
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    if baseline.get('machine') != current.get('machine'):
+        print("⚠️  Results come from different machines or library versions")
+
+    rows = compare_results(baseline, current, args.threshold, args.stat)
+    icons = {'regression': '🔴', 'improvement': '🟢', 'ok': '⚪'}
+    for name, before, after, change, status in rows:
+        print(f"   {icons[status]} {name:<48} {before * 1000:9.2f}ms → {after * 1000:9.2f}ms  {change:+6.1f}%")
+
+    regressions = [row for row in rows if row[4] == 'regression']
+    print(f"\n📊 {len(rows)} compared, {len(regressions)} regressions over {args.threshold:.0f}%, "
+          f"{sum(1 for row in rows if row[4] == 'improvement')} improvements")
+    if regressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Selector Thumbnails
+===================
+
+Build step for radical-selector: writes a small WebP thumbnail of every candidate
+PNG and a per-folder selector_manifest.json listing, per radical, the file, its
+dimensions, byte size, seed, SHA-256 and thumbnail. The selector server answers
+/api/images from these manifests instead of walking the folder tree, and the
+comparison grid loads the thumbnails instead of the full 512x512 PNGs.
+
+Updates are incremental: a candidate whose mtime and size match its manifest
+entry (and whose thumbnail exists) is not opened again. generate_radical_images.py
+runs this on its output folder at the end of every run.
+
+Usage:
+    python build_thumbnails.py
+    python build_thumbnails.py ../../_data/assets/img/radical/generated-tiny-sd-1a2b3c4d
+    python build_thumbnails.py --size 192 --force
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Where radical-selector reads generated-* candidate folders (relative to scripts/img/)
+DEFAULT_ROOT = Path('../../_data/assets/img/radical')
+SELECTOR_MANIFEST = 'selector_manifest.json'
+THUMBNAIL_DIR = 'thumbs'
+MANIFEST_VERSION = 1
+
+DEFAULT_SIZE = 160        # Grid cells are ~150px wide; full images stay available on click
+DEFAULT_QUALITY = 80
+
+RADICAL_FILE_PATTERN = re.compile(r'^radical_(\d{3})\.png$')
+# generation_service.py writes each candidate to generated-{model}-seed{seed}/
+FOLDER_SEED_PATTERN = re.compile(r'-seed(\d+)$')
+
+# =============================================================================
+# MANIFEST
+# =============================================================================
+
+def file_digest(path):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_generation_seeds(folder):
+    """Seeds recorded by generate_radical_images.py in the folder's manifest.jsonl, per radical."""
+    seeds = {}
+    manifest_file = folder / 'manifest.jsonl'
+    if manifest_file.exists():
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Partial line from an interrupted run
+                if entry.get('seed') is not None:
+                    seeds[int(entry['radical'])] = entry['seed']
+    return seeds
+
+def load_selector_manifest(folder):
+    try:
+        with open(folder / SELECTOR_MANIFEST, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return None
+
+def build_entry(folder, filename, size, quality):
+    """Open one candidate, write its thumbnail and return its manifest entry."""
+    path = folder / filename
+    stat = path.stat()
+    thumbnail = Path(THUMBNAIL_DIR) / filename.replace('.png', '.webp')
+
+    with Image.open(path) as image:
+        width, height = image.size
+        thumb = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        thumb.thumbnail((size, size), Image.Resampling.LANCZOS)
+        temp_file = folder / thumbnail.with_suffix('.tmp')
+        thumb.save(temp_file, 'WEBP', quality=quality, method=6)
+        os.replace(temp_file, folder / thumbnail)
+
+    return {
+        'filename': filename,
+        'width': width,
+        'height': height,
+        'bytes': stat.st_size,
+        'mtime': stat.st_mtime,
+        'sha256': file_digest(path),
+        'thumbnail': thumbnail.as_posix(),
+        'thumbnail_bytes': (folder / thumbnail).stat().st_size
+    }
+
+def update_folder(folder, size=DEFAULT_SIZE, quality=DEFAULT_QUALITY, force=False, jobs=None):
+    """
+    Bring one folder's thumbnails and selector_manifest.json up to date.
+
+    Returns a dict with the number of candidates, thumbnails written and removed entries.
+    """
+    folder = Path(folder)
+    previous = load_selector_manifest(folder)
+    if previous and (previous.get('thumbnail_size') != size or previous.get('quality') != quality):
+        previous = None  # Settings changed, every thumbnail is stale
+    old_entries = previous['radicals'] if previous and not force else {}
+
+    files = {}
+    for path in folder.glob('radical_*.png'):
+        match = RADICAL_FILE_PATTERN.match(path.name)
+        if match:
+            stat = path.stat()
+            files[str(int(match.group(1)))] = (path.name, stat.st_mtime, stat.st_size)
+
+    entries, stale = {}, []
+    for number, (filename, mtime, file_size) in files.items():
+        entry = old_entries.get(number)
+        if (entry and entry['mtime'] == mtime and entry['bytes'] == file_size
+                and (folder / entry['thumbnail']).exists()):
+            entries[number] = dict(entry)
+        else:
+            stale.append((number, filename))
+
+    if stale:
+        (folder / THUMBNAIL_DIR).mkdir(exist_ok=True)
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+            built = executor.map(lambda item: build_entry(folder, item[1], size, quality), stale)
+            for (number, _), entry in zip(stale, built):
+                entries[number] = entry
+
+    # Thumbnails of candidates that were deleted
+    removed = [number for number in old_entries if number not in files]
+    for number in removed:
+        try:
+            (folder / old_entries[number]['thumbnail']).unlink()
+        except OSError:
+            pass
+
+    # Seeds are cheap to re-read and may be recorded after the image is written
+    seeds = load_generation_seeds(folder)
+    folder_seed = FOLDER_SEED_PATTERN.search(folder.name)
+    for number, entry in entries.items():
+        entry['seed'] = seeds.get(int(number), int(folder_seed.group(1)) if folder_seed else None)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'folder': folder.name,
+        'thumbnail_size': size,
+        'quality': quality,
+        'radicals': dict(sorted(entries.items(), key=lambda item: int(item[0])))
+    }
+    if stale or removed or previous is None or manifest['radicals'] != previous.get('radicals'):
+        manifest['updated_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        temp_file = folder / f"{SELECTOR_MANIFEST}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(temp_file, folder / SELECTOR_MANIFEST)
+
+    return {'candidates': len(entries), 'thumbnails': len(stale), 'removed': len(removed)}
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build WebP thumbnails and selector manifests for radical-selector',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python build_thumbnails.py
+    python build_thumbnails.py ../../_data/assets/img/radical/generated-tiny-sd-1a2b3c4d
+    python build_thumbnails.py --size 192 --force
+        """)
+    parser.add_argument('folders', nargs='*',
+                        help=f'Candidate folders to update (default: every generated-* folder in {DEFAULT_ROOT})')
+    parser.add_argument('-s', '--size', type=int, default=DEFAULT_SIZE,
+                        help=f'Thumbnail bounding box in pixels (default: {DEFAULT_SIZE})')
+    parser.add_argument('-q', '--quality', type=int, default=DEFAULT_QUALITY,
+                        help=f'WebP quality 0-100 (default: {DEFAULT_QUALITY})')
+    parser.add_argument('-f', '--force', action='store_true', help='Rebuild every thumbnail')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Encoding threads (default: CPU count)')
+
+    args = parser.parse_args()
+    folders = [Path(folder) for folder in args.folders] or sorted(
+        path for path in DEFAULT_ROOT.glob('generated-*') if path.is_dir())
+    if not folders:
+        print(f"❌ No candidate folders found in {DEFAULT_ROOT}")
+        sys.exit(1)
+
+    print("Selector Thumbnails")
+    print("=" * 70)
+    start_time = time.time()
+    totals = {'candidates': 0, 'thumbnails': 0, 'removed': 0}
+    for folder in folders:
+        if not folder.is_dir():
+            print(f"⚠️  Skipping missing folder: {folder}")
+            continue
+        stats = update_folder(folder, args.size, args.quality, args.force, args.jobs)
+        for key in totals:
+            totals[key] += stats[key]
+        if stats['thumbnails'] or stats['removed']:
+            print(f"🖼️  {folder.name}: {stats['thumbnails']} thumbnails written, {stats['removed']} removed "
+                  f"({stats['candidates']} candidates)")
+
+    print(f"✅ {len(folders)} folders, {totals['candidates']} candidates, {totals['thumbnails']} thumbnails "
+          f"written in {time.time() - start_time:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Import Time Check
+=================
+
+Regression check for the start-up cost of the generation command line. Each
+module below is imported in a fresh interpreter under `python -X importtime`;
+the check fails if its cumulative import time goes over the budget, or if it
+pulls in one of the heavy modules (torch, diffusers, ...) that only
+radical_engine.py may import. `--help` of generate_radical_images.py is timed
+end to end as well.
+
+Each measurement is the best of --runs, to keep page-cache and scheduler noise
+out. Use --scale on slow machines instead of raising the budgets.
+
+Usage:
+    python check_import_time.py
+    python check_import_time.py --runs 10 --scale 2
+    python check_import_time.py --json
+"""
+
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Cumulative import time budget per module, in milliseconds
+IMPORT_BUDGETS_MS = {
+    'radical_config': 80,
+    'telemetry': 80,
+    'model_store': 80,
+    'profiling': 80,
+    'generate_radical_images': 150,
+    'generate_all_styles': 200,
+}
+
+# Wall time budget for whole commands, interpreter start-up included
+COMMAND_BUDGETS_MS = {
+    'generate_radical_images.py --help': 400,
+    'generate_all_styles.py --help': 500,
+}
+
+# Only radical_engine.py (and the tools built on it) may import these
+HEAVY_MODULES = ('torch', 'diffusers', 'transformers', 'accelerate', 'numpy', 'PIL')
+
+DEFAULT_RUNS = 5
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def parse_importtime(stderr):
+    """{package: (self_us, cumulative_us)} from `python -X importtime` output."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            self_us, cumulative_us, package = line[len('import time:'):].split('|')
+            imports[package.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return imports
+
+def measure_import(module, runs):
+    """Best cumulative import time (ms), the slowest direct imports and any heavy modules imported."""
+    best, best_imports = None, {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=SCRIPT_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+        imports = parse_importtime(result.stderr)
+        total = imports[module][1] / 1000
+        if best is None or total < best:
+            best, best_imports = total, imports
+    heavy = sorted(name for name in best_imports if name.split('.')[0] in HEAVY_MODULES)
+    slowest = sorted(((name, timing[0] / 1000) for name, timing in best_imports.items() if name != module),
+                     key=lambda item: -item[1])[:3]
+    return {'ms': round(best, 1), 'heavy': heavy, 'slowest': [[name, round(ms, 1)] for name, ms in slowest]}
+
+def measure_command(command, runs):
+    """Best wall time (ms) of `python <command>`."""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, *command.split()], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(f"{command} exited with {result.returncode}")
+        best = elapsed if best is None else min(best, elapsed)
+    return {'ms': round(best, 1)}
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Check the import time of the generation command line against a budget',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python check_import_time.py
+    python check_import_time.py --runs 10 --scale 2
+        """)
+    parser.add_argument('-r', '--runs', type=int, default=DEFAULT_RUNS,
+                        help=f'Runs per measurement, the best one counts (default: {DEFAULT_RUNS})')
+    parser.add_argument('-s', '--scale', type=float, default=1.0,
+                        help='Multiply every budget, for slow machines (default: 1.0)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    results, failures = {}, []
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        measured = measure_import(module, args.runs)
+        measured['budget_ms'] = round(budget * args.scale, 1)
+        results[f'import {module}'] = measured
+        if measured['heavy']:
+            failures.append(f"import {module} pulls in {', '.join(measured['heavy'])}")
+        if measured['ms'] > measured['budget_ms']:
+            failures.append(f"import {module}: {measured['ms']}ms > {measured['budget_ms']}ms budget")
+
+    for command, budget in COMMAND_BUDGETS_MS.items():
+        measured = measure_command(command, args.runs)
+        measured['budget_ms'] = round(budget * args.scale, 1)
+        results[command] = measured
+        if measured['ms'] > measured['budget_ms']:
+            failures.append(f"{command}: {measured['ms']}ms > {measured['budget_ms']}ms budget")
+
+    if args.json:
+        print(json.dumps({'python': sys.version.split()[0], 'runs': args.runs, 'results': results,
+                          'failures': failures}, indent=2))
+    else:
+        print(f"Import Time Check (Python {sys.version.split()[0]}, best of {args.runs})")
+        print("=" * 70)
+        for name, measured in results.items():
+            status = '✅' if measured['ms'] <= measured['budget_ms'] and not measured.get('heavy') else '❌'
+            print(f"{status} {name:<40} {measured['ms']:>7.1f}ms / {measured['budget_ms']:.0f}ms")
+            if 'slowest' in measured:
+                print(f"   slowest: {', '.join(f'{name} {ms}ms' for name, ms in measured['slowest'])}")
+        print("-" * 70)
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print("✅ All within budget")
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
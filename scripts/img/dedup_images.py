@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+Exact-Duplicate Image Dedup
+===========================
+
+Finds byte-identical images across the asset folders (generated candidates, the
+selected copies, resized_images/ and optimized_images/) and replaces the extra
+copies with reflinks or hard links, so each image is stored once on disk.
+
+Files are grouped by size first: a file with a size nobody else has cannot be a
+duplicate and is never read. Same-size files that are already links of one inode
+count once. The rest are told apart by a digest of their first 64 KiB, and only
+files that still collide are hashed in full (SHA-256, streamed in chunks).
+
+The results are kept in .cache/content_index.json, keyed by path, size, mtime and
+inode, with a SHA-256 -> paths table. Later scans only read new or changed files.
+
+Reflinks (copy-on-write clones, on APFS, Btrfs and XFS) are separate files that
+share blocks, so later edits to one copy leave the others alone. Hard links are
+one file under several names: writing into one changes them all. The image
+scripts replace their outputs rather than writing into them, so hard links are
+safe for them, but an editor saving in place is not. --mode auto uses reflinks
+where the file system has them and hard links elsewhere.
+
+Usage:
+    python dedup_images.py scan
+    python dedup_images.py link --dry-run
+    python dedup_images.py link --mode reflink
+    python dedup_images.py lookup ../../assets/img/selected/radical_085.png
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Asset folders scanned by default (relative to scripts/img/); missing ones are skipped
+DEFAULT_ROOTS = (
+    Path('../../assets/img'),
+    Path('../../_data/assets/img/radical'),
+    Path('resized_images'),
+    Path('optimized_images'),
+)
+INDEX_FILE = Path('.cache/content_index.json')
+INDEX_VERSION = 1
+
+IMAGE_EXTENSIONS = ('.png', '.webp', '.jpg', '.jpeg', '.gif', '.svg')
+SKIPPED_DIRS = ('.cache', '.git', '__pycache__', 'node_modules')
+
+HEAD_BYTES = 64 * 1024    # Enough to tell most same-size PNGs apart without reading them whole
+CHUNK_BYTES = 1024 * 1024
+
+LINK_MODES = ('auto', 'reflink', 'hardlink')
+FICLONE = 0x40049409      # Linux ioctl: clone a whole file (Btrfs, XFS)
+
+# =============================================================================
+# HASHING
+# =============================================================================
+
+def head_digest(path):
+    """BLAKE2 digest of the first HEAD_BYTES of a file, to split same-size groups cheaply."""
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(HEAD_BYTES), digest_size=16).hexdigest()
+
+def content_digest(path):
+    """SHA-256 hex digest of a file, streamed in chunks into a reused buffer."""
+    digest = hashlib.sha256()
+    buffer = bytearray(CHUNK_BYTES)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+def walk_images(roots, all_files=False):
+    """(path, stat) of every regular image file under roots, symlinks excluded."""
+    seen = set()
+    stack = [Path(root).resolve() for root in roots if Path(root).is_dir()]
+    while stack:
+        folder = stack.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_symlink():
+                continue
+            if entry.is_dir():
+                if entry.name not in SKIPPED_DIRS:
+                    stack.append(Path(entry.path))
+            elif entry.is_file() and (all_files or entry.name.lower().endswith(IMAGE_EXTENSIONS)):
+                if entry.path not in seen:  # Nested roots
+                    seen.add(entry.path)
+                    yield entry.path, entry.stat()
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+def load_index():
+    """Cached digests, or an empty index if missing or from another version."""
+    if INDEX_FILE.exists():
+        try:
+            with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                return index
+        except (OSError, ValueError):
+            pass
+    return {'version': INDEX_VERSION, 'files': {}, 'hashes': {}}
+
+def save_index(index):
+    """Write the index, rebuilding its SHA-256 -> paths table from the file entries."""
+    hashes = {}
+    for path, entry in sorted(index['files'].items()):
+        if entry['sha256']:
+            hashes.setdefault(entry['sha256'], []).append(path)
+    index['hashes'] = hashes
+    index['updated_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+
+    INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = INDEX_FILE.with_suffix('.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(temp_file, INDEX_FILE)
+
+def file_entry(stat, sha256=None, cloned=False):
+    entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'device': stat.st_dev, 'inode': stat.st_ino,
+             'sha256': sha256}
+    if cloned:
+        entry['cloned'] = True
+    return entry
+
+def storage_key(entry):
+    """What stores a file's data: its inode, or for reflinked copies the shared clone of its content."""
+    return ('clone', entry['device']) if entry.get('cloned') else (entry['device'], entry['inode'])
+
+def is_current(entry, stat):
+    return (entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+            and entry['inode'] == stat.st_ino and entry['device'] == stat.st_dev)
+
+def resolve_digests(entries, jobs=None):
+    """
+    Fill in the SHA-256 of every entry that could have a duplicate among entries.
+
+    entries maps path -> file entry. Sizes held by a single inode are skipped,
+    same-size inodes are split by head digest, and only the remaining collisions
+    are hashed in full, one path per inode. Returns the number of files read.
+    """
+    by_size = {}
+    for path, entry in entries.items():
+        by_size.setdefault(entry['size'], {}).setdefault((entry['device'], entry['inode']), []).append(path)
+
+    # Same-size inode groups where at least one inode has no digest yet
+    pending = {}
+    for size, inodes in by_size.items():
+        if len(inodes) < 2:
+            continue
+        for paths in inodes.values():
+            known = next((entries[path]['sha256'] for path in paths if entries[path]['sha256']), None)
+            for path in paths:
+                entries[path]['sha256'] = known
+        if any(not entries[paths[0]]['sha256'] for paths in inodes.values()):
+            pending[size] = list(inodes.values())
+
+    with ThreadPoolExecutor(max_workers=jobs or min(8, os.cpu_count() or 1)) as executor:
+        # Large files are only read whole if their head matches another inode of the same size
+        large = [paths for size, groups in pending.items() if size > HEAD_BYTES for paths in groups
+                 if not entries[paths[0]].get('head')]
+        for paths, head in zip(large, executor.map(head_digest, (paths[0] for paths in large))):
+            for path in paths:
+                entries[path]['head'] = head
+        heads = {paths[0]: entries[paths[0]]['head'] for size, groups in pending.items() if size > HEAD_BYTES
+                 for paths in groups}
+
+        to_hash = []
+        for size, groups in pending.items():
+            unknown = [paths for paths in groups if not entries[paths[0]]['sha256']]
+            if size > HEAD_BYTES:
+                counts = Counter(heads[paths[0]] for paths in groups)
+                unknown = [paths for paths in unknown if counts[heads[paths[0]]] > 1]
+            to_hash.extend(unknown)
+
+        for paths, digest in zip(to_hash, executor.map(content_digest, (paths[0] for paths in to_hash))):
+            for path in paths:
+                entries[path]['sha256'] = digest
+
+    return len(large) + len(to_hash)
+
+def update_index(roots, jobs=None, all_files=False):
+    """
+    Bring the index up to date with the files under roots.
+
+    Files whose size, mtime and inode match the index keep their digest; entries
+    of files that are gone (under roots) are dropped. Returns (index, stats).
+    """
+    start_time = time.time()
+    index = load_index()
+    files = index['files']
+    resolved_roots = [str(Path(root).resolve()) for root in roots]
+
+    current = {}
+    for path, stat in walk_images(roots, all_files):
+        entry = files.get(path)
+        current[path] = dict(entry) if is_current(entry, stat) else file_entry(stat)
+
+    removed = [path for path in files if path not in current
+               and any(path.startswith(root + os.sep) for root in resolved_roots)]
+    for path in removed:
+        del files[path]
+
+    read = resolve_digests(current, jobs)
+    files.update(current)
+    save_index(index)
+    return index, {'files': len(current), 'read': read, 'removed': len(removed),
+                   'seconds': round(time.time() - start_time, 2)}
+
+def duplicate_groups(index, roots):
+    """Paths under roots sharing a SHA-256 but stored more than once, biggest savings first."""
+    resolved_roots = [str(Path(root).resolve()) for root in roots]
+    groups = []
+    for digest, paths in index['hashes'].items():
+        paths = [path for path in paths if any(path.startswith(root + os.sep) for root in resolved_roots)]
+        if len({storage_key(index['files'][path]) for path in paths}) > 1:
+            groups.append((digest, paths))
+    return sorted(groups, key=lambda group: -index['files'][group[1][0]]['size'] * (len(group[1]) - 1))
+
+# =============================================================================
+# LINKING
+# =============================================================================
+
+def reflink(source, target):
+    """Create target as a copy-on-write clone of source, or raise OSError if unsupported."""
+    if sys.platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(source), os.fsencode(target), 0) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), str(target))
+        return
+    import fcntl
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(target)
+            raise
+
+def replace_with_link(source, target, mode):
+    """
+    Replace target with a reflink or hard link to source, atomically.
+
+    The link is made under a temporary name next to target and renamed over it,
+    so target is never missing. Returns the mode used.
+    """
+    target = Path(target)
+    temp_file = target.with_name(f".{target.name}.dedup-tmp")
+    if temp_file.exists():
+        temp_file.unlink()
+
+    used = None
+    if mode in ('auto', 'reflink'):
+        try:
+            reflink(source, temp_file)
+            shutil.copystat(target, temp_file)  # A clone is its own file: keep target's mode and times
+            used = 'reflink'
+        except OSError:
+            if mode == 'reflink':
+                raise
+    if used is None:
+        os.link(source, temp_file)
+        used = 'hardlink'
+    os.replace(temp_file, target)
+    return used
+
+def link_duplicates(index, roots, mode='auto', dry_run=False):
+    """
+    Replace every extra copy of a duplicate group with a link to one kept copy.
+
+    The kept copy is the inode with the most links (ties: the oldest). Files that
+    changed since the scan, and copies on another device, are left alone.
+    Returns stats with the bytes recovered.
+    """
+    files = index['files']
+    stats = {'groups': 0, 'linked': 0, 'skipped': 0, 'bytes': 0, 'modes': {}}
+    for digest, paths in duplicate_groups(index, roots):
+        by_device = {}
+        for path in paths:
+            entry = files[path]
+            by_device.setdefault(entry['device'], {}).setdefault(storage_key(entry), []).append(path)
+
+        for inodes in by_device.values():
+            if len(inodes) < 2:
+                continue
+            stats['groups'] += 1
+            keep = max(inodes, key=lambda inode: (len(inodes[inode]), -files[inodes[inode][0]]['mtime']))
+            source = inodes[keep][0]
+            for inode, targets in inodes.items():
+                if inode == keep:
+                    continue
+                try:
+                    current = [os.stat(path) for path in targets]
+                except OSError:
+                    current = []
+                if not current or not all(is_current(files[path], stat) for path, stat in zip(targets, current)):
+                    stats['skipped'] += len(targets)  # Changed or removed since the scan
+                    continue
+                # Space comes back once no other name (outside the scanned folders) keeps the inode
+                freed = current[0].st_nlink == len(targets)
+
+                for path in targets:
+                    if dry_run:
+                        print(f"   {path} -> {source}")
+                        continue
+                    try:
+                        used = replace_with_link(source, path, mode)
+                    except OSError as e:
+                        print(f"⚠️  {path}: {e}")
+                        stats['skipped'] += 1
+                        freed = False
+                        continue
+                    stats['modes'][used] = stats['modes'].get(used, 0) + 1
+                    files[path] = file_entry(os.stat(path), digest, cloned=used == 'reflink')
+                    stats['linked'] += 1
+                    if used == 'reflink':
+                        for kept in inodes[keep]:
+                            files[kept]['cloned'] = True
+                if freed:
+                    stats['bytes'] += files[source]['size']
+
+    if not dry_run:
+        save_index(index)
+    return stats
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.1f}{unit}" if unit != 'B' else f"{size}B"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Find byte-identical images and store them once with reflinks or hard links',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python dedup_images.py scan
+    python dedup_images.py link --dry-run
+    python dedup_images.py link --mode hardlink
+    python dedup_images.py lookup ../../assets/img/selected/radical_085.png
+    python dedup_images.py scan --root ../../assets/img --root resized_images --json
+        """)
+    # Shared options, accepted after any subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--root', action='append', default=None,
+                        help='Folder to scan, repeatable (default: ' + ', '.join(map(str, DEFAULT_ROOTS)) + ')')
+    common.add_argument('--all-files', action='store_true',
+                        help=f'Include every file, not only images ({", ".join(IMAGE_EXTENSIONS)})')
+    common.add_argument('-j', '--jobs', type=int, default=None, help='Hashing threads (default: up to 8)')
+    common.add_argument('--json', action='store_true', help='Print the results as JSON')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('scan', parents=[common], help='Update the index and list duplicate groups')
+    link_parser = subparsers.add_parser('link', parents=[common], help='Replace duplicates with links')
+    link_parser.add_argument('--mode', choices=LINK_MODES, default='auto',
+                             help='reflink (copy-on-write), hardlink, or reflink where supported (default: auto)')
+    link_parser.add_argument('-n', '--dry-run', action='store_true', help='Print what would be linked')
+    lookup_parser = subparsers.add_parser('lookup', parents=[common], help='Indexed copies of one file')
+    lookup_parser.add_argument('file', help='File to look up (indexed or not)')
+
+    args = parser.parse_args()
+    roots = [Path(root) for root in args.root] if args.root else [root for root in DEFAULT_ROOTS if root.is_dir()]
+    missing = [root for root in roots if not root.is_dir()]
+    if missing or not roots:
+        print(f"❌ Folders not found: {', '.join(map(str, missing or DEFAULT_ROOTS))}")
+        sys.exit(1)
+
+    # Every command works on an up-to-date index; unchanged files are not read again
+    index, stats = update_index(roots, args.jobs, args.all_files)
+
+    if args.command == 'lookup':
+        path = Path(args.file).resolve()
+        if not path.is_file():
+            print(f"❌ File not found: {args.file}")
+            sys.exit(1)
+        entry = index['files'].get(str(path))
+        digest = entry['sha256'] if entry and entry['sha256'] else None
+        if digest is None:
+            size = path.stat().st_size
+            same_size = any(other['size'] == size for other in index['files'].values())
+            digest = content_digest(path) if same_size else None
+        copies = [other for other in index['hashes'].get(digest, []) if other != str(path)] if digest else []
+        if args.json:
+            print(json.dumps({'file': str(path), 'sha256': digest, 'copies': copies}, indent=2))
+        elif copies:
+            print(f"🔗 {len(copies)} identical copies of {args.file}:")
+            for other in copies:
+                linked = entry and (index['files'][other]['device'], index['files'][other]['inode']) == \
+                    (entry['device'], entry['inode'])
+                print(f"   {other}{'  (linked)' if linked else ''}")
+        else:
+            print(f"✅ No identical copies of {args.file}")
+        return
+
+    groups = duplicate_groups(index, roots)
+    if args.command == 'scan':
+        files = index['files']
+        wasted = sum(files[paths[0]]['size'] * (len({storage_key(files[path]) for path in paths}) - 1)
+                     for _, paths in groups)
+        if args.json:
+            print(json.dumps({'stats': stats, 'wasted_bytes': wasted,
+                              'groups': [{'sha256': digest, 'size': files[paths[0]]['size'], 'paths': paths}
+                                         for digest, paths in groups]}, indent=2))
+            return
+        print("Exact-Duplicate Image Dedup")
+        print("=" * 70)
+        print(f"📁 {len(roots)} folders, {stats['files']} files: {stats['read']} read, "
+              f"{stats['removed']} removed from the index in {stats['seconds']:.1f}s")
+        for digest, paths in groups[:20]:
+            print(f"🔁 {len(paths)} copies, {format_bytes(files[paths[0]]['size'])} each ({digest[:12]})")
+            for path in paths:
+                print(f"   {path}")
+        if len(groups) > 20:
+            print(f"   ... and {len(groups) - 20} more groups (--json lists them all)")
+        print("-" * 70)
+        print(f"💾 {len(groups)} duplicate groups, {format_bytes(wasted)} recoverable with `link`")
+        print(f"📋 Index: {INDEX_FILE}")
+        return
+
+    if args.dry_run and not args.json:
+        print("Planned links:")
+    result = link_duplicates(index, roots, args.mode, args.dry_run)
+    if args.json:
+        print(json.dumps({'stats': stats, 'link': result, 'dry_run': args.dry_run}, indent=2))
+        return
+    verb = 'Would recover' if args.dry_run else 'Recovered'
+    modes = ', '.join(f"{count} {mode}" for mode, count in sorted(result['modes'].items()))
+    print(f"🔗 {result['groups']} duplicate groups, {result['linked']} files linked"
+          f"{f' ({modes})' if modes else ''}, {result['skipped']} skipped")
+    print(f"💾 {verb} {format_bytes(result['bytes'])}")
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,16 @@ Generate Japanese radical images using all available artistic models.
 
 This script automatically tries all models and skips those that fail,
 ensuring you get samples from every working artistic style.
+
+Models run concurrently as separate processes, as many at a time as fit in a
+global memory/thread budget (estimated per model). Each job has a timeout and
+is retried with exponential back-off, resuming into the same output folder.
+
+--profile profiles this scheduler and is passed on to every model job, each of
+which writes its own profile (see profiling.py).
 """
 
+import os
 import subprocess
 import sys
 import time
@@ -14,32 +22,99 @@ import argparse
 from pathlib import Path
 import json
 from datetime import datetime
-import signal
-import threading
+
+import psutil
+
+from telemetry import read_events, summarize_events
+import profiling
+
+RETRY_BACKOFF_SECONDS = 60    # Doubled on every further attempt
+POLL_INTERVAL = 2             # Seconds between scheduler checks
+PROGRESS_INTERVAL = 30        # Seconds between aggregate progress lines
+
+class ModelJob:
+    """One model's generation subprocess, retried until it succeeds or runs out of attempts."""
+    
+    def __init__(self, model_name, model_info, total_images, events_file, log_file):
+        self.model_name = model_name
+        self.memory_gb = model_info['memory_gb']
+        self.threads = model_info['threads']
+        self.total_images = total_images
+        self.events_file = events_file
+        self.log_file = log_file
+        self.attempt = 0
+        self.not_before = 0.0
+        self.process = None
+        self.log_handle = None
+        self.started = None
+        self.done_radicals = set()
+        self.output_dir = None
+        self.events_offset = 0
+    
+    def read_new_events(self):
+        """Track finished radicals from events appended since the last call (all attempts share the file)."""
+        if not self.events_file.exists():
+            return
+        with open(self.events_file, 'r', encoding='utf-8') as f:
+            f.seek(self.events_offset)
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # Partially written, read it next time
+                self.events_offset += len(line.encode('utf-8'))
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event['event'] == 'image' and event.get('status') in ('ok', 'linked'):
+                    self.done_radicals.add(event.get('radical'))
+                elif event['event'] in ('run_start', 'run_end'):
+                    self.output_dir = event.get('output_dir') or self.output_dir
+    
+    @property
+    def images(self):
+        return len(self.done_radicals)
 
 class MultiStyleGenerator:
-    def __init__(self, test_mode=False, target_radicals=None):
+    def __init__(self, test_mode=False, target_radicals=None, max_memory_gb=None, max_threads=None,
+                 max_parallel=None, timeout_hours=None, retries=1, job_args=None):
         """
         Initialize multi-style generator.
         
         Args:
             test_mode: If True, generate only test images (3 radicals)
             target_radicals: List of specific radical numbers to generate
+            max_memory_gb: Memory budget for concurrent jobs (default: 80% of total RAM)
+            max_threads: Thread budget for concurrent jobs (default: all CPUs)
+            max_parallel: Maximum jobs running at once (default: no limit beyond the budget)
+            timeout_hours: Per-attempt timeout (default: 2h in test mode, 8h in full mode)
+            retries: Extra attempts per model after a failure or timeout
+            job_args: Extra command-line arguments for every generate_radical_images.py job
         """
         self.test_mode = test_mode
         self.target_radicals = target_radicals or [1, 2, 3] if test_mode else None
+        self.max_memory_gb = max_memory_gb or psutil.virtual_memory().total / 1024**3 * 0.8
+        self.max_threads = max_threads or os.cpu_count() or 1
+        self.max_parallel = max_parallel
+        self.timeout_seconds = (timeout_hours or (2 if test_mode else 8)) * 3600
+        self.retries = retries
+        self.job_args = job_args or []
         
         # All available models with their characteristics
+        # memory_gb/threads: estimated peak RAM and CPU threads of one generation process (scheduler budget)
         self.models = {
             'tiny-sd': {
                 'description': 'Tiny-SD (fastest, most memory efficient)',
                 'expected_time': '2-3 hours',
-                'style': 'Simple digital art'
+                'style': 'Simple digital art',
+                'memory_gb': 3,
+                'threads': 4
             },
             'dreamlike': {
                 'description': 'Dreamlike Anime (higher quality, slower)',
                 'expected_time': '4-5 hours',
-                'style': 'Anime/cartoon style'
+                'style': 'Anime/cartoon style',
+                'memory_gb': 6,
+                'threads': 8
             },
             # 'sd15': {
             #     'description': 'Stable Diffusion 1.5 (balanced)',
@@ -54,22 +129,30 @@ class MultiStyleGenerator:
             'sketch': {
                 'description': 'Arcane Style (hand-drawn sketch style)',
                 'expected_time': '3-4 hours',
-                'style': 'Hand-drawn sketches'
+                'style': 'Hand-drawn sketches',
+                'memory_gb': 6,
+                'threads': 8
             },
             'vintage': {
                 'description': 'Analog Style (vintage illustration)',
                 'expected_time': '3-4 hours',
-                'style': 'Vintage illustrations'
+                'style': 'Vintage illustrations',
+                'memory_gb': 6,
+                'threads': 8
             },
             'japanese-art': {
                 'description': 'Waifu Diffusion (anime/Japanese art style)',
                 'expected_time': '4-5 hours',
-                'style': 'Traditional Japanese art'
+                'style': 'Traditional Japanese art',
+                'memory_gb': 6,
+                'threads': 8
             },
             'minimalist': {
                 'description': 'Stable Diffusion 2.1 (clean, minimalist style)',
                 'expected_time': '3-4 hours',
-                'style': 'Clean minimalist lines'
+                'style': 'Clean minimalist lines',
+                'memory_gb': 8,
+                'threads': 8
             },
             # 'papercut': {
             #     'description': 'Paper Cut Style (3D layered look)',
@@ -84,22 +167,30 @@ class MultiStyleGenerator:
             'heartsync-anime': {
                 'description': 'Anything v3.0 (uncensored anime style, versatile model)',
                 'expected_time': '3-4 hours',
-                'style': 'Anime/cartoon style'
+                'style': 'Anime/cartoon style',
+                'memory_gb': 6,
+                'threads': 8
             },
             'dreamshaper-8': {
                 'description': 'DreamShaper v8 (realistic anime style, high quality)',
                 'expected_time': '4-5 hours',
-                'style': 'Realistic anime style'
+                'style': 'Realistic anime style',
+                'memory_gb': 6,
+                'threads': 8
             },
             'counterfeit-v30': {
                 'description': 'Counterfeit v3.0 (anime illustration style, detailed)',
                 'expected_time': '4-5 hours',
-                'style': 'Anime illustration style'
+                'style': 'Anime illustration style',
+                'memory_gb': 6,
+                'threads': 8
             },
             'flux-experimental': {
                 'description': 'FLUX.1 + NSFW LoRA (highest quality uncensored, experimental)',
                 'expected_time': '6-8 hours',
-                'style': 'Ultra high quality uncensored'
+                'style': 'Ultra high quality uncensored',
+                'memory_gb': 32,
+                'threads': 16
             }
             # 'flux-schnell': {
             #     'description': 'FLUX.1-schnell (highest quality, no token required)',
@@ -117,6 +208,7 @@ class MultiStyleGenerator:
             'successful_models': [],
             'failed_models': [],
             'skipped_models': [],
+            'timeline': [],
             'start_time': datetime.now(),
             'end_time': None
         }
@@ -131,6 +223,8 @@ class MultiStyleGenerator:
             print(f"🧪 Test mode: {len(self.target_radicals)} radicals per model")
         else:
             print(f"🚀 Full mode: All 214 radicals per model")
+        print(f"🧮 Budget: {self.max_memory_gb:.0f}GB RAM, {self.max_threads} threads"
+              f"{f', {self.max_parallel} jobs' if self.max_parallel else ''}")
         print(f"📁 Results directory: {self.results_dir}")
         print()
     
@@ -145,163 +239,136 @@ class MultiStyleGenerator:
         print(f"✅ Base script found: {base_script}")
         return True
     
-    def generate_with_model(self, model_name):
-        """
-        Generate images with a specific model.
+    def _expected_hours(self, model_name):
+        """Upper bound of the model's expected_time ('4-5 hours' -> 5), used to start long jobs first."""
+        numbers = [float(part) for part in self.models[model_name]['expected_time'].split()[0].split('-')]
+        return numbers[-1]
+    
+    def _fits(self, job, running):
+        """Whether a job fits next to the running ones within the memory, thread and job budget."""
+        if not running:
+            return True  # A model larger than the whole budget still runs, alone
+        if self.max_parallel and len(running) >= self.max_parallel:
+            return False
+        memory_gb = sum(other.memory_gb for other in running) + job.memory_gb
+        threads = sum(other.threads for other in running) + job.threads
+        # Jobs still loading (or started in this same pass) have not taken their memory yet
+        available_gb = psutil.virtual_memory().available / 1024**3
+        available_gb -= sum(self._unallocated_gb(other) for other in running)
+        return memory_gb <= self.max_memory_gb and threads <= self.max_threads and job.memory_gb <= available_gb
+    
+    def _unallocated_gb(self, job):
+        """Part of a running job's memory estimate its processes (and their workers) do not hold yet."""
+        try:
+            process = psutil.Process(job.process.pid)
+            rss = sum(proc.memory_info().rss for proc in [process] + process.children(recursive=True))
+        except psutil.Error:
+            return 0.0
+        return max(0.0, job.memory_gb - rss / 1024**3)
+    
+    def _memory_share(self, job):
+        """Fraction of a machine-wide generator budget the scheduler reserved for this job."""
+        return min(1.0, job.memory_gb / self.max_memory_gb)
+    
+    def _start_job(self, job):
+        """Launch one attempt of a model job, resuming into the previous attempt's output folder."""
+        job.attempt += 1
+        cmd = [
+            sys.executable,
+            "generate_radical_images.py",
+            "--model", job.model_name,
+            "--events", str(job.events_file),
+            "--cpu-threads", str(job.threads),
+            "--memory-share", f"{self._memory_share(job):.3f}",
+            "--test" if self.test_mode else "--all"
+        ]
+        if job.output_dir:
+            cmd += ["--output-dir", job.output_dir]
+        cmd += self.job_args
         
-        Args:
-            model_name: Name of the model to use
-            
-        Returns:
-            dict: Generation results with success status and output info
-        """
-        model_info = self.models[model_name]
-        print(f"\n🎨 Starting generation with: {model_name}")
-        print(f"   Style: {model_info['style']}")
-        print(f"   Expected time: {model_info['expected_time']}")
-        print("=" * 60)
+        job.log_handle = open(job.log_file, 'w' if job.attempt == 1 else 'a')
+        job.log_handle.write(f"Command: {' '.join(cmd)}\n")
+        job.log_handle.write(f"Attempt: {job.attempt}/{self.retries + 1}\n")
+        job.log_handle.write(f"Started: {datetime.now()}\n")
+        job.log_handle.write("=" * 50 + "\n")
+        job.log_handle.flush()
         
-        try:
-            # Build command - script is now in the same directory
-            cmd = [
-                sys.executable, 
-                "generate_radical_images.py", 
-                "--model", model_name
-            ]
-            
-            if self.test_mode:
-                cmd.append("--test")
-            else:
-                cmd.append("--all")
-            
-            # Run the generation with LIVE OUTPUT
-            print(f"🚀 Executing: {' '.join(cmd)}")
-            print(f"⏰ Timeout: {'2 hours' if self.test_mode else '8 hours'}")
-            print(f"📺 Live output from {model_name}:")
-            print("=" * 60)
-            
-            # Create log file for backup
-            log_file = self.results_dir / f"{model_name}_output.log"
-            
-            try:
-                # Run with REAL-TIME live output AND logging
-                with open(log_file, 'w') as log_f:
-                    log_f.write(f"Command: {' '.join(cmd)}\n")
-                    log_f.write(f"Started: {datetime.now()}\n")
-                    log_f.write("=" * 50 + "\n")
-                    log_f.flush()
-                    
-                    # Use Popen for real-time output streaming
-                    process = subprocess.Popen(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,  # Merge stderr into stdout
-                        text=True,
-                        bufsize=1,  # Line buffered
-                        universal_newlines=True,
-                        cwd="../.."  # Change working directory to project root from scripts/img/
-                    )
-                    
-                    output_lines = []
-                    
-                    # Stream output in real-time
-                    def timeout_handler():
-                        process.kill()
-                    
-                    timeout_seconds = 7200 if self.test_mode else 28800  # 2h for test, 8h for full
-                    timer = threading.Timer(timeout_seconds, timeout_handler)
-                    timer.start()
-                    
-                    try:
-                        # Read output line by line in real-time
-                        for line in process.stdout:
-                            print(line, end='')  # Print immediately to screen
-                            log_f.write(line)    # Write to log file
-                            log_f.flush()        # Ensure it's written immediately
-                            output_lines.append(line)
-                        
-                        # Wait for process to complete
-                        return_code = process.wait()
-                        timer.cancel()  # Cancel timeout timer
-                        
-                    except Exception as e:
-                        timer.cancel()
-                        process.kill()
-                        raise e
-                    
-                    log_f.write(f"\nCompleted: {datetime.now()}\n")
-                    log_f.write(f"Return code: {return_code}\n")
-                    
-                    # Create result object
-                    result = type('Result', (), {
-                        'returncode': return_code, 
-                        'stdout': ''.join(output_lines), 
-                        'stderr': ''
-                    })()
-                    
-            except Exception as e:
-                print(f"❌ Error running {model_name}: {e}")
-                with open(log_file, 'a') as log_f:
-                    log_f.write(f"\nERROR: {e}\n")
-                result = type('Result', (), {'returncode': -2, 'stdout': '', 'stderr': str(e)})()
-            
-            print("=" * 60)
-            
-            success = result.returncode == 0
-            
-            # Extract output directory from stdout if successful
-            output_dir = None
-            if success and "Output directory:" in result.stdout:
-                for line in result.stdout.split('\n'):
-                    if "Output directory:" in line:
-                        output_dir = line.split("Output directory:")[-1].strip()
-                        break
-            
-            generation_result = {
-                'model': model_name,
-                'success': success,
-                'output_dir': output_dir,
-                'log_file': str(log_file),
-                'return_code': result.returncode,
-                'description': model_info['description'],
-                'style': model_info['style']
-            }
-            
-            if success:
-                print(f"✅ {model_name} completed successfully!")
-                if output_dir:
-                    print(f"📁 Images saved to: {output_dir}")
-                self.results['successful_models'].append(generation_result)
-            else:
-                print(f"❌ {model_name} failed with return code {result.returncode}")
-                print(f"📋 Error details saved to: {log_file}")
-                self.results['failed_models'].append(generation_result)
-            
-            return generation_result
-            
-        except subprocess.TimeoutExpired:
-            print(f"⏰ {model_name} timed out - skipping to next model")
-            timeout_result = {
-                'model': model_name,
-                'success': False,
-                'error': 'timeout',
-                'description': model_info['description'],
-                'style': model_info['style']
-            }
-            self.results['failed_models'].append(timeout_result)
-            return timeout_result
-            
-        except Exception as e:
-            print(f"❌ Unexpected error with {model_name}: {e}")
-            error_result = {
-                'model': model_name,
-                'success': False,
-                'error': str(e),
-                'description': model_info['description'],
-                'style': model_info['style']
-            }
-            self.results['failed_models'].append(error_result)
-            return error_result
+        job.process = subprocess.Popen(cmd, stdout=job.log_handle, stderr=subprocess.STDOUT, text=True)
+        job.started = time.time()
+        print(f"🚀 Started {job.model_name} (attempt {job.attempt}, ~{job.memory_gb}GB, {job.threads} threads)")
+    
+    def _finish_job(self, job, return_code, error=None):
+        """Record an attempt in the timeline; returns True if the model succeeded."""
+        job.read_new_events()
+        ended = time.time()
+        job.log_handle.write(f"\nCompleted: {datetime.now()}\n")
+        job.log_handle.write(f"Return code: {return_code}\n")
+        if error:
+            job.log_handle.write(f"ERROR: {error}\n")
+        job.log_handle.close()
+        job.process = None
+        
+        # The generator exits 0 even when the pipeline fails to load, so also require images
+        success = return_code == 0 and not error and job.images > 0
+        self.results['timeline'].append({
+            'model': job.model_name,
+            'attempt': job.attempt,
+            'start': datetime.fromtimestamp(job.started).isoformat(),
+            'end': datetime.fromtimestamp(ended).isoformat(),
+            'start_offset_seconds': round(job.started - self.results['start_time'].timestamp(), 1),
+            'seconds': round(ended - job.started, 1),
+            'memory_gb': job.memory_gb,
+            'threads': job.threads,
+            'images': job.images,
+            'return_code': return_code,
+            'status': 'ok' if success else (error or 'failed')
+        })
+        return success
+    
+    def _record_result(self, job, success, error=None):
+        """Add the model's final outcome, with throughput from its events, to the results."""
+        events = read_events([job.events_file]) if job.events_file.exists() else []
+        telemetry = next(iter(summarize_events(events).values()), None)
+        model_info = self.models[job.model_name]
+        
+        generation_result = {
+            'model': job.model_name,
+            'success': success,
+            'output_dir': job.output_dir,
+            'log_file': str(job.log_file),
+            'events_file': str(job.events_file),
+            'telemetry': telemetry,
+            'attempts': job.attempt,
+            'description': model_info['description'],
+            'style': model_info['style']
+        }
+        
+        if success:
+            print(f"✅ {job.model_name} completed: {job.images}/{job.total_images} images")
+            if job.output_dir:
+                print(f"📁 Images saved to: {job.output_dir}")
+            if telemetry and telemetry['images_per_hour']:
+                print(f"⚡ {telemetry['images_per_hour']} images/hour")
+            self.results['successful_models'].append(generation_result)
+        else:
+            generation_result['error'] = error or 'Generation failed'
+            print(f"❌ {job.model_name} failed after {job.attempt} attempt(s): {generation_result['error']}")
+            print(f"📋 Error details saved to: {job.log_file}")
+            self.results['failed_models'].append(generation_result)
+    
+    def _print_progress(self, running, pending, finished):
+        """One aggregate progress line across all jobs."""
+        for job in running:
+            job.read_new_events()
+        jobs = running + pending + finished
+        images = sum(job.images for job in jobs)
+        total = sum(job.total_images for job in jobs)
+        active = ', '.join(f"{job.model_name} {job.images}/{job.total_images}" for job in running) or 'none'
+        print(f"📊 [{datetime.now().strftime('%H:%M:%S')}] {images}/{total} images "
+              f"({100 * images / max(total, 1):.0f}%) | running: {active} | "
+              f"queued {len(pending)}, finished {len(finished)} | "
+              f"{sum(job.memory_gb for job in running)}/{self.max_memory_gb:.0f}GB, "
+              f"{sum(job.threads for job in running)}/{self.max_threads} threads")
     
     def should_skip_model(self, model_name):
         """Check if a model should be skipped based on requirements."""
@@ -321,7 +388,7 @@ class MultiStyleGenerator:
         return False
     
     def generate_all_styles(self):
-        """Generate images with all available models."""
+        """Generate images with all available models, running as many at once as the budget allows."""
         if not self.check_requirements():
             return False
         
@@ -329,52 +396,69 @@ class MultiStyleGenerator:
         print(f"⏰ Start time: {self.results['start_time'].strftime('%Y-%m-%d %H:%M:%S')}")
         print()
         
-        total_models = len(self.models)
-        current_model = 0
+        total_images = len(self.target_radicals) if self.test_mode else 214
+        pending = []
+        # Longest models first, so the short ones fill the gaps at the end
+        for model_name in sorted(self.models, key=self._expected_hours, reverse=True):
+            if self.should_skip_model(model_name):
+                continue
+            events_file = (self.results_dir / f"{model_name}_events.jsonl").resolve()
+            events_file.unlink(missing_ok=True)
+            pending.append(ModelJob(model_name, self.models[model_name], total_images, events_file,
+                                    self.results_dir / f"{model_name}_output.log"))
+        
+        running = []
+        finished = []
+        last_progress = time.time()
         
         try:
-            for model_name in self.models.keys():
-                current_model += 1
-                print(f"\n📦 Model {current_model}/{total_models}: {model_name}")
-                
-                try:
-                    # Check if model should be skipped
-                    if self.should_skip_model(model_name):
-                        continue
-                    
-                    # Generate with this model - always continue to next on any error
-                    self.generate_with_model(model_name)
+            while pending or running:
+                # Reap finished and timed-out jobs
+                for job in list(running):
+                    return_code = job.process.poll()
+                    error = None
+                    if return_code is None:
+                        if time.time() - job.started < self.timeout_seconds:
+                            continue
+                        job.process.kill()
+                        return_code = job.process.wait()
+                        error = 'timeout'
+                        print(f"⏰ {job.model_name} timed out after {self.timeout_seconds / 3600:.1f}h")
                     
-                except KeyboardInterrupt:
-                    print(f"\n⚠️  User interrupted during {model_name}")
-                    print(f"🔄 Continuing to next model...")
-                    continue
-                    
-                except Exception as e:
-                    print(f"❌ Unexpected error with {model_name}: {e}")
-                    print(f"🔄 Continuing to next model...")
-                    error_result = {
-                        'model': model_name,
-                        'success': False,
-                        'error': f'Unexpected error: {str(e)}',
-                        'description': self.models[model_name]['description'],
-                        'style': self.models[model_name]['style']
-                    }
-                    self.results['failed_models'].append(error_result)
-                    continue
+                    running.remove(job)
+                    if self._finish_job(job, return_code, error):
+                        self._record_result(job, True)
+                        finished.append(job)
+                    elif job.attempt <= self.retries:
+                        backoff = RETRY_BACKOFF_SECONDS * 2 ** (job.attempt - 1)
+                        job.not_before = time.time() + backoff
+                        pending.append(job)
+                        print(f"🔄 {job.model_name} attempt {job.attempt} failed ({error or f'return code {return_code}'}), "
+                              f"retrying in {backoff}s")
+                    else:
+                        self._record_result(job, False, error or f'return code {return_code}')
+                        finished.append(job)
+                
+                # Start every waiting job that fits, in priority order
+                for job in list(pending):
+                    if time.time() >= job.not_before and self._fits(job, running):
+                        pending.remove(job)
+                        self._start_job(job)
+                        running.append(job)
                 
-                # Brief pause between models for system stability
-                if current_model < total_models:
-                    print(f"⏳ Brief pause before next model...")
-                    time.sleep(10)
+                if time.time() - last_progress >= PROGRESS_INTERVAL:
+                    self._print_progress(running, pending, finished)
+                    last_progress = time.time()
+                time.sleep(POLL_INTERVAL)
         
         except KeyboardInterrupt:
             print(f"\n🛑 Generation stopped by user")
-            print(f"📊 Processed {current_model}/{total_models} models")
-        
-        except Exception as e:
-            print(f"\n❌ Critical error in main loop: {e}")
-            print(f"📊 Processed {current_model}/{total_models} models before error")
+            for job in running:
+                job.process.kill()
+                job.process.wait()
+                self._finish_job(job, -2, 'interrupted')
+                self._record_result(job, False, 'interrupted')
+            print(f"📊 Finished {len(finished)} models, stopped {len(running)}, {len(pending)} never started")
         
         finally:
             self.results['end_time'] = datetime.now()
@@ -385,6 +469,8 @@ class MultiStyleGenerator:
     def save_final_report(self):
         """Save comprehensive results report."""
         duration = self.results['end_time'] - self.results['start_time']
+        serial_seconds = sum(entry['seconds'] for entry in self.results['timeline'])
+        speedup = serial_seconds / max(duration.total_seconds(), 1)
         
         # Create summary report
         report = {
@@ -398,6 +484,16 @@ class MultiStyleGenerator:
                 'failed_models': len(self.results['failed_models']),
                 'skipped_models': len(self.results['skipped_models'])
             },
+            'schedule': {
+                'max_memory_gb': round(self.max_memory_gb, 1),
+                'max_threads': self.max_threads,
+                'max_parallel': self.max_parallel,
+                'timeout_seconds': self.timeout_seconds,
+                'retries': self.retries,
+                'serial_seconds': round(serial_seconds, 1),
+                'speedup_vs_serial': round(speedup, 2),
+                'timeline': self.results['timeline']
+            },
             'results': self.results
         }
         
@@ -411,7 +507,7 @@ class MultiStyleGenerator:
         with open(summary_file, 'w') as f:
             f.write(f"# Multi-Style Radical Generation Results\n\n")
             f.write(f"**Generated:** {self.results['end_time'].strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"**Duration:** {duration}\n")
+            f.write(f"**Duration:** {duration} ({speedup:.1f}x faster than running the models one after another)\n")
             f.write(f"**Mode:** {'Test (3 radicals)' if self.test_mode else 'Full (214 radicals)'}\n\n")
             
             f.write(f"## Summary\n")
@@ -427,6 +523,10 @@ class MultiStyleGenerator:
                     f.write(f"- **Description:** {result['description']}\n")
                     if result.get('output_dir'):
                         f.write(f"- **Images:** `{result['output_dir']}`\n")
+                    telemetry = result.get('telemetry')
+                    if telemetry and telemetry['image_seconds']:
+                        f.write(f"- **Throughput:** {telemetry['images_per_hour']} images/hour "
+                                f"(p50 {telemetry['image_seconds']['p50']}s, p95 {telemetry['image_seconds']['p95']}s per image)\n")
                     f.write(f"\n")
             
             if self.results['failed_models']:
@@ -446,9 +546,18 @@ class MultiStyleGenerator:
                     f.write(f"- **Reason:** {result['reason']}\n")
                     f.write(f"- **Description:** {result['description']}\n")
                     f.write(f"\n")
+            
+            if self.results['timeline']:
+                f.write(f"## 🗓️ Schedule\n\n")
+                f.write(f"| Model | Attempt | Start (+min) | Duration (min) | RAM (GB) | Threads | Images | Status |\n")
+                f.write(f"|---|---|---|---|---|---|---|---|\n")
+                for entry in sorted(self.results['timeline'], key=lambda entry: entry['start_offset_seconds']):
+                    f.write(f"| {entry['model']} | {entry['attempt']} | {entry['start_offset_seconds'] / 60:.1f} | "
+                            f"{entry['seconds'] / 60:.1f} | {entry['memory_gb']} | {entry['threads']} | "
+                            f"{entry['images']} | {entry['status']} |\n")
         
         print(f"\n🎉 Multi-style generation complete!")
-        print(f"⏰ Total duration: {duration}")
+        print(f"⏰ Total duration: {duration} ({speedup:.1f}x vs serial)")
         print(f"✅ Successful models: {len(self.results['successful_models'])}")
         print(f"❌ Failed models: {len(self.results['failed_models'])}")
         print(f"⚠️  Skipped models: {len(self.results['skipped_models'])}")
@@ -478,6 +587,17 @@ def main():
                         help='Full mode: generate all 214 radicals with each model')
     parser.add_argument('--models', '-m', nargs='+',
                         help='Test specific models only (space-separated list)')
+    parser.add_argument('--max-memory-gb', type=float, default=None,
+                        help='RAM budget shared by concurrent model jobs (default: 80%% of total RAM)')
+    parser.add_argument('--max-threads', type=int, default=None,
+                        help='CPU thread budget shared by concurrent model jobs (default: all CPUs)')
+    parser.add_argument('--max-parallel', '-j', type=int, default=None,
+                        help='Maximum model jobs running at once (default: as many as fit in the budget)')
+    parser.add_argument('--timeout-hours', type=float, default=None,
+                        help='Per-attempt timeout (default: 2 in test mode, 8 in full mode)')
+    parser.add_argument('--retries', type=int, default=1,
+                        help='Extra attempts per model after a failure or timeout, with back-off (default: 1)')
+    profiling.add_arguments(parser)
     
     args = parser.parse_args()
     
@@ -494,7 +614,15 @@ def main():
     test_mode = args.test or bool(args.models)
     
     # Create generator
-    generator = MultiStyleGenerator(test_mode=test_mode)
+    generator = MultiStyleGenerator(
+        test_mode=test_mode,
+        max_memory_gb=args.max_memory_gb,
+        max_threads=args.max_threads,
+        max_parallel=args.max_parallel,
+        timeout_hours=args.timeout_hours,
+        retries=args.retries,
+        job_args=profiling.forward_arguments(args)
+    )
     
     # Filter models if specific ones requested
     if args.models:
@@ -513,11 +641,11 @@ def main():
     
     # Warn about time commitment for full mode
     if args.full:
-        estimated_time = len(generator.models) * 5  # ~5 hours average per model
+        estimated_time = sum(generator._expected_hours(model_name) for model_name in generator.models)
         print(f"⚠️  FULL MODE WARNING:")
         print(f"   - This will generate 214 radicals × {len(generator.models)} models")
-        print(f"   - Estimated time: ~{estimated_time} hours")
-        print(f"   - Models will run sequentially, skipping failures")
+        print(f"   - Estimated time: up to ~{estimated_time:.0f} hours if the models had to run one at a time")
+        print(f"   - Models run concurrently within the RAM/thread budget, skipping failures")
         print(f"   - You can stop anytime with Ctrl+C")
         
         response = input(f"\n🤔 Continue with full generation? (y/N): ")
@@ -529,4 +657,4 @@ def main():
     return generator.generate_all_styles()
 
 if __name__ == "__main__":
-    main()
+    profiling.run(main)
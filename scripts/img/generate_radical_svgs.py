@@ -2,12 +2,21 @@
 """
 Generate portable 512x512 SVG images for all radicals in r214.yml.
 Refactored version with reduced duplication and better organization.
+
+With --outline the radical is drawn as an SVG <path> extracted from a bundled
+font instead of <text>, so the SVG renders identically without any font load.
 """
 
 import yaml
 import os
+import json
 import math
 import random
+import hashlib
+import argparse
+import unicodedata
+
+import profiling
 
 # =============================================================================
 # CONSTANTS
@@ -48,6 +57,18 @@ PATTERN_OPACITIES = {
 # Font stack for system compatibility
 SYSTEM_FONT_STACK = "'Hiragino Sans', 'Yu Gothic', 'Meiryo', 'MS Gothic', 'SimSun', 'Takao', 'IPAexGothic', 'IPAGothic', 'VL Gothic', 'Noto Sans CJK JP', 'Arial Unicode MS', serif"
 
+# Bundled fonts used for --outline mode, tried in order (relative to the project root)
+OUTLINE_FONTS = [
+    os.path.join('assets', 'fonts', 'japaneseRadicals', 'JapaneseRadicals-Regular.ttf'),
+    os.path.join('assets', 'fonts', 'kanji', 'KosugiMaru-Regular.ttf'),
+]
+
+# Extra stroke (in px) around outlines to match the bold <text> rendering
+OUTLINE_BOLD_STROKE = 4
+
+# Kangxi radicals (U+2F00) and the CJK radicals supplement (U+2E80) range
+KANGXI_RADICAL_RANGES = [(0x2E80, 0x2EF3), (0x2F00, 0x2FD5)]
+
 # =============================================================================
 # CONFIGURATION MAPPINGS
 # =============================================================================
@@ -109,7 +130,8 @@ def get_project_paths():
     return {
         'project_root': project_root,
         'data_file': os.path.join(project_root, '_data', 'r214.yml'),
-        'output_dir': os.path.join(project_root, 'assets', 'img', 'radicals_svg')
+        'output_dir': os.path.join(project_root, 'assets', 'img', 'radicals_svg'),
+        'outline_cache': os.path.join(script_dir, '.cache', 'radical_outlines.json')
     }
 
 # =============================================================================
@@ -332,15 +354,138 @@ class PatternGenerator:
         method()
         return '\n    '.join(self.elements)
 
+# =============================================================================
+# GLYPH OUTLINES
+# =============================================================================
+
+def get_radical_equivalents():
+    """Map unified ideographs to their Kangxi radical code points."""
+    equivalents = {}
+    for start, end in KANGXI_RADICAL_RANGES:
+        for code_point in range(start, end + 1):
+            decomposition = unicodedata.decomposition(chr(code_point))
+            if decomposition.startswith('<compat>'):
+                unified = int(decomposition.split()[1], 16)
+                equivalents.setdefault(unified, []).append(code_point)
+    return equivalents
+
+class GlyphOutliner:
+    """Extracts glyph outlines from bundled fonts, cached per (font, code point)."""
+    
+    def __init__(self, font_paths, cache_path):
+        self.font_paths = font_paths
+        self.cache_path = cache_path
+        self.equivalents = get_radical_equivalents()
+        self.fonts = {}
+        self.font_digests = {}
+        self.cache = self._load_cache()
+        self.cache_dirty = False
+    
+    def _load_cache(self):
+        """Load the outline cache from disk."""
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    @profiling.staged('write')
+    def save_cache(self):
+        """Write the outline cache back to disk if it changed."""
+        if not self.cache_dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f)
+        self.cache_dirty = False
+    
+    def _font_digest(self, font_path):
+        """Content hash of a font file, so edited fonts invalidate the cache."""
+        if font_path not in self.font_digests:
+            with open(font_path, 'rb') as f:
+                self.font_digests[font_path] = hashlib.sha256(f.read()).hexdigest()[:16]
+        return self.font_digests[font_path]
+    
+    def _load_font(self, font_path):
+        """Open a font lazily; only needed on cache misses."""
+        if font_path not in self.fonts:
+            from fontTools.ttLib import TTFont
+            self.fonts[font_path] = TTFont(font_path, lazy=True)
+        return self.fonts[font_path]
+    
+    @profiling.staged('load')
+    def _extract_outline(self, font_path, code_point):
+        """Extract one glyph outline in font units, or None if it is not mapped."""
+        from fontTools.pens.svgPathPen import SVGPathPen
+        from fontTools.pens.boundsPen import BoundsPen
+        
+        font = self._load_font(font_path)
+        glyph_name = (font.getBestCmap() or {}).get(code_point)
+        if glyph_name is None:
+            return None
+        
+        glyph_set = font.getGlyphSet()
+        path_pen = SVGPathPen(glyph_set)
+        bounds_pen = BoundsPen(glyph_set)
+        glyph_set[glyph_name].draw(path_pen)
+        glyph_set[glyph_name].draw(bounds_pen)
+        
+        if not bounds_pen.bounds:
+            return None
+        
+        return {
+            'd': path_pen.getCommands(),
+            'bounds': list(bounds_pen.bounds),
+            'units_per_em': font['head'].unitsPerEm
+        }
+    
+    def get_outline(self, character):
+        """
+        Find an outline for a character, trying its Kangxi equivalents and each font.
+        
+        Returns:
+            dict: path data, bounds and units per em, or None if no font has the glyph
+        """
+        code_points = [ord(character)] + self.equivalents.get(ord(character), [])
+        
+        for font_path in self.font_paths:
+            if not os.path.exists(font_path):
+                continue
+            digest = self._font_digest(font_path)
+            for code_point in code_points:
+                key = f"{digest}:{code_point:04X}"
+                if key not in self.cache:
+                    self.cache[key] = self._extract_outline(font_path, code_point)
+                    self.cache_dirty = True
+                if self.cache[key]:
+                    return self.cache[key]
+        return None
+
+def get_outline_svg(outline, fill_color):
+    """Position a font-unit outline at the radical location as an SVG <path>."""
+    x_min, y_min, x_max, y_max = outline['bounds']
+    scale = RADICAL_FONT_SIZE / outline['units_per_em']
+    
+    # Center the glyph bounding box on the radical position (font y axis points up)
+    translate_x = RADICAL_X - scale * (x_min + x_max) / 2
+    translate_y = RADICAL_Y + scale * (y_min + y_max) / 2
+    stroke_width = OUTLINE_BOLD_STROKE / scale
+    
+    return (f'<path d="{outline["d"]}" fill="{fill_color}" stroke="{fill_color}" '
+            f'stroke-width="{stroke_width:g}" stroke-linejoin="round" '
+            f'transform="translate({translate_x:g} {translate_y:g}) scale({scale:g} {-scale:g})"/>')
+
 # =============================================================================
 # SVG GENERATION
 # =============================================================================
 
-def generate_radical_svg(radical_data, output_dir):
+def generate_radical_svg(radical_data, output_dir, outliner=None):
     """Generate a single portable radical SVG."""
     
-    # Handle special case for radical 78
-    if radical_data['Number'] == '78':
+    # Handle special case for radical 78 (outline mode resolves it via Kangxi equivalents)
+    if radical_data['Number'] == '78' and outliner is None:
         radical_char = '⽍'  # Kangxi radical 78 (U+2F4D)
     else:
         radical_char = radical_data['Radical']
@@ -358,6 +503,15 @@ def generate_radical_svg(radical_data, output_dir):
     pattern_generator = PatternGenerator(bg_color)
     background_svg = pattern_generator.generate_pattern(shape_type)
     
+    # Draw the radical as an outline when one is available, otherwise as text
+    radical_svg = f'<text x="{RADICAL_X}" y="{RADICAL_Y}" class="radical-text">{radical_char}</text>'
+    if outliner is not None:
+        outline = outliner.get_outline(radical_char)
+        if outline:
+            radical_svg = get_outline_svg(outline, text_color)
+        else:
+            print(f"⚠️  No outline for radical {number} ({radical_char}), falling back to <text>")
+    
     # Create SVG content
     svg_content = f'''<?xml version="1.0" encoding="UTF-8"?>
 <svg width="{IMAGE_SIZE}" height="{IMAGE_SIZE}" viewBox="0 0 {IMAGE_SIZE} {IMAGE_SIZE}" xmlns="http://www.w3.org/2000/svg">
@@ -401,7 +555,7 @@ def generate_radical_svg(radical_data, output_dir):
   </g>
   
   <!-- Radical Character -->
-  <text x="{RADICAL_X}" y="{RADICAL_Y}" class="radical-text">{radical_char}</text>
+  {radical_svg}
   
   <!-- Number in top-left corner -->
   <text x="{NUMBER_X}" y="{NUMBER_Y}" class="number-text">#{number}</text>
@@ -414,8 +568,11 @@ def generate_radical_svg(radical_data, output_dir):
     filename = f"radical_{int(number):03d}.svg"
     filepath = os.path.join(output_dir, filename)
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(svg_content)
+    # Replaced, not written into: the output may be hard-linked by dedup_images.py
+    with profiling.stage('write'):
+        with open(f"{filepath}.tmp", 'w', encoding='utf-8') as f:
+            f.write(svg_content)
+        os.replace(f"{filepath}.tmp", filepath)
     
     print(f"Generated: {filename} ({meaning})")
     return filepath
@@ -427,13 +584,26 @@ def generate_radical_svg(radical_data, output_dir):
 def main():
     """Generate all portable radical SVGs."""
     
+    parser = argparse.ArgumentParser(description='Generate portable 512x512 SVG images for all radicals')
+    parser.add_argument('--outline', action='store_true',
+                        help='Draw radicals as SVG paths extracted from bundled fonts instead of <text>')
+    parser.add_argument('--outline-font', action='append', default=None,
+                        help='Font file to extract outlines from (repeatable, tried in order)')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    
     # Get paths
     paths = get_project_paths()
     os.makedirs(paths['output_dir'], exist_ok=True)
     
+    outliner = None
+    if args.outline:
+        font_paths = args.outline_font or [os.path.join(paths['project_root'], font) for font in OUTLINE_FONTS]
+        outliner = GlyphOutliner(font_paths, paths['outline_cache'])
+    
     # Load radical data
     try:
-        with open(paths['data_file'], 'r', encoding='utf-8') as file:
+        with profiling.stage('load'), open(paths['data_file'], 'r', encoding='utf-8') as file:
             radicals_data = yaml.safe_load(file)
     except FileNotFoundError:
         print(f"Error: {paths['data_file']} file not found!")
@@ -447,6 +617,7 @@ def main():
     print("=" * 50)
     print(f"Data source: {os.path.relpath(paths['data_file'])}")
     print(f"Output directory: {os.path.relpath(paths['output_dir'])}")
+    print(f"Radical rendering: {'font outlines (<path>)' if outliner else 'system fonts (<text>)'}")
     print(f"Generating {len(radicals_data)} radical SVG images...")
     print("-" * 50)
     
@@ -454,15 +625,18 @@ def main():
     
     for radical_data in radicals_data:
         try:
-            generate_radical_svg(radical_data, paths['output_dir'])
+            generate_radical_svg(radical_data, paths['output_dir'], outliner)
             generated_count += 1
         except Exception as e:
             print(f"❌ Error generating SVG for radical {radical_data.get('Number', '?')}: {e}")
     
+    if outliner is not None:
+        outliner.save_cache()
+    
     print("-" * 50)
     print(f"✅ Generation complete! Generated {generated_count} portable SVG images.")
     print(f"📁 Images saved in: {os.path.abspath(paths['output_dir'])}")
     print("\n🚀 These SVGs are fully portable and can be moved anywhere!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    profiling.run(main)
\ No newline at end of file
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Stroke-Order SVG Animations
+===========================
+
+Builds a small animated SVG per radical from vector data, as an alternative to
+the raster stroke-order GIFs in assets/img/gif.
+
+Each glyph comes from the kanji-alive radical-characters SVGs (matched by
+reading) or, when a radical has none, from the bundled font outline used by
+generate_radical_svgs.py --outline. The glyphs are filled outlines, not stroke
+centrelines: their contours are traced in reading order (top to bottom, then
+left to right) with a CSS stroke-dashoffset animation, and the filled glyph
+fades in as the last contour closes.
+
+Timing comes from the kanji-alive stroke timing file of the kanji written like
+the radical (via ka_data.csv). When the glyph has one contour per stroke, each
+contour is drawn in its stroke's window; otherwise the contours share the
+writing time in proportion to their length. Radicals without a timing file use
+DEFAULT_STROKE_SECONDS per stroke. The animation plays once and restarts
+whenever the SVG is shown again; colours follow the page's currentColor.
+
+Usage:
+    python generate_stroke_svgs.py
+    python generate_stroke_svgs.py --only 85 --only 214
+    python generate_stroke_svgs.py -o ../../assets/img/stroke_svg -j 8
+"""
+
+import os
+import re
+import csv
+import sys
+import json
+import math
+import time
+import argparse
+import unicodedata
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from generate_radical_svgs import OUTLINE_FONTS, GlyphOutliner, get_project_paths
+from optimize_svg_images import NUMBER_PATTERN, local_name, parse_path, serialize_path
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+KANJI_DATA_DIR = os.path.join('resources', 'kanji-data-media-master')  # Relative to the project root
+GLYPH_DIR = 'radical-characters'
+TIMING_DIR = os.path.join('kanji-animations', 'stroke_timings')
+KANJI_CSV = os.path.join('language-data', 'ka_data.csv')
+
+DEFAULT_OUTPUT = 'stroke_svgs'
+INDEX_FILENAME = 'index.json'
+
+VIEW_SIZE = 100           # Output viewBox is 0 0 100 100 whatever the glyph source
+MARGIN = 8                # Glyph box inset in the viewBox
+DECIMALS = 1              # 0.1 unit = 1/1000 of the image, below one pixel at 1000px
+ROW_BAND = 0.15           # Contours whose tops are within this share of the height count as one row
+
+TRACE_WIDTH = 0.8         # Outline stroke while tracing, in viewBox units
+LEAD_IN = 0.3             # Seconds before the first stroke, replacing the recording's own lead-in
+FILL_SECONDS = 0.4        # Fade-in of the filled glyph after the last contour
+DEFAULT_STROKE_SECONDS = 0.8
+
+IDENTITY = (1, 0, 0, 1, 0, 0)
+
+# =============================================================================
+# DATA SOURCES
+# =============================================================================
+
+def load_timings(kanji_data_dir):
+    """{kanji: [stroke boundary times in seconds]} for every kanji with a _00 timing file."""
+    timings = {}
+    with open(os.path.join(kanji_data_dir, KANJI_CSV), 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            timing_file = os.path.join(kanji_data_dir, TIMING_DIR, f"{row['kname']}_00.txt")
+            if os.path.exists(timing_file):
+                with open(timing_file, 'r', encoding='utf-8') as timing:
+                    times = [float(value) for value in timing.read().split()]
+                if len(times) >= 2 and times == sorted(times):
+                    timings[row['kanji']] = times
+    return timings
+
+def resolve_glyph(radical, kanji_data_dir, outliner):
+    """
+    Glyph source of a radical: the radical-characters SVG named after its reading, else a font outline.
+
+    Returns:
+        dict: {'source', 'paths': [(d, (a, b, c, d, e, f) transform), ...]} or None
+    """
+    glyph_file = os.path.join(kanji_data_dir, GLYPH_DIR, f"{radical['Reading-R']}.svg")
+    if radical['Reading-R'] and os.path.exists(glyph_file):
+        paths = []
+
+        def walk(element, matrix):
+            if element.get('transform'):
+                matrix = multiply(matrix, parse_transform(element.get('transform')))
+            if local_name(element.tag) == 'path' and element.get('d'):
+                paths.append((element.get('d'), matrix))
+            for child in element:
+                walk(child, matrix)
+
+        walk(ET.parse(glyph_file).getroot(), IDENTITY)
+        return {'source': f"{GLYPH_DIR}/{os.path.basename(glyph_file)}", 'paths': paths}
+
+    outline = outliner.get_outline(unicodedata.normalize('NFKC', radical['Radical'])) if outliner else None
+    if outline:
+        # Font units have y pointing up
+        return {'source': 'font', 'paths': [(outline['d'], (1, 0, 0, -1, 0, 0))]}
+    return None
+
+# =============================================================================
+# GEOMETRY
+# =============================================================================
+
+def multiply(first, second):
+    """Affine matrix product first x second, as SVG (a, b, c, d, e, f) tuples."""
+    a1, b1, c1, d1, e1, f1 = first
+    a2, b2, c2, d2, e2, f2 = second
+    return (a1 * a2 + c1 * b2, b1 * a2 + d1 * b2, a1 * c2 + c1 * d2, b1 * c2 + d1 * d2,
+            a1 * e2 + c1 * f2 + e1, b1 * e2 + d1 * f2 + f1)
+
+def parse_transform(value):
+    """Affine matrix of an SVG transform list (translate, scale and matrix)."""
+    matrix = IDENTITY
+    for name, args in re.findall(r'(\w+)\s*\(([^)]*)\)', value):
+        numbers = [float(number) for number in NUMBER_PATTERN.findall(args)]
+        if name == 'translate':
+            step = (1, 0, 0, 1, numbers[0], numbers[1] if len(numbers) > 1 else 0)
+        elif name == 'scale':
+            step = (numbers[0], 0, 0, numbers[1] if len(numbers) > 1 else numbers[0], 0, 0)
+        elif name == 'matrix':
+            step = tuple(numbers)
+        else:
+            raise ValueError(f"Unsupported transform: {name}")
+        matrix = multiply(matrix, step)
+    return matrix
+
+def split_contours(data):
+    """
+    Absolute segments of each closed contour in path data.
+
+    Relative and shorthand commands are made absolute (H/V become L, S/T keep their
+    implicit control points), so every coordinate pair can be transformed directly.
+    """
+    contours, current = [], []
+    x = y = start_x = start_y = 0.0
+    for command, args in parse_path(data):
+        upper = command.upper()
+        relative = command.islower()
+        if upper == 'Z':
+            current.append(('Z', []))
+            contours.append(current)
+            current = []
+            x, y = start_x, start_y
+            continue
+        if upper == 'A':
+            raise ValueError("Arcs are not supported in glyph outlines")
+        if upper == 'H':
+            upper, args, relative = 'L', [args[0] + (x if relative else 0), y], False
+        elif upper == 'V':
+            upper, args, relative = 'L', [x, args[0] + (y if relative else 0)], False
+        points = [value + ((x, y)[i % 2] if relative else 0) for i, value in enumerate(args)]
+        if upper == 'M':
+            if current:
+                contours.append(current)
+            current = []
+            start_x, start_y = points
+        current.append((upper, points))
+        x, y = points[-2], points[-1]
+    if current:
+        contours.append(current)
+    return contours
+
+def transform_contour(contour, matrix):
+    a, b, c, d, e, f = matrix
+    return [(command, [value for i in range(0, len(points), 2)
+                       for value in (a * points[i] + c * points[i + 1] + e, b * points[i] + d * points[i + 1] + f)])
+            for command, points in contour]
+
+def contour_box(contour):
+    xs = [value for _, points in contour for value in points[0::2]]
+    ys = [value for _, points in contour for value in points[1::2]]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def contour_length(contour):
+    """Length of the polyline through the on-curve points; enough to share time between contours."""
+    length, previous, start = 0.0, None, None
+    for command, points in contour:
+        if command == 'Z':
+            if previous and start:
+                length += math.dist(previous, start)
+            continue
+        point = (points[-2], points[-1])
+        if command == 'M':
+            start = point
+        elif previous:
+            length += math.dist(previous, point)
+        previous = point
+    return length
+
+def to_relative(contour):
+    """Relative segments of an absolute contour, which serialise shorter."""
+    segments, x, y = [], 0.0, 0.0
+    for command, points in contour:
+        if command == 'Z':
+            segments.append(('z', []))
+            continue
+        segments.append((command.lower(), [value - (x, y)[i % 2] for i, value in enumerate(points)]))
+        x, y = points[-2], points[-1]
+    if segments and segments[0][0] == 'm':
+        segments[0] = ('M', contour[0][1])  # The first moveto is absolute either way
+    return segments
+
+def layout_glyph(glyph):
+    """Contours of a glyph transformed into the output viewBox, in reading order."""
+    contours = [transform_contour(contour, matrix)
+                for data, matrix in glyph['paths'] for contour in split_contours(data)]
+    contours = [contour for contour in contours if len(contour) > 1]
+    if not contours:
+        raise ValueError("Glyph has no contours")
+
+    boxes = [contour_box(contour) for contour in contours]
+    x_min, y_min = min(box[0] for box in boxes), min(box[1] for box in boxes)
+    x_max, y_max = max(box[2] for box in boxes), max(box[3] for box in boxes)
+    scale = (VIEW_SIZE - 2 * MARGIN) / max(x_max - x_min, y_max - y_min)
+    offset_x = (VIEW_SIZE - scale * (x_max - x_min)) / 2 - scale * x_min
+    offset_y = (VIEW_SIZE - scale * (y_max - y_min)) / 2 - scale * y_min
+    contours = [transform_contour(contour, (scale, 0, 0, scale, offset_x, offset_y)) for contour in contours]
+
+    band = ROW_BAND * VIEW_SIZE
+    return sorted(contours, key=lambda contour: (round(contour_box(contour)[1] / band), contour_box(contour)[0]))
+
+# =============================================================================
+# ANIMATION
+# =============================================================================
+
+def schedule(contours, times, strokes):
+    """
+    (delay, duration) in seconds for each contour, and the total writing time.
+
+    times are stroke boundaries from a timing file (None if there is none), strokes
+    the radical's stroke count for the fallback pace.
+    """
+    if times is None:
+        times = [index * DEFAULT_STROKE_SECONDS for index in range(max(strokes, 1) + 1)]
+    times = [LEAD_IN + time_value - times[0] for time_value in times]
+
+    if len(contours) == len(times) - 1:
+        return [(start, end - start) for start, end in zip(times, times[1:])], times[-1]
+
+    lengths = [contour_length(contour) for contour in contours]
+    total = sum(lengths) or 1
+    span = times[-1] - times[0]
+    windows, start = [], times[0]
+    for length in lengths:
+        duration = span * length / total
+        windows.append((start, duration))
+        start += duration
+    return windows, times[-1]
+
+def format_seconds(value):
+    return f"{value:.2f}".rstrip('0').rstrip('.') + 's'
+
+def build_svg(contours, windows, end, title):
+    """Animated SVG markup: one traced <path> per contour and the filled glyph underneath."""
+    data = [serialize_path(to_relative(contour), DECIMALS) for contour in contours]
+    traces = '\n'.join(f'<path pathLength="1" style="animation-delay:{format_seconds(delay)};'
+                       f'animation-duration:{format_seconds(duration)}" d="{d}"/>'
+                       for d, (delay, duration) in zip(data, windows))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {VIEW_SIZE} {VIEW_SIZE}" role="img">'
+        f'<title>{escape(title)}</title>\n'
+        '<style>'
+        f'.g{{fill:currentColor;opacity:0;animation:f {format_seconds(FILL_SECONDS)} {format_seconds(end)} forwards}}'
+        f'.t path{{fill:none;stroke:currentColor;stroke-width:{TRACE_WIDTH:g};stroke-linejoin:round;'
+        'stroke-dasharray:1;stroke-dashoffset:1;animation:d linear forwards}'
+        '@keyframes d{to{stroke-dashoffset:0}}@keyframes f{to{opacity:1}}'
+        '@media (prefers-reduced-motion:reduce){.g{animation:none;opacity:1}.t{display:none}}'
+        '</style>\n'
+        f'<path class="g" d="{"".join(data)}"/>\n'
+        f'<g class="t">\n{traces}\n</g>\n</svg>\n'
+    )
+
+def generate_stroke_svg(task):
+    """Write one radical's animated SVG. Process pool entry point; returns its index entry."""
+    number, title, glyph, times, strokes, output_dir = task
+    entry = {'number': number, 'file': f"{number}.svg", 'glyph': glyph['source'], 'bytes': 0,
+             'contours': 0, 'strokes': strokes, 'timing': None, 'duration': 0, 'error': None}
+    try:
+        contours = layout_glyph(glyph)
+        windows, end = schedule(contours, times, strokes)
+        if times is None:
+            entry['timing'] = 'default'
+        else:
+            entry['strokes'] = len(times) - 1
+            entry['timing'] = 'strokes' if len(contours) == len(times) - 1 else 'length'
+
+        svg = build_svg(contours, windows, end, title).encode('utf-8')
+        try:
+            ET.fromstring(svg)  # Browsers refuse to render malformed SVG, so never write one
+        except ET.ParseError as e:
+            raise ValueError(f"Generated SVG is not well-formed: {e}") from None
+        output_path = os.path.join(output_dir, entry['file'])
+        with open(f"{output_path}.tmp", 'wb') as f:
+            f.write(svg)
+        os.replace(f"{output_path}.tmp", output_path)
+        entry.update(bytes=len(svg), contours=len(contours), duration=round(end + FILL_SECONDS, 2))
+    except Exception as e:
+        entry['error'] = str(e)
+    return entry
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate animated stroke-order SVGs for all radicals',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python generate_stroke_svgs.py
+    python generate_stroke_svgs.py --only 85 --only 214
+    python generate_stroke_svgs.py -o ../../assets/img/stroke_svg -j 8
+        """)
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f'Output folder (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--only', type=int, action='append', default=None,
+                        help='Radical number to generate (repeatable, default: all)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    paths = get_project_paths()
+    kanji_data_dir = os.path.join(paths['project_root'], KANJI_DATA_DIR)
+    with open(paths['data_file'], 'r', encoding='utf-8') as f:
+        radicals = yaml.safe_load(f)
+    if args.only:
+        radicals = [radical for radical in radicals if int(radical['Number']) in args.only]
+
+    print("Stroke-Order SVG Animations")
+    print("=" * 70)
+    start_time = time.time()
+    timings = load_timings(kanji_data_dir)
+    outliner = GlyphOutliner([os.path.join(paths['project_root'], font) for font in OUTLINE_FONTS],
+                             paths['outline_cache'])
+
+    tasks, missing = [], []
+    os.makedirs(args.output, exist_ok=True)
+    for radical in radicals:
+        glyph = resolve_glyph(radical, kanji_data_dir, outliner)
+        if glyph is None:
+            missing.append(radical['Number'])
+            continue
+        character = unicodedata.normalize('NFKC', radical['Radical'])
+        tasks.append((radical['Number'], f"{radical['Radical']} {radical['Meaning']}", glyph,
+                      timings.get(character), int(radical['Strokes']), args.output))
+    outliner.save_cache()
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        entries = list(executor.map(generate_stroke_svg, tasks, chunksize=8))
+
+    index = {'version': 1, 'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+             'radicals': {entry['number']: entry for entry in entries if not entry['error']}}
+    index_path = Path(args.output) / INDEX_FILENAME
+    if args.only and index_path.exists():
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index['radicals'] = {**json.load(f).get('radicals', {}), **index['radicals']}
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1)
+
+    done = [entry for entry in entries if not entry['error']]
+    for entry in entries:
+        if entry['error']:
+            print(f"❌ Radical {entry['number']}: {entry['error']}")
+    by_timing = {}
+    for entry in done:
+        by_timing[entry['timing']] = by_timing.get(entry['timing'], 0) + 1
+    total_bytes = sum(entry['bytes'] for entry in done)
+    print(f"✅ {len(done)} animations in {time.time() - start_time:.1f}s "
+          f"({total_bytes / 1024:.0f} KB, {total_bytes / max(len(done), 1) / 1024:.1f} KB each)")
+    print(f"🧪 Parse check: {len(done)}/{len(entries)} SVGs well-formed")
+    print("⏱️  Timing: " + ', '.join(f"{count} {name}" for name, count in sorted(by_timing.items())))
+    if missing:
+        print(f"⚠️  No glyph for radicals: {', '.join(missing)}")
+    print(f"📁 Saved in: {os.path.abspath(args.output)} (with {INDEX_FILENAME})")
+
+    if len(done) < len(entries):
+        sys.exit(2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Radical Generation Service
+Keeps one diffusion pipeline loaded and serves regeneration jobs over HTTP on localhost.
+
+Endpoints:
+    POST /jobs              {"radical": 85, "candidates": 4, "seeds": [1, 2], "priority": 0}
+    GET  /jobs/<id>         Job status, progress and results
+    GET  /jobs/<id>/events  Progress events streamed as JSON lines until the job finishes
+    GET  /health            Model, device and queue size
+
+Jobs go into a priority queue (lower number = sooner). Queued jobs are batched
+together into a single pipeline call up to --max-batch images.
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import random
+import argparse
+import itertools
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL.PngImagePlugin import PngInfo
+
+from radical_config import MODEL_CONFIGS
+from build_thumbnails import update_folder
+
+# Where radical-selector/server reads generated-* candidate folders (relative to scripts/img/)
+DEFAULT_OUTPUT_ROOT = Path("../../_data/assets/img/radical")
+MAX_CANDIDATES_PER_JOB = 16
+# Candidates go into a fixed set of slot folders, generated-{model}-service-01 .. -16, so the
+# selector grid stays bounded; each radical overwrites its oldest candidate once all slots are used
+CANDIDATE_SLOTS = MAX_CANDIDATES_PER_JOB
+JOB_TTL_SECONDS = 3600    # Finished jobs are forgotten after this long
+
+
+class GenerationJob:
+    """A regeneration request for one radical and its progress events."""
+
+    def __init__(self, radical, candidates, seeds, priority=0):
+        self.id = uuid.uuid4().hex[:12]
+        self.radical = radical
+        self.candidates = candidates
+        self.seeds = list(seeds) + [random.randint(0, 2**32 - 1) for _ in range(candidates - len(seeds))]
+        self.priority = priority
+        self.status = 'queued'
+        self.error = None
+        self.results = []
+        self.events = []
+        self.created_at = time.time()
+        self.finished_at = None
+        self.condition = threading.Condition()
+        self.add_event('queued', candidates=candidates, seeds=self.seeds)
+
+    def add_event(self, event_type, **data):
+        """Record a progress event and wake up any streaming clients."""
+        with self.condition:
+            self.events.append({'event': event_type, 'job_id': self.id, 'time': time.time(), **data})
+            self.condition.notify_all()
+
+    def finish(self, status, error=None):
+        """Mark the job finished and emit the final event."""
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self.add_event(status, results=self.results, **({'error': error} if error else {}))
+
+    @property
+    def done(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'radical': self.radical,
+            'candidates': self.candidates,
+            'seeds': self.seeds,
+            'priority': self.priority,
+            'status': self.status,
+            'error': self.error,
+            'completed': len(self.results),
+            'results': self.results,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+
+class GenerationService:
+    """Owns the resident pipeline and a worker thread that drains the job queue."""
+
+    def __init__(self, generator, radicals, max_batch=4):
+        self.generator = generator
+        self.radicals = {radical['number']: radical for radical in radicals}
+        self.max_batch = max(1, max_batch)
+        self.queue = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.jobs = {}
+        self.model_name = generator.model_id.split('/')[-1].replace('.', '-').lower()
+        self.worker = threading.Thread(target=self._run, name='generation-worker', daemon=True)
+
+    def start(self):
+        self.worker.start()
+
+    def submit(self, radical, candidates=1, seeds=None, priority=0):
+        """Validate and enqueue a job; raises ValueError on bad input."""
+        if radical not in self.radicals:
+            raise ValueError(f"Unknown radical: {radical}")
+        if not 1 <= candidates <= MAX_CANDIDATES_PER_JOB:
+            raise ValueError(f"candidates must be between 1 and {MAX_CANDIDATES_PER_JOB}")
+        seeds = [int(seed) for seed in (seeds or [])][:candidates]
+
+        self._prune_jobs()
+        job = GenerationJob(radical, candidates, seeds, priority)
+        self.jobs[job.id] = job
+        self.queue.put((priority, next(self.sequence), job))
+        print(f"📥 Job {job.id}: radical {radical}, {candidates} candidates (priority {priority})")
+        return job
+
+    def _prune_jobs(self):
+        """Forget jobs that finished more than JOB_TTL_SECONDS ago."""
+        cutoff = time.time() - JOB_TTL_SECONDS
+        for job_id, job in list(self.jobs.items()):
+            if job.done and job.finished_at < cutoff:
+                self.jobs.pop(job_id, None)
+
+    def _next_batch(self):
+        """Block for the most urgent job, then add queued jobs while they fit in one batch."""
+        _, _, job = self.queue.get()
+        batch = [job]
+        size = job.candidates
+
+        deferred = []
+        while size < self.max_batch:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if size + item[2].candidates <= self.max_batch:
+                batch.append(item[2])
+                size += item[2].candidates
+            else:
+                deferred.append(item)
+        for item in deferred:
+            self.queue.put(item)
+        return batch
+
+    def _candidate_file(self, radical):
+        """Slot file for a new candidate: the first slot without this radical, else its oldest candidate."""
+        filename = f"radical_{radical:03d}.png"
+        files = [self.generator.output_dir / f"generated-{self.model_name}-service-{slot:02d}" / filename
+                 for slot in range(1, CANDIDATE_SLOTS + 1)]
+        free = [path for path in files if not path.exists()]
+        return free[0] if free else min(files, key=lambda path: path.stat().st_mtime)
+
+    def _save_candidate(self, radical, image, seed):
+        """Save one candidate in a slot folder (generated-*) so the selector shows it as a column."""
+        output_file = self._candidate_file(radical)
+        folder = output_file.parent
+        folder.mkdir(parents=True, exist_ok=True)
+        # The seed lives in the PNG, since the slot folder name no longer carries it
+        info = PngInfo()
+        info.add_text('seed', str(seed))
+        info.add_text('model', self.generator.model_id)
+        # Replaced, not written into: an earlier candidate may be hard-linked by dedup_images.py
+        image.save(f"{output_file}.tmp", "PNG", pnginfo=info)
+        os.replace(f"{output_file}.tmp", output_file)
+        update_folder(folder)  # Thumbnail + selector manifest, only this candidate is new
+        self.generator.generation_count += 1
+        return {'seed': seed, 'folder': folder.name, 'filename': output_file.name, 'path': str(output_file)}
+
+    def _run(self):
+        while True:
+            jobs = self._next_batch()
+            try:
+                self._run_batch(jobs)
+            except Exception as e:
+                # Never let one batch kill the worker: fail its unfinished jobs and keep draining the queue
+                print(f"❌ Batch failed: {e}")
+                for job in jobs:
+                    if not job.done:
+                        job.finish('failed', error=str(e))
+
+            # Long-running: recycle leaking pipeline state in process
+            try:
+                _, used_percent = self.generator._get_memory_info()
+                if not self.generator._check_memory_growth() and used_percent > 85:
+                    self.generator._force_memory_cleanup()
+            except Exception as e:
+                print(f"⚠️  Memory check failed: {e}")
+
+    def _run_batch(self, jobs):
+        """Generate and save every candidate of a batch of jobs, then finish them."""
+        # Flatten jobs into (job, prompt, seed) work items
+        items = []
+        for job in jobs:
+            job.status = 'running'
+            job.add_event('started', batch_jobs=[j.id for j in jobs])
+            prompt = self.generator.create_prompt(self.radicals[job.radical])
+            items.extend((job, prompt, seed) for seed in job.seeds)
+
+        start_time = time.time()
+        for chunk_start in range(0, len(items), self.max_batch):
+            chunk = items[chunk_start:chunk_start + self.max_batch]
+            try:
+                outputs = self.generator.generate_batch([prompt for _, prompt, _ in chunk],
+                                                        [seed for _, _, seed in chunk])
+            except Exception as e:
+                print(f"❌ Batch failed: {e}")
+                outputs = [(None, seed) for _, _, seed in chunk]
+
+            for (job, _, requested_seed), (image, seed) in zip(chunk, outputs):
+                if image is None:
+                    job.add_event('candidate_failed', seed=requested_seed)
+                    continue
+                try:
+                    result = self._save_candidate(job.radical, image, seed)
+                except Exception as e:
+                    print(f"❌ Could not save radical {job.radical} seed {seed}: {e}")
+                    job.add_event('candidate_failed', seed=seed, error=str(e))
+                    continue
+                job.results.append(result)
+                job.add_event('candidate', index=len(job.results), total=job.candidates, **result)
+
+        for job in jobs:
+            job.finish('done' if job.results else 'failed')
+        print(f"✅ Batch of {len(items)} images for {len(jobs)} job(s) in {time.time() - start_time:.1f}s")
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over the GenerationService attached to the server."""
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _get_job(self, job_id):
+        job = self.server.service.jobs.get(job_id)
+        if job is None:
+            self._send_json(404, {'error': f'Unknown job: {job_id}'})
+        return job
+
+    def do_GET(self):
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+        service = self.server.service
+
+        if parts == ['health']:
+            self._send_json(200, {
+                'model': service.generator.model_id,
+                'device': service.generator.device,
+                'queued_jobs': service.queue.qsize(),
+                'max_batch': service.max_batch
+            })
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self._get_job(parts[1])
+            if job:
+                self._send_json(200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+            job = self._get_job(parts[1])
+            if job:
+                self._stream_events(job)
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path.split('?')[0].rstrip('/') != '/jobs':
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            job = self.server.service.submit(
+                radical=int(request['radical']),
+                candidates=int(request.get('candidates', 1)),
+                seeds=request.get('seeds'),
+                priority=int(request.get('priority', 0))
+            )
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        self._send_json(202, job.to_dict())
+
+    def _stream_events(self, job):
+        """Write events as JSON lines as they happen; the body ends when the job finishes."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        sent = 0
+        try:
+            while True:
+                with job.condition:
+                    while sent == len(job.events) and not job.done:
+                        job.condition.wait(timeout=15)
+                    pending = job.events[sent:]
+                    finished = job.done
+                for event in pending:
+                    self.wfile.write((json.dumps(event) + '\n').encode('utf-8'))
+                self.wfile.flush()
+                sent += len(pending)
+                if finished and sent == len(job.events):
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Radical Generation Service - keep a pipeline loaded and serve regeneration jobs',
+        epilog='Examples:\n'
+               '  %(prog)s --model tiny-sd\n'
+               '  %(prog)s --model dreamlike --port 3002 --max-batch 2\n'
+               '  curl -X POST localhost:3002/jobs -d \'{"radical": 85, "candidates": 4}\'',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--model', '-m', type=str, default='tiny-sd', choices=sorted(MODEL_CONFIGS),
+                        help='Model to keep loaded (default: tiny-sd)')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Interface to bind (default: 127.0.0.1, local only)')
+    parser.add_argument('--port', '-p', type=int, default=3002,
+                        help='Port to listen on (default: 3002)')
+    parser.add_argument('--max-batch', '-b', type=int, default=4,
+                        help='Maximum images per pipeline call (default: 4)')
+    parser.add_argument('--output-root', default=str(DEFAULT_OUTPUT_ROOT),
+                        help=f'Folder that receives generated-* candidate folders (default: {DEFAULT_OUTPUT_ROOT})')
+
+    args = parser.parse_args()
+    config = MODEL_CONFIGS[args.model]
+    from radical_engine import M4OptimizedRadicalGenerator
+
+    print(f"🎨 Model: {config['description']}")
+    generator = M4OptimizedRadicalGenerator(
+        model_id=config['model_id'],
+        delay_between_batches=config['delay'],
+        output_dir=args.output_root,
+        scheduler=config.get('scheduler')
+    )
+    if not generator.initialize_pipeline():
+        return False
+
+    radicals = generator.load_all_radicals()
+    if not radicals:
+        print("❌ No radicals found")
+        return False
+
+    service = GenerationService(generator, radicals, max_batch=args.max_batch)
+    service.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), ServiceRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+
+    print(f"🚀 Generation service running on http://{args.host}:{args.port}")
+    print(f"📁 Candidates saved under: {generator.output_dir}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Service stopped")
+    finally:
+        server.server_close()
+    return True
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Perceptual Image Index
+======================
+
+Hashes every generated candidate PNG with a 64-bit dHash and pHash (computed with
+NumPy over batches of images) and keeps them in an incremental on-disk index keyed
+by path, mtime and size, so re-indexing after a new run only hashes the new files.
+
+Near-duplicate queries go through a multi-index Hamming bit-index: each hash is
+split into (distance + 1) bands, so by the pigeonhole principle any hash within
+the distance shares at least one band exactly with the query. Only those bucket
+candidates get an exact popcount check.
+
+`index` also writes perceptual_clusters.json into the candidates folder, which the
+radical-selector server uses to collapse near-identical candidates.
+
+Usage:
+    python image_index.py index
+    python image_index.py near ../../_data/assets/img/radical/generated-tiny-sd-1a2b3c4d/radical_085.png
+    python image_index.py clusters 85 --distance 8
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Where radical-selector reads generated-* candidate folders (relative to scripts/img/)
+DEFAULT_ROOT = Path('../../_data/assets/img/radical')
+INDEX_FILE = Path('.cache/perceptual_index.json')
+CLUSTERS_FILENAME = 'perceptual_clusters.json'
+INDEX_VERSION = 1
+
+HASH_TYPES = ('phash', 'dhash')
+DEFAULT_DISTANCE = 6      # Of 64 bits; candidates this close look the same at selector size
+PHASH_SIZE = 32           # pHash takes the low 8x8 frequencies of a 32x32 DCT
+BATCH_SIZE = 64
+
+# Bits set in each byte value, for vectorised popcount of uint64 hashes
+POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+# =============================================================================
+# HASHING
+# =============================================================================
+
+def dct_matrix(size):
+    """Orthonormal DCT-II basis, so coefficients = D @ block @ D.T."""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+DCT_MATRIX = dct_matrix(PHASH_SIZE)
+
+def pack_hashes(bits):
+    """(N, 64) booleans → N uint64 hashes, most significant bit first."""
+    return np.packbits(bits, axis=1).view('>u8').ravel().astype(np.uint64)
+
+def dhash_batch(pixels):
+    """Difference hash of (N, 8, 9) grayscale thumbnails: is each pixel brighter than its left neighbour."""
+    return pack_hashes((pixels[:, :, 1:] > pixels[:, :, :-1]).reshape(len(pixels), 64))
+
+def phash_batch(pixels):
+    """DCT hash of (N, 32, 32) grayscale thumbnails: low frequencies above their median (DC term excluded)."""
+    coefficients = np.einsum('ij,njk,lk->nil', DCT_MATRIX, pixels, DCT_MATRIX, optimize=True)
+    low = coefficients[:, :8, :8].reshape(len(pixels), 64)
+    median = np.median(low[:, 1:], axis=1)
+    return pack_hashes(low > median[:, None])
+
+def load_thumbnails(path):
+    """Decode an image once and return its dHash and pHash grayscale thumbnails."""
+    with Image.open(path) as image:
+        gray = image.convert('L')
+        small = np.asarray(gray.resize((9, 8), Image.Resampling.LANCZOS), dtype=np.float32)
+        large = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.LANCZOS), dtype=np.float32)
+    return small, large
+
+def hash_files(paths, jobs=None):
+    """dHash and pHash (uint64 arrays) for a list of files, decoding in threads and hashing per batch."""
+    dhashes, phashes = [], []
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        for start in range(0, len(paths), BATCH_SIZE):
+            thumbnails = list(executor.map(load_thumbnails, paths[start:start + BATCH_SIZE]))
+            dhashes.append(dhash_batch(np.stack([small for small, _ in thumbnails])))
+            phashes.append(phash_batch(np.stack([large for _, large in thumbnails])))
+    if not paths:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64)
+    return np.concatenate(dhashes), np.concatenate(phashes)
+
+def hamming_distances(hashes, value):
+    """Bit distance between every hash and one value."""
+    xor = np.bitwise_xor(hashes, np.uint64(value))
+    return POPCOUNT_TABLE[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+# =============================================================================
+# BIT-INDEX
+# =============================================================================
+
+class HammingIndex:
+    """Multi-index hashing over 64-bit hashes for radius queries up to max_distance."""
+
+    def __init__(self, hashes, max_distance=DEFAULT_DISTANCE):
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.max_distance = max_distance
+
+        # max_distance + 1 bands of (nearly) equal width
+        band_count = min(64, max_distance + 1)
+        edges = np.linspace(0, 64, band_count + 1).astype(int)
+        self.bands = [(int(start), int(end - start)) for start, end in zip(edges[:-1], edges[1:])]
+        self.tables = []
+        for shift, width in self.bands:
+            keys = self._band_values(self.hashes, shift, width)
+            order = np.argsort(keys, kind='stable')
+            unique, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+            self.tables.append({int(key): order[start:start + count]
+                                for key, start, count in zip(unique, starts, counts)})
+
+    @staticmethod
+    def _band_values(hashes, shift, width):
+        mask = np.uint64((1 << width) - 1)
+        return (hashes >> np.uint64(shift)) & mask
+
+    def query(self, value, max_distance=None):
+        """(position, distance) of every hash within max_distance of value, closest first."""
+        max_distance = self.max_distance if max_distance is None else max_distance
+        if max_distance > self.max_distance:
+            raise ValueError(f"Index built for distance <= {self.max_distance}")
+        value = np.array([value], dtype=np.uint64)
+
+        candidates = [self.tables[band].get(int(self._band_values(value, shift, width)[0]))
+                      for band, (shift, width) in enumerate(self.bands)]
+        candidates = [positions for positions in candidates if positions is not None]
+        if not candidates:
+            return []
+
+        positions = np.unique(np.concatenate(candidates))
+        distances = hamming_distances(self.hashes[positions], value[0])
+        close = distances <= max_distance
+        order = np.argsort(distances[close], kind='stable')
+        return [(int(position), int(distance))
+                for position, distance in zip(positions[close][order], distances[close][order])]
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+def load_index(root):
+    """Cached hashes for root, or an empty index if missing, stale or for another root."""
+    if INDEX_FILE.exists():
+        try:
+            with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION and index.get('root') == str(Path(root).resolve()):
+                return index
+        except (OSError, ValueError):
+            pass
+    return {'version': INDEX_VERSION, 'root': str(Path(root).resolve()), 'entries': {}}
+
+def save_index(index):
+    INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = INDEX_FILE.with_suffix('.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(temp_file, INDEX_FILE)
+
+def update_index(root, jobs=None):
+    """
+    Bring the index up to date with the generated-*/*.png files under root.
+
+    Files whose mtime and size match the index keep their hashes; only new or
+    changed files are decoded. Returns (index, stats).
+    """
+    root = Path(root)
+    index = load_index(root)
+    entries = index['entries']
+
+    current = {}
+    for path in sorted(root.glob('generated-*/*.png')):
+        stat = path.stat()
+        current[path.relative_to(root).as_posix()] = (stat.st_mtime, stat.st_size)
+
+    stale = [key for key, (mtime, size) in current.items()
+             if key not in entries or entries[key]['mtime'] != mtime or entries[key]['size'] != size]
+    removed = [key for key in entries if key not in current]
+    for key in removed:
+        del entries[key]
+
+    start_time = time.time()
+    dhashes, phashes = hash_files([root / key for key in stale], jobs)
+    for key, dhash, phash in zip(stale, dhashes, phashes):
+        mtime, size = current[key]
+        entries[key] = {'mtime': mtime, 'size': size, 'dhash': f"{int(dhash):016x}", 'phash': f"{int(phash):016x}"}
+
+    index['updated_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    save_index(index)
+    return index, {'files': len(current), 'hashed': len(stale), 'removed': len(removed),
+                   'seconds': time.time() - start_time}
+
+def index_arrays(index, hash_type):
+    """Keys and uint64 hashes of every indexed file."""
+    keys = sorted(index['entries'])
+    hashes = np.array([int(index['entries'][key][hash_type], 16) for key in keys], dtype=np.uint64)
+    return keys, hashes
+
+# =============================================================================
+# QUERIES
+# =============================================================================
+
+def find_near_duplicates(index, root, path, hash_type='phash', max_distance=DEFAULT_DISTANCE):
+    """Indexed files within max_distance of path (which need not be indexed itself)."""
+    path = Path(path).resolve()
+    root = Path(root).resolve()
+    key = path.relative_to(root).as_posix() if path.is_relative_to(root) else None
+    if key in index['entries']:
+        value = int(index['entries'][key][hash_type], 16)
+    else:
+        dhashes, phashes = hash_files([Path(path)])
+        value = int((dhashes if hash_type == 'dhash' else phashes)[0])
+
+    keys, hashes = index_arrays(index, hash_type)
+    matches = HammingIndex(hashes, max_distance).query(value)
+    return [(keys[position], distance) for position, distance in matches if keys[position] != key]
+
+def cluster_keys(keys, hashes, max_distance=DEFAULT_DISTANCE):
+    """Connected components of the 'within max_distance' graph (union-find), largest first."""
+    parent = list(range(len(keys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    bit_index = HammingIndex(hashes, max_distance)
+    for i, value in enumerate(hashes):
+        for j, _ in bit_index.query(value):
+            parent[find(j)] = find(i)
+
+    clusters = {}
+    for i, key in enumerate(keys):
+        clusters.setdefault(find(i), []).append(key)
+    return sorted(clusters.values(), key=lambda members: (-len(members), members[0]))
+
+def radical_clusters(index, radical_number, hash_type='phash', max_distance=DEFAULT_DISTANCE):
+    """Clusters of near-identical candidates for one radical across all generated-* folders."""
+    filename = f"radical_{radical_number:03d}.png"
+    keys, hashes = index_arrays(index, hash_type)
+    selected = [i for i, key in enumerate(keys) if key.endswith('/' + filename)]
+    return cluster_keys([keys[i] for i in selected], hashes[selected], max_distance)
+
+def write_selector_clusters(index, root, hash_type='phash', max_distance=DEFAULT_DISTANCE):
+    """Write {radical: [[folder/file, ...], ...]} (clusters of 2+ only) for the selector server."""
+    keys, hashes = index_arrays(index, hash_type)
+    by_radical = {}
+    for i, key in enumerate(keys):
+        name = key.rsplit('/', 1)[-1]
+        if name.startswith('radical_') and name[8:11].isdigit():
+            by_radical.setdefault(int(name[8:11]), []).append(i)
+
+    clusters = {}
+    for number, positions in sorted(by_radical.items()):
+        groups = [group for group in cluster_keys([keys[i] for i in positions], hashes[positions], max_distance)
+                  if len(group) > 1]
+        if groups:
+            clusters[str(number)] = groups
+
+    output_file = Path(root) / CLUSTERS_FILENAME
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({'hash': hash_type, 'distance': max_distance, 'radicals': clusters}, f, indent=1)
+    return output_file, sum(len(group) - 1 for groups in clusters.values() for group in groups)
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Perceptual hash index of generated radical candidates',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python image_index.py index
+    python image_index.py near <candidate.png> --distance 10
+    python image_index.py clusters 85
+    python image_index.py clusters 85 --hash dhash --json
+        """)
+    # Shared options, accepted after any subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--root', default=str(DEFAULT_ROOT),
+                        help=f'Folder containing generated-* candidate folders (default: {DEFAULT_ROOT})')
+    common.add_argument('--hash', choices=HASH_TYPES, default='phash', help='Hash used for queries (default: phash)')
+    common.add_argument('-d', '--distance', type=int, default=DEFAULT_DISTANCE,
+                        help=f'Maximum Hamming distance of near-duplicates, out of 64 bits (default: {DEFAULT_DISTANCE})')
+    common.add_argument('-j', '--jobs', type=int, default=None, help='Decoding threads (default: CPU count)')
+    common.add_argument('--json', action='store_true', help='Print query results as JSON')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('index', parents=[common],
+                          help='Hash new and changed candidates and write perceptual_clusters.json')
+    near_parser = subparsers.add_parser('near', parents=[common], help='Near-duplicates of one image')
+    near_parser.add_argument('image', help='Image to look up (indexed or not)')
+    clusters_parser = subparsers.add_parser('clusters', parents=[common], help='Cluster the candidates of one radical')
+    clusters_parser.add_argument('radical', type=int, help='Radical number (1-214)')
+
+    args = parser.parse_args()
+    if not 0 <= args.distance < 32:
+        parser.error('--distance must be between 0 and 31')
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"❌ Candidates folder not found: {root}")
+        sys.exit(1)
+
+    # Every command works on an up-to-date index; unchanged files are not decoded again
+    index, stats = update_index(root, args.jobs)
+
+    if args.command == 'index':
+        print("Perceptual Image Index")
+        print("=" * 70)
+        print(f"🖼️  {stats['files']} candidates, {stats['hashed']} hashed in {stats['seconds']:.1f}s, "
+              f"{stats['removed']} removed")
+        clusters_file, duplicates = write_selector_clusters(index, root, args.hash, args.distance)
+        print(f"🔗 {duplicates} near-duplicate candidates (≤{args.distance} bits {args.hash})")
+        print(f"📋 Index: {INDEX_FILE}")
+        print(f"📋 Clusters for radical-selector: {clusters_file}")
+
+    elif args.command == 'near':
+        matches = find_near_duplicates(index, root, args.image, args.hash, args.distance)
+        if args.json:
+            print(json.dumps([{'path': key, 'distance': distance} for key, distance in matches], indent=2))
+        else:
+            print(f"🔍 {len(matches)} near-duplicates of {args.image} (≤{args.distance} bits {args.hash})")
+            for key, distance in matches:
+                print(f"   {distance:2d}  {key}")
+
+    else:
+        clusters = radical_clusters(index, args.radical, args.hash, args.distance)
+        if args.json:
+            print(json.dumps(clusters, indent=2))
+        else:
+            candidates = sum(len(cluster) for cluster in clusters)
+            print(f"🧩 Radical {args.radical}: {candidates} candidates in {len(clusters)} clusters "
+                  f"(≤{args.distance} bits {args.hash})")
+            for cluster in clusters:
+                print(f"   [{len(cluster)}] {', '.join(cluster)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Local Model Store
+=================
+
+Keeps each diffusion pipeline as a local safetensors copy with a checksum index, so
+generators load without touching the network. Safetensors files are memory-mapped,
+so worker processes can share the weights through the OS page cache, as long as
+nothing converts or re-lays them out after loading (sharded workers skip
+channels_last for that reason; their PSS is printed at the end of the run).
+
+Models are imported once (downloaded or taken from the Hugging Face cache), saved with
+safe serialization, hashed, and recorded in index.json. Loading only checks file sizes;
+`verify` re-hashes everything against the index.
+
+Store location: --store, else $RADICAL_MODEL_STORE, else ~/.cache/radical-model-store
+
+Usage:
+    python model_store.py add tiny-sd
+    python model_store.py add dreamlike --dtype float16
+    python model_store.py list
+    python model_store.py verify
+    python model_store.py remove tiny-sd
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+
+INDEX_FILENAME = 'index.json'
+DEFAULT_STORE = Path.home() / '.cache' / 'radical-model-store'
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+def get_store_root(store=None):
+    """Store directory from the argument, $RADICAL_MODEL_STORE or the default."""
+    return Path(store or os.environ.get('RADICAL_MODEL_STORE') or DEFAULT_STORE).expanduser()
+
+def load_index(store_root):
+    """Load the store index ({'models': {model_id: entry}})."""
+    index_path = store_root / INDEX_FILENAME
+    if not index_path.exists():
+        return {'models': {}}
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️  Unreadable index, treating store as empty: {index_path}")
+        return {'models': {}}
+
+def save_index(store_root, index):
+    """Write the index atomically so a crash never leaves it half-written."""
+    store_root.mkdir(parents=True, exist_ok=True)
+    temp_path = store_root / f"{INDEX_FILENAME}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    os.replace(temp_path, store_root / INDEX_FILENAME)
+
+def file_digest(path):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_tree(model_dir):
+    """Checksum and size of every file under a saved pipeline directory."""
+    files = {}
+    for path in sorted(model_dir.rglob('*')):
+        if path.is_file():
+            files[path.relative_to(model_dir).as_posix()] = {
+                'sha256': file_digest(path),
+                'size': path.stat().st_size
+            }
+    return files
+
+def lookup_model(model_id, dtype=None, store=None):
+    """
+    Path of a stored pipeline, or None if it is not in the store.
+
+    Only existence and sizes are checked here (cheap enough for every start);
+    full checksums are verified at import time and by `verify`. If `dtype`
+    differs from the stored dtype the weights still load, but are copied
+    into private memory instead of staying mapped from the page cache.
+    """
+    store_root = get_store_root(store)
+    entry = load_index(store_root).get('models', {}).get(model_id)
+    if not entry:
+        return None
+
+    model_dir = store_root / entry['path']
+    for relative_path, info in entry['files'].items():
+        path = model_dir / relative_path
+        if not path.exists() or path.stat().st_size != info['size']:
+            print(f"⚠️  Stored copy of {model_id} is incomplete ({relative_path}), "
+                  f"run: python model_store.py add {model_id} --force")
+            return None
+
+    if dtype and entry['dtype'] != dtype:
+        print(f"⚠️  Stored {model_id} is {entry['dtype']}, loading as {dtype} copies the weights "
+              f"(re-import with --dtype {dtype} to keep them memory-mapped)")
+    return model_dir
+
+# =============================================================================
+# COMMANDS
+# =============================================================================
+
+def resolve_model_id(name):
+    """Accept a generate_radical_images.py model key or a Hugging Face model id."""
+    from radical_config import MODEL_CONFIGS
+    return MODEL_CONFIGS[name]['model_id'] if name in MODEL_CONFIGS else name
+
+def add_model(store_root, name, dtype='float32', force=False):
+    """Import a pipeline into the store as safetensors and record its checksums."""
+    import torch
+    from diffusers import StableDiffusionPipeline, DiffusionPipeline
+
+    model_id = resolve_model_id(name)
+    index = load_index(store_root)
+    if model_id in index['models'] and not force:
+        print(f"⏭️  {model_id} already stored (use --force to re-import)")
+        return True
+
+    print(f"📦 Importing {model_id} ({dtype})...")
+    start_time = time.time()
+    torch_dtype = getattr(torch, dtype)
+    try:
+        # Same component set generate_radical_images.py loads: no safety checker
+        if "flux" in model_id.lower():
+            pipe = DiffusionPipeline.from_pretrained(model_id, torch_dtype=torch_dtype, token=os.getenv('HF_TOKEN'))
+        else:
+            pipe = StableDiffusionPipeline.from_pretrained(
+                model_id,
+                torch_dtype=torch_dtype,
+                token=os.getenv('HF_TOKEN'),
+                safety_checker=None,
+                requires_safety_checker=False
+            )
+    except Exception as e:
+        print(f"❌ Could not load {model_id}: {e}")
+        return False
+
+    folder_name = model_id.replace('/', '--')
+    final_dir = store_root / folder_name
+    temp_dir = store_root / f"{folder_name}.partial"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    pipe.save_pretrained(temp_dir, safe_serialization=True)
+    del pipe
+
+    print("🔑 Hashing weights...")
+    files = hash_tree(temp_dir)
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(temp_dir, final_dir)
+
+    total_bytes = sum(info['size'] for info in files.values())
+    index['models'][model_id] = {
+        'path': folder_name,
+        'dtype': dtype,
+        'files': files,
+        'total_bytes': total_bytes,
+        'added_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'verified_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    save_index(store_root, index)
+
+    print(f"✅ Stored {model_id}: {len(files)} files, {total_bytes / 1024**3:.2f}GB in {time.time() - start_time:.0f}s")
+    print(f"📁 {final_dir}")
+    return True
+
+def verify_models(store_root, names=None):
+    """Re-hash stored files against the index; returns True if everything matches."""
+    index = load_index(store_root)
+    model_ids = [resolve_model_id(name) for name in names] if names else list(index['models'])
+    all_ok = True
+
+    for model_id in model_ids:
+        entry = index['models'].get(model_id)
+        if not entry:
+            print(f"❌ {model_id}: not in store")
+            all_ok = False
+            continue
+
+        model_dir = store_root / entry['path']
+        bad = []
+        for relative_path, info in entry['files'].items():
+            path = model_dir / relative_path
+            if not path.exists() or path.stat().st_size != info['size'] or file_digest(path) != info['sha256']:
+                bad.append(relative_path)
+
+        if bad:
+            all_ok = False
+            print(f"❌ {model_id}: {len(bad)} corrupted or missing files: {bad[:5]}")
+            print(f"💡 Re-import with: python model_store.py add {model_id} --force")
+        else:
+            entry['verified_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+            print(f"✅ {model_id}: {len(entry['files'])} files OK")
+
+    save_index(store_root, index)
+    return all_ok
+
+def list_models(store_root):
+    """Print the stored pipelines."""
+    models = load_index(store_root)['models']
+    if not models:
+        print(f"📭 Store is empty: {store_root}")
+        return
+    print(f"🗄️  {store_root}")
+    for model_id, entry in sorted(models.items()):
+        print(f"   {model_id:<40} {entry['dtype']:<9} {entry['total_bytes'] / 1024**3:6.2f}GB  "
+              f"verified {entry['verified_at']}")
+
+def remove_model(store_root, name):
+    """Delete a stored pipeline and its index entry."""
+    model_id = resolve_model_id(name)
+    index = load_index(store_root)
+    entry = index['models'].pop(model_id, None)
+    if not entry:
+        print(f"❌ {model_id}: not in store")
+        return False
+    shutil.rmtree(store_root / entry['path'], ignore_errors=True)
+    save_index(store_root, index)
+    print(f"🗑️  Removed {model_id}")
+    return True
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Local safetensors model store for the radical image generators',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python model_store.py add tiny-sd
+    python model_store.py add dreamlike --dtype float16
+    python model_store.py list
+    python model_store.py verify
+    python generate_radical_images.py --model tiny-sd --all --offline
+        """)
+    parser.add_argument('--store', default=None,
+                        help=f'Store directory (default: $RADICAL_MODEL_STORE or {DEFAULT_STORE})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = subparsers.add_parser('add', help='Import models into the store')
+    add_parser.add_argument('models', nargs='+', help='Model keys (tiny-sd, dreamlike, ...) or Hugging Face ids')
+    add_parser.add_argument('--dtype', choices=['float32', 'float16', 'bfloat16'], default='float32',
+                            help='Stored weight dtype; match the device dtype so loads stay memory-mapped (default: float32)')
+    add_parser.add_argument('-f', '--force', action='store_true', help='Re-import even if already stored')
+
+    verify_parser = subparsers.add_parser('verify', help='Re-hash stored files against the index')
+    verify_parser.add_argument('models', nargs='*', help='Models to verify (default: all)')
+
+    subparsers.add_parser('list', help='List stored models')
+
+    remove_parser = subparsers.add_parser('remove', help='Delete stored models')
+    remove_parser.add_argument('models', nargs='+', help='Model keys or Hugging Face ids')
+
+    args = parser.parse_args()
+    store_root = get_store_root(args.store)
+
+    print("Local Model Store")
+    print("=" * 70)
+
+    if args.command == 'add':
+        ok = all([add_model(store_root, name, args.dtype, args.force) for name in args.models])
+    elif args.command == 'verify':
+        ok = verify_models(store_root, args.models)
+    elif args.command == 'remove':
+        ok = all([remove_model(store_root, name) for name in args.models])
+    else:
+        list_models(store_root)
+        ok = True
+
+    if not ok:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Stroke-Order GIF Optimizer
+==========================
+
+Re-encodes the stroke-order GIFs in assets/img/gif and writes, for each one:
+
+    {n}.gif         optimised GIF (or the original bytes, if they are smaller)
+    {n}.webp        animated WebP, lossless by default
+    {n}_poster.png  first frame, to show until the animation plays
+
+Usage:
+    python optimize_gifs.py
+    python optimize_gifs.py ../../assets/img/gif -o optimized_gifs -j 8
+    python optimize_gifs.py --webp-quality 90
+
+Features:
+- Identical consecutive frames merged, their durations added up
+- One palette shared by every frame (exact when the GIF has at most 255 colours)
+- Delta frames cropped to the changed box, unchanged pixels made transparent
+- Round-trip check: the new GIF is decoded again and kept only if every frame matches
+  (timing only, when the palette had to be quantised)
+- Parallel processing with a per-file size report (size_report.json)
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+DEFAULT_INPUT = '../../assets/img/gif'
+DEFAULT_OUTPUT = 'optimized_gifs'
+REPORT_FILENAME = 'size_report.json'
+
+MAX_COLORS = 255          # GIF palettes hold 256 entries; one is kept for transparency
+ALPHA_THRESHOLD = 128     # GIF transparency is on/off
+TRANSPARENT = 1 << 24     # Packed colour key of transparent pixels, outside the RGB range
+
+WEBP_METHOD = 6           # Slowest, smallest libwebp encoding; the GIFs are small
+
+# =============================================================================
+# FRAMES
+# =============================================================================
+
+def decode_frames(source):
+    """
+    Composited RGBA frames of a GIF (file path or file object) with their durations.
+
+    Returns:
+        tuple: (frames as (H, W, 4) uint8 arrays, durations in ms, loop count or None)
+    """
+    frames, durations = [], []
+    with Image.open(source) as image:
+        loop = image.info.get('loop')
+        for frame in ImageSequence.Iterator(image):
+            rgba = np.array(frame.convert('RGBA'))
+            # GIF transparency is binary: normalise hidden pixels so equal frames compare equal
+            hidden = rgba[..., 3] < ALPHA_THRESHOLD
+            rgba[hidden] = 0
+            rgba[~hidden, 3] = 255
+            frames.append(rgba)
+            durations.append(frame.info.get('duration', 100))
+    return frames, durations, loop
+
+def merge_duplicate_frames(frames, durations):
+    """Drop frames identical to the one before, adding their duration to it."""
+    kept, kept_durations = [frames[0]], [durations[0]]
+    for frame, duration in zip(frames[1:], durations[1:]):
+        if np.array_equal(frame, kept[-1]):
+            kept_durations[-1] += duration
+        else:
+            kept.append(frame)
+            kept_durations.append(duration)
+    return kept, kept_durations
+
+def build_shared_palette(frames):
+    """
+    One palette for every frame.
+
+    When all frames together use at most MAX_COLORS colours the palette is exact;
+    otherwise they are quantised together (median cut), so the palette is still
+    shared and stable across frames.
+
+    Returns:
+        tuple: ((N, H, W) uint8 palette indices, flat RGB palette, transparency index or None, exact)
+    """
+    stack = np.stack(frames)
+    hidden = stack[..., 3] == 0
+    rgb = stack[..., :3].astype(np.uint32)
+    packed = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    packed[hidden] = TRANSPARENT
+
+    colors, inverse = np.unique(packed, return_inverse=True)
+    has_transparency = bool(colors[-1] == TRANSPARENT)
+    visible = colors[:-1] if has_transparency else colors
+
+    if len(visible) <= MAX_COLORS:
+        indices = inverse.reshape(packed.shape).astype(np.uint8)
+        palette = np.stack([(visible >> 16) & 255, (visible >> 8) & 255, visible & 255], axis=1)
+        exact = True
+    else:
+        # Quantise the visible pixels of all frames at once, as one tall image
+        tall = Image.fromarray(stack[..., :3].reshape(-1, stack.shape[2], 3), 'RGB')
+        quantised = tall.quantize(MAX_COLORS, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+        indices = np.asarray(quantised).reshape(packed.shape).copy()
+        palette = np.asarray(quantised.getpalette()[:MAX_COLORS * 3]).reshape(-1, 3)
+        exact = False
+
+    transparency = None
+    if has_transparency:
+        transparency = len(palette)
+        indices[hidden] = transparency
+        palette = np.vstack([palette, [[0, 0, 0]]])
+    return indices, palette.astype(np.uint8).ravel().tolist(), transparency, exact
+
+def palette_image(indices, palette, transparency):
+    image = Image.fromarray(indices, 'P')
+    image.putpalette(palette)
+    if transparency is not None:
+        image.info['transparency'] = transparency
+    return image
+
+# =============================================================================
+# ENCODING
+# =============================================================================
+
+def encode_gif(indices, palette, transparency, durations, loop):
+    """
+    GIF bytes of palette-index frames.
+
+    Pillow's writer does the delta work: with optimize=True and disposal 1 it
+    crops every frame to the box that changed and fills unchanged pixels inside
+    it with the transparent index, which compresses to almost nothing.
+    """
+    images = [palette_image(frame, palette, transparency) for frame in indices]
+    params = {'save_all': True, 'append_images': images[1:], 'duration': durations,
+              'disposal': 1, 'optimize': True}
+    if loop is not None:
+        params['loop'] = loop
+    if transparency is not None:
+        params['transparency'] = transparency
+    buffer = io.BytesIO()
+    images[0].save(buffer, 'GIF', **params)
+    return buffer.getvalue()
+
+def encode_webp(frames, durations, loop, quality=None):
+    """
+    Animated WebP bytes. libwebp stores sub-frame rectangles itself.
+
+    Lossless by default. With a quality, each frame is encoded lossy or lossless,
+    whichever is smaller.
+    """
+    images = [Image.fromarray(frame, 'RGBA') for frame in frames]
+    params = {'save_all': True, 'append_images': images[1:], 'duration': durations,
+              'loop': 1 if loop is None else loop, 'method': WEBP_METHOD, 'minimize_size': True}
+    if quality is None:
+        params['lossless'] = True
+    else:
+        params.update(quality=quality, allow_mixed=True)
+    buffer = io.BytesIO()
+    images[0].save(buffer, 'WEBP', **params)
+    return buffer.getvalue()
+
+def encode_poster(indices, palette, transparency):
+    """First frame as a palette PNG."""
+    buffer = io.BytesIO()
+    params = {'optimize': True}
+    if transparency is not None:
+        params['transparency'] = transparency
+    palette_image(indices, palette, transparency).save(buffer, 'PNG', **params)
+    return buffer.getvalue()
+
+def write_bytes(path, data):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+# =============================================================================
+# FILE PROCESSING
+# =============================================================================
+
+def optimize_gif(input_path, output_folder, webp_quality=None):
+    """
+    Write the optimised GIF, animated WebP and poster PNG of one GIF.
+
+    Args:
+        input_path (str): Path to the input GIF
+        output_folder (str): Folder for {n}.gif, {n}.webp and {n}_poster.png
+        webp_quality (int): Lossy WebP quality, or None for lossless
+
+    Returns:
+        dict: File report with frame counts, sizes and error (if any)
+    """
+    name = Path(input_path).stem
+    report = {'file': os.path.basename(input_path), 'original_size': 0, 'frames': 0, 'kept_frames': 0,
+              'colors_exact': None, 'gif_size': 0, 'gif_kept_original': False, 'webp_size': 0,
+              'poster_size': 0, 'success': False, 'error': None}
+    try:
+        with open(input_path, 'rb') as f:
+            original = f.read()
+        report['original_size'] = len(original)
+
+        frames, durations, loop = decode_frames(io.BytesIO(original))
+        report['frames'] = len(frames)
+        frames, durations = merge_duplicate_frames(frames, durations)
+        report['kept_frames'] = len(frames)
+
+        indices, palette, transparency, exact = build_shared_palette(frames)
+        report['colors_exact'] = exact
+
+        gif = encode_gif(indices, palette, transparency, durations, loop)
+        if len(gif) >= len(original) or not gif_matches(gif, frames, durations, exact):
+            gif = original
+            report['gif_kept_original'] = True
+        webp = encode_webp(frames, durations, loop, webp_quality)
+        poster = encode_poster(indices[0], palette, transparency)
+
+        output_folder = Path(output_folder)
+        write_bytes(output_folder / f"{name}.gif", gif)
+        write_bytes(output_folder / f"{name}.webp", webp)
+        write_bytes(output_folder / f"{name}_poster.png", poster)
+
+        report.update({'gif_size': len(gif), 'webp_size': len(webp), 'poster_size': len(poster),
+                       'success': True})
+    except Exception as e:
+        report['error'] = str(e)
+    return report
+
+def gif_matches(gif, frames, durations, exact):
+    """Decode the new GIF again: same timing, and the same pixels when the palette was exact."""
+    decoded, decoded_durations, _ = decode_frames(io.BytesIO(gif))
+    if len(decoded) != len(frames) or decoded_durations != durations:
+        return False
+    return not exact or all(np.array_equal(a, b) for a, b in zip(decoded, frames))
+
+def _optimize_task(task):
+    """Process pool entry point."""
+    return optimize_gif(*task)
+
+def process_folder(input_folder, output_folder, webp_quality=None, jobs=None):
+    """
+    Optimise every GIF in input_folder in parallel and write size_report.json.
+
+    Returns:
+        dict: Processing statistics and per-file reports
+    """
+    input_path = Path(input_folder)
+    if not input_path.is_dir():
+        print(f"❌ Input folder does not exist: {input_folder}")
+        return None
+    gif_files = sorted(input_path.glob('*.gif'), key=lambda path: (len(path.stem), path.stem))
+    if not gif_files:
+        print(f"❌ No GIF files found in {input_folder}")
+        return None
+
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    tasks = [(str(gif_file), output_folder, webp_quality) for gif_file in gif_files]
+
+    print(f"Found {len(tasks)} GIF files to optimize")
+    print(f"Output folder: {output_folder}")
+    print(f"WebP: {'lossless' if webp_quality is None else f'quality {webp_quality}'}")
+    print("-" * 70)
+
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        reports = list(executor.map(_optimize_task, tasks, chunksize=4))
+
+    done = [r for r in reports if r['success']]
+    stats = {
+        'total_files': len(reports),
+        'processed': len(done),
+        'failed': len(reports) - len(done),
+        'gif_kept_original': sum(1 for r in done if r['gif_kept_original']),
+        'frames_dropped': sum(r['frames'] - r['kept_frames'] for r in done),
+        'total_original_size': sum(r['original_size'] for r in done),
+        'total_gif_size': sum(r['gif_size'] for r in done),
+        'total_webp_size': sum(r['webp_size'] for r in done),
+        'total_poster_size': sum(r['poster_size'] for r in done),
+        'reports': reports,
+    }
+
+    print(f"  {'file':<10} {'frames':>9} {'original':>10} {'gif':>10} {'webp':>10} {'poster':>8}")
+    for report in reports:
+        if not report['success']:
+            print(f"  ❌ {report['file']}: {report['error']}")
+            continue
+        frames = f"{report['kept_frames']}/{report['frames']}"
+        gif_note = ' =' if report['gif_kept_original'] else ''
+        palette_note = '' if report['colors_exact'] else '  (quantised palette)'
+        print(f"  {report['file']:<10} {frames:>9} {report['original_size']:>10,} {report['gif_size']:>10,}"
+              f" {report['webp_size']:>10,} {report['poster_size']:>8,}{gif_note}{palette_note}")
+
+    with open(Path(output_folder) / REPORT_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=1)
+
+    elapsed_time = time.time() - start_time
+    original = stats['total_original_size']
+    print("\n" + "=" * 70)
+    print("OPTIMIZATION COMPLETE!")
+    print("=" * 70)
+    print(f"Total files: {stats['total_files']}")
+    print(f"Successfully processed: {stats['processed']}")
+    print(f"Failed: {stats['failed']}")
+    print(f"Duplicate frames dropped: {stats['frames_dropped']}")
+    print(f"GIFs kept as they were (re-encoding was not smaller): {stats['gif_kept_original']}")
+    print(f"Processing time: {elapsed_time:.1f} seconds")
+    if original:
+        print(f"\nOriginal GIFs: {original:,} bytes ({original/1024/1024:.2f} MB)")
+        for label, key in (('Optimized GIFs', 'total_gif_size'), ('Animated WebPs', 'total_webp_size'),
+                           ('Posters', 'total_poster_size')):
+            size = stats[key]
+            print(f"{label + ':':<15} {size:,} bytes ({size/1024/1024:.2f} MB, "
+                  f"{(original - size) / original * 100:.1f}% smaller)")
+
+    print(f"\nOutputs and {REPORT_FILENAME} saved in: {output_folder}")
+    return stats
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Optimise stroke-order GIFs and convert them to animated WebP with a poster frame',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python optimize_gifs.py
+    python optimize_gifs.py ../../assets/img/gif -o optimized_gifs -j 8
+    python optimize_gifs.py --webp-quality 90
+        """)
+    parser.add_argument('input_folder', nargs='?', default=DEFAULT_INPUT,
+                        help=f'Folder of GIFs (default: {DEFAULT_INPUT})')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f'Output folder (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('-q', '--webp-quality', type=int, default=None,
+                        help='WebP quality 0-100 for lossy frames, each frame keeps the smaller of '
+                             'lossy and lossless (default: lossless)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of worker processes (default: CPU count)')
+
+    args = parser.parse_args()
+    if args.webp_quality is not None and not 0 <= args.webp_quality <= 100:
+        parser.error('--webp-quality must be between 0 and 100')
+
+    print("Stroke-Order GIF Optimizer")
+    print("==========================")
+    print("GIF, animated WebP and poster PNG for each stroke-order animation\n")
+
+    stats = process_folder(args.input_folder, args.output, args.webp_quality, args.jobs)
+
+    if stats is None:
+        sys.exit(1)
+    elif stats['failed'] > 0:
+        sys.exit(2)
+    else:
+        print("\n✅ All GIFs optimized successfully!")
+
+if __name__ == '__main__':
+    main()
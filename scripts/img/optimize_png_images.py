@@ -26,6 +26,8 @@ from pathlib import Path
 from PIL import Image, ImageOps
 import time
 
+import profiling
+
 
 def optimize_png_image(input_path, output_path, quality_level=9):
     """
@@ -42,6 +44,8 @@ def optimize_png_image(input_path, output_path, quality_level=9):
     try:
         with Image.open(input_path) as img:
             print(f"Processing: {os.path.basename(input_path)}")
+            with profiling.stage('load'):
+                img.load()
             
             # Get original file size and dimensions
             original_size = os.path.getsize(input_path)
@@ -115,12 +119,14 @@ def optimize_png_image(input_path, output_path, quality_level=9):
                     
                     for param_value in param_list:
                         try:
-                            optimized = method_func(img, param_value)
+                            with profiling.stage('quantise'):
+                                optimized = method_func(img, param_value)
                             
                             # Test file size with different compression for compression method
                             temp_path = str(output_path) + f'.temp_{method_name}_{param_value}'
                             compress_level = param_value if method_name == 'low_compress' else quality_level
-                            optimized.save(temp_path, 'PNG', optimize=True, compress_level=compress_level)
+                            with profiling.stage('encode'):
+                                optimized.save(temp_path, 'PNG', optimize=True, compress_level=compress_level)
                             optimized_size = os.path.getsize(temp_path)
                             os.remove(temp_path)
                             
@@ -164,16 +170,19 @@ def optimize_png_image(input_path, output_path, quality_level=9):
             else:
                 print("  Applying standard PNG optimization")
             
-            # Save with moderate optimization
-            img.save(
-                output_path, 
-                'PNG',
-                optimize=True,  # Enable PIL's built-in optimization
-                compress_level=quality_level,  # Use provided compression level
-                # Remove metadata for smaller size
-                icc_profile=None,
-                exif=b'',
-            )
+            # Save with moderate optimization, replacing output_path rather than writing
+            # into it (it may be hard-linked to other copies by dedup_images.py)
+            with profiling.stage('write'):
+                img.save(
+                    f"{output_path}.tmp", 
+                    'PNG',
+                    optimize=True,  # Enable PIL's built-in optimization
+                    compress_level=quality_level,  # Use provided compression level
+                    # Remove metadata for smaller size
+                    icc_profile=None,
+                    exif=b'',
+                )
+                os.replace(f"{output_path}.tmp", output_path)
             
             # Get new file size
             new_size = os.path.getsize(output_path)
@@ -284,6 +293,7 @@ Examples:
     python optimize_png_images.py ../../assets/img/selected optimized_images
     python optimize_png_images.py -i images/ -o compressed/ -q 9
     python optimize_png_images.py /path/to/pngs /path/to/output --quality 8
+    python optimize_png_images.py images/ out/ --profile cprofile --profile-stages quantise encode
 
 Compression levels:
     1 = Fastest, larger files
@@ -304,6 +314,7 @@ Compression levels:
                        help='Output folder (alternative to positional arg)')
     parser.add_argument('-q', '--quality', type=int, default=9, choices=range(1, 10),
                        help='PNG compression level 1-9 (default: 9 = maximum compression for up to 30% reduction)')
+    profiling.add_arguments(parser)
     
     args = parser.parse_args()
     
@@ -338,4 +349,4 @@ Compression levels:
 
 
 if __name__ == '__main__':
-    main()
+    profiling.run(main)
@@ -0,0 +1,711 @@
+#!/usr/bin/env python3
+"""
+SVG Image Optimizer
+===================
+
+Minifies SVG images without changing how they render.
+
+Usage:
+    python optimize_svg_images.py [input_folder ...] [-o output_folder]
+    python optimize_svg_images.py ../../assets/img/positions -o optimized_svgs
+    python optimize_svg_images.py --help
+
+Features:
+- Editor metadata removal (Sketch, Inkscape, Illustrator, <title>, <desc>, comments)
+- Numeric precision reduction scaled to the viewBox
+- Path data rewriting with merged consecutive commands
+- Default and inherited-redundant attribute removal
+- Parallel processing with a per-file size report
+- Pixel-equivalence check (rasterises before/after at low resolution, needs cairosvg unless --no-verify)
+"""
+
+import os
+import re
+import io
+import sys
+import math
+import argparse
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+
+ET.register_namespace('', SVG_NS)
+ET.register_namespace('xlink', XLINK_NS)
+
+# Namespaces written by editors that browsers ignore
+EDITOR_NAMESPACES = (
+    'http://www.bohemiancoding.com/sketch/ns',
+    'http://www.inkscape.org/namespaces/inkscape',
+    'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd',
+    'http://ns.adobe.com/',
+    'http://purl.org/dc/elements/1.1/',
+    'http://creativecommons.org/ns#',
+    'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+)
+
+# Elements that only carry editor/document metadata
+METADATA_TAGS = {'title', 'desc', 'metadata'}
+
+# Inherited presentation attributes and their initial values
+INHERITED_DEFAULTS = {
+    'fill': '#000000',
+    'fill-rule': 'nonzero',
+    'fill-opacity': '1',
+    'clip-rule': 'nonzero',
+    'stroke': 'none',
+    'stroke-width': '1',
+    'stroke-opacity': '1',
+    'stroke-linecap': 'butt',
+    'stroke-linejoin': 'miter',
+    'stroke-miterlimit': '4',
+    'stroke-dashoffset': '0',
+    'stroke-dasharray': 'none',
+    'visibility': 'visible',
+}
+
+# Non-inherited attributes that can be dropped when they hold their initial value
+NON_INHERITED_DEFAULTS = {
+    'opacity': '1',
+    'display': 'inline',
+    'x': '0',
+    'y': '0',
+}
+
+# Elements whose x/y attributes default to 0 (pattern, mask and filter do not)
+DEFAULT_XY_TAGS = {'rect', 'use', 'image', 'foreignObject'}
+
+# Attributes holding coordinates that get rounded to the viewBox precision
+COORDINATE_ATTRIBUTES = {
+    'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry',
+    'width', 'height', 'stroke-width', 'points', 'viewBox',
+}
+
+# Elements whose text content is significant
+TEXT_TAGS = {'text', 'tspan', 'textPath', 'style', 'script'}
+
+PATH_COMMAND_ARGS = {
+    'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0
+}
+
+NUMBER_PATTERN = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+ID_REFERENCE_PATTERN = re.compile(r'#([A-Za-z_][\w.:-]*)')
+
+# Rasterisation size (px) for the pixel-equivalence check
+VERIFY_SIZE = 64
+# Maximum per-channel difference tolerated on any pixel (anti-aliasing noise)
+VERIFY_TOLERANCE = 48
+# Fraction of pixels allowed to exceed the tolerance
+VERIFY_MAX_CHANGED = 0.005
+
+# Significant digits kept relative to the largest viewBox dimension
+DEFAULT_PRECISION = 4
+
+
+def local_name(name):
+    """Strip the {namespace} prefix from an ElementTree tag or attribute."""
+    return name.rsplit('}', 1)[-1]
+
+
+def namespace_of(name):
+    """Return the namespace URI of an ElementTree tag or attribute."""
+    return name[1:].split('}', 1)[0] if name.startswith('{') else ''
+
+
+def is_editor_name(name):
+    """True if a tag or attribute belongs to an editor namespace."""
+    namespace = namespace_of(name)
+    return any(namespace.startswith(editor) for editor in EDITOR_NAMESPACES)
+
+
+def format_number(value, decimals):
+    """Format a number with at most `decimals` decimals and no redundant characters."""
+    rounded = round(value, decimals)
+    if rounded == 0:
+        return '0'
+    text = f"{rounded:.{decimals}f}" if decimals > 0 else str(int(rounded))
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text.startswith('0.'):
+        text = text[1:]
+    elif text.startswith('-0.'):
+        text = '-' + text[2:]
+    return text
+
+
+def join_numbers(numbers):
+    """Join formatted numbers using the shortest unambiguous separators."""
+    result = ''
+    previous = None
+    for number in numbers:
+        # "-" always starts a new number; ".5" does too when the previous number has a "."
+        if previous is not None and not (number.startswith('-') or (number.startswith('.') and '.' in previous)):
+            result += ' '
+        result += number
+        previous = number
+    return result
+
+
+def get_decimals(root, precision):
+    """Pick the number of decimals so that `precision` significant digits survive."""
+    view_box = root.get('viewBox')
+    size = None
+    if view_box:
+        values = [float(v) for v in NUMBER_PATTERN.findall(view_box)]
+        if len(values) == 4:
+            size = max(values[2], values[3])
+    if size is None:
+        sizes = [float(m.group()) for m in (NUMBER_PATTERN.match(root.get(a, '')) for a in ('width', 'height')) if m]
+        size = max(sizes) if sizes else 100.0
+    magnitude = int(math.floor(math.log10(size))) + 1 if size > 0 else 1
+    return max(0, precision - magnitude)
+
+
+# =============================================================================
+# PATH DATA
+# =============================================================================
+
+def parse_path(data):
+    """
+    Parse SVG path data into (command, [args]) segments.
+    Arc flags are read as single characters so compact forms like "a1 1 0 00 1 1" work.
+    """
+    segments = []
+    position = 0
+    command = None
+    length = len(data)
+
+    def skip_separators(pos):
+        while pos < length and data[pos] in ' \t\r\n,':
+            pos += 1
+        return pos
+
+    while True:
+        position = skip_separators(position)
+        if position >= length:
+            break
+
+        char = data[position]
+        if char.isalpha():
+            command = char
+            position += 1
+            if command in 'Zz':
+                segments.append((command, []))
+                continue
+        elif command is None:
+            raise ValueError(f"Path data must start with a command: {data[:20]!r}")
+        elif command in 'Zz':
+            raise ValueError(f"Unexpected number after close path in {data[:20]!r}")
+
+        arg_count = PATH_COMMAND_ARGS[command.upper()]
+        args = []
+        for index in range(arg_count):
+            position = skip_separators(position)
+            if command in 'Aa' and index in (3, 4):
+                if position >= length or data[position] not in '01':
+                    raise ValueError(f"Invalid arc flag in path data: {data[position:position + 10]!r}")
+                args.append(float(data[position]))
+                position += 1
+                continue
+            match = NUMBER_PATTERN.match(data, position)
+            if not match:
+                raise ValueError(f"Invalid number in path data: {data[position:position + 10]!r}")
+            args.append(float(match.group()))
+            position = match.end()
+        segments.append((command, args))
+
+        # An implicit command after moveto is lineto
+        if command == 'M':
+            command = 'L'
+        elif command == 'm':
+            command = 'l'
+
+    return segments
+
+
+def coordinate_axes(command):
+    """Axis (0=x, 1=y, None=not a coordinate) of each argument of a path command."""
+    upper = command.upper()
+    if upper == 'H':
+        return [0]
+    if upper == 'V':
+        return [1]
+    if upper == 'A':
+        return [None, None, None, None, None, 0, 1]
+    return [0, 1] * (PATH_COMMAND_ARGS[upper] // 2)
+
+
+def round_path(segments, decimals):
+    """
+    Round path coordinates to `decimals` places.
+
+    Relative coordinates are rounded against the already-rounded current point,
+    so rounding errors do not accumulate along long relative paths.
+    """
+    exact = [0.0, 0.0]
+    rounded = [0.0, 0.0]
+    exact_start = [0.0, 0.0]
+    rounded_start = [0.0, 0.0]
+    result = []
+
+    for command, args in segments:
+        if command in 'Zz':
+            exact, rounded = list(exact_start), list(rounded_start)
+            result.append((command, []))
+            continue
+
+        relative = command.islower()
+        axes = coordinate_axes(command)
+        group_size = len(axes)
+        new_args = []
+        for group_start in range(0, len(args), group_size):
+            group = args[group_start:group_start + group_size]
+            base_exact, base_rounded = list(exact), list(rounded)
+            for axis, value in zip(axes, group):
+                if axis is None:
+                    new_args.append(round(value, decimals))
+                elif relative:
+                    target = base_exact[axis] + value
+                    emitted = round(target - base_rounded[axis], decimals)
+                    new_args.append(emitted)
+                    exact[axis] = target
+                    rounded[axis] = base_rounded[axis] + emitted
+                else:
+                    emitted = round(value, decimals)
+                    new_args.append(emitted)
+                    exact[axis] = value
+                    rounded[axis] = emitted
+        if command in 'Mm':
+            exact_start, rounded_start = list(exact), list(rounded)
+        result.append((command, new_args))
+
+    return result
+
+
+def serialize_path(segments, decimals):
+    """Write path segments back out, merging consecutive identical commands."""
+    output = []
+    previous_command = None
+    for command, args in round_path(segments, decimals):
+        formatted = []
+        for index, value in enumerate(args):
+            if command in 'Aa' and index in (3, 4):
+                formatted.append(str(int(value)))
+            else:
+                formatted.append(format_number(value, decimals))
+        numbers = join_numbers(formatted)
+
+        # Repeated commands (and lineto after moveto) can omit the command letter
+        implicit = ((previous_command == command and command not in 'Mm')
+                    or (previous_command, command) in (('M', 'L'), ('m', 'l')))
+        if implicit and command not in 'Zz':
+            separator = '' if numbers.startswith('-') else ' '
+            output.append(separator + numbers)
+        else:
+            output.append(command + numbers)
+        previous_command = command
+    return ''.join(output)
+
+
+def optimize_path_data(data, decimals):
+    """Round and compact a path's d attribute; returns the input unchanged on parse errors."""
+    try:
+        return serialize_path(parse_path(data), decimals)
+    except (ValueError, KeyError):
+        return data
+
+
+def optimize_number_list(value, decimals):
+    """Round every number in a list-like attribute (points, viewBox, coordinates)."""
+    numbers = NUMBER_PATTERN.findall(value)
+    if not numbers or NUMBER_PATTERN.sub('', value).strip(' ,\t\r\n') not in ('', 'px'):
+        return value
+    suffix = 'px' if value.strip().endswith('px') and len(numbers) == 1 else ''
+    formatted = [format_number(float(number), decimals) for number in numbers]
+    return (' '.join(formatted) if len(formatted) > 1 else formatted[0]) + suffix
+
+
+def optimize_transform(value, decimals):
+    """Round the numbers inside transform functions."""
+    transform_decimals = max(decimals, 3)
+
+    def round_function(match):
+        numbers = [format_number(float(n), transform_decimals) for n in NUMBER_PATTERN.findall(match.group(2))]
+        return f"{match.group(1)}({' '.join(numbers)})"
+
+    return re.sub(r'([a-zA-Z]+)\s*\(([^)]*)\)', round_function, value).replace(') ', ')')
+
+
+# =============================================================================
+# TREE CLEANUP
+# =============================================================================
+
+def collect_referenced_ids(root):
+    """Collect ids referenced through url(#id), href="#id" or inline styles."""
+    referenced = set()
+    for element in root.iter():
+        for value in element.attrib.values():
+            referenced.update(ID_REFERENCE_PATTERN.findall(value))
+        if element.text and local_name(element.tag) == 'style':
+            referenced.update(ID_REFERENCE_PATTERN.findall(element.text))
+    return referenced
+
+
+def clean_attributes(element, inherited, decimals, referenced_ids):
+    """Remove editor/default attributes and round numeric values on one element."""
+    tag = local_name(element.tag)
+    for name in list(element.attrib):
+        value = element.attrib[name].strip()
+        attribute = local_name(name)
+
+        if is_editor_name(name):
+            del element.attrib[name]
+        elif attribute == 'id' and value not in referenced_ids:
+            del element.attrib[name]
+        elif attribute in INHERITED_DEFAULTS and inherited.get(attribute) == normalize_value(attribute, value):
+            del element.attrib[name]
+        elif attribute in ('x', 'y') and tag not in DEFAULT_XY_TAGS:
+            element.attrib[name] = optimize_number_list(value, decimals)
+        elif attribute in NON_INHERITED_DEFAULTS and tag != 'svg' and NON_INHERITED_DEFAULTS[attribute] == value:
+            del element.attrib[name]
+        elif attribute == 'version' and tag == 'svg':
+            del element.attrib[name]
+        elif attribute == 'd' and tag == 'path':
+            element.attrib[name] = optimize_path_data(value, decimals)
+        elif attribute in ('fill', 'stroke', 'stop-color', 'color'):
+            element.attrib[name] = shorten_color(value)
+        elif attribute == 'transform':
+            element.attrib[name] = optimize_transform(value, decimals)
+        elif attribute in COORDINATE_ATTRIBUTES:
+            element.attrib[name] = optimize_number_list(value, decimals)
+
+
+def shorten_color(value):
+    """Shorten #rrggbb colours to #rgb where possible."""
+    match = re.fullmatch(r'#([0-9a-fA-F])\1([0-9a-fA-F])\2([0-9a-fA-F])\3', value)
+    return f"#{match.group(1)}{match.group(2)}{match.group(3)}".lower() if match else value
+
+
+def normalize_value(attribute, value):
+    """Normalise colours and numbers so equivalent values compare equal."""
+    lowered = value.lower()
+    if attribute in ('fill', 'stroke'):
+        if lowered == 'black':
+            return '#000000'
+        if lowered.startswith('#') and len(lowered) == 4:
+            return '#' + ''.join(c * 2 for c in lowered[1:])
+        return lowered
+    if NUMBER_PATTERN.fullmatch(lowered):
+        return format_number(float(lowered), 6)
+    return lowered
+
+
+def parse_style(style):
+    """Declarations of a style attribute as {property: value}."""
+    declarations = {}
+    for declaration in style.split(';'):
+        name, _, value = declaration.partition(':')
+        if name.strip() and value.strip():
+            declarations[name.strip().lower()] = value.replace('!important', '').strip()
+    return declarations
+
+
+def clean_element(element, inherited, decimals, referenced_ids, keep_groups=False):
+    """Recursively clean an element and its children (keep_groups: leave plain <g> wrappers for CSS selectors)."""
+    clean_attributes(element, inherited, decimals, referenced_ids)
+
+    child_inherited = dict(inherited)
+    if 'class' in element.attrib:
+        # Class rules may set any property, so nothing below has a known inherited value
+        child_inherited = {}
+    for attribute in INHERITED_DEFAULTS:
+        if attribute in element.attrib:
+            child_inherited[attribute] = normalize_value(attribute, element.attrib[attribute])
+    # Style declarations override presentation attributes
+    for attribute, value in parse_style(element.get('style', '')).items():
+        if attribute in INHERITED_DEFAULTS:
+            child_inherited[attribute] = normalize_value(attribute, value)
+
+    tag = local_name(element.tag)
+    if tag not in TEXT_TAGS and element.text and not element.text.strip():
+        element.text = None
+
+    for child in list(element):
+        child_tag = local_name(child.tag)
+        if not isinstance(child.tag, str) or is_editor_name(child.tag) or child_tag in METADATA_TAGS:
+            element.remove(child)
+            continue
+        if tag not in TEXT_TAGS and child.tail and not child.tail.strip():
+            child.tail = None
+        clean_element(child, child_inherited, decimals, referenced_ids, keep_groups)
+
+    # Drop empty <defs> and empty groups
+    for child in list(element):
+        if local_name(child.tag) in ('defs', 'g') and len(child) == 0 and not (child.text or '').strip():
+            element.remove(child)
+
+    if not keep_groups:
+        unwrap_plain_groups(element)
+
+
+def unwrap_plain_groups(element):
+    """Replace attribute-less <g> wrappers with their children."""
+    index = 0
+    while index < len(element):
+        child = element[index]
+        if local_name(child.tag) == 'g' and not child.attrib:
+            element.remove(child)
+            for offset, grandchild in enumerate(list(child)):
+                element.insert(index + offset, grandchild)
+            continue
+        index += 1
+
+
+def minify_svg(svg_bytes, precision=DEFAULT_PRECISION):
+    """
+    Minify SVG content.
+
+    Args:
+        svg_bytes (bytes): Original SVG document
+        precision (int): Significant digits kept relative to the viewBox size
+
+    Returns:
+        bytes: Minified SVG document
+    """
+    root = ET.fromstring(svg_bytes)
+    decimals = get_decimals(root, precision)
+    referenced_ids = collect_referenced_ids(root)
+
+    # <style> rules can match any element, so inherited values are only known without them
+    # and the group structure their selectors may rely on has to stay
+    has_stylesheet = any(local_name(element.tag) == 'style' for element in root.iter() if isinstance(element.tag, str))
+    inherited = {} if has_stylesheet else dict(INHERITED_DEFAULTS)
+
+    clean_element(root, inherited, decimals, referenced_ids, keep_groups=has_stylesheet)
+
+    # ElementTree only declares the namespaces still in use
+    svg_bytes = ET.tostring(root, encoding='utf-8', xml_declaration=False, short_empty_elements=True)
+    # '>' is always escaped inside attribute values, so this only touches tag ends
+    return svg_bytes.replace(b' />', b'/>')
+
+
+# =============================================================================
+# PIXEL EQUIVALENCE
+# =============================================================================
+
+def rasterizer_available():
+    """True if cairosvg (and the cairo library it wraps) can be imported."""
+    try:
+        import cairosvg  # noqa: F401
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def rasterize(svg_bytes, size):
+    """Rasterise an SVG to an RGBA numpy array, or None if cairosvg is unavailable."""
+    try:
+        import cairosvg
+    except (ImportError, OSError):
+        return None
+    import numpy as np
+    from PIL import Image
+
+    png_bytes = cairosvg.svg2png(bytestring=svg_bytes, output_width=size, output_height=size)
+    with Image.open(io.BytesIO(png_bytes)) as img:
+        return np.asarray(img.convert('RGBA'), dtype=np.int16)
+
+
+def pixels_equivalent(original_bytes, optimized_bytes, size=VERIFY_SIZE):
+    """
+    Compare low-resolution renders of two SVGs.
+
+    Returns:
+        bool or None: True/False for the comparison, None when no rasteriser is installed
+    """
+    before = rasterize(original_bytes, size)
+    if before is None:
+        return None
+    after = rasterize(optimized_bytes, size)
+
+    difference = abs(before - after).max(axis=2)
+    changed = (difference > VERIFY_TOLERANCE).mean()
+    return bool(changed <= VERIFY_MAX_CHANGED)
+
+
+# =============================================================================
+# FILE PROCESSING
+# =============================================================================
+
+def optimize_svg_image(input_path, output_path, precision=DEFAULT_PRECISION, verify=True):
+    """
+    Optimize a single SVG file.
+
+    Args:
+        input_path (str): Path to input SVG file
+        output_path (str): Path for optimized output file
+        precision (int): Significant digits kept relative to the viewBox size
+        verify (bool): Rasterise before/after and keep the original if they differ
+
+    Returns:
+        dict: File report with sizes, verification result and error (if any)
+    """
+    report = {'file': os.path.basename(input_path), 'original_size': 0, 'new_size': 0,
+              'verified': None, 'success': False, 'error': None}
+    try:
+        with open(input_path, 'rb') as f:
+            original = f.read()
+        report['original_size'] = len(original)
+
+        optimized = minify_svg(original, precision)
+
+        if verify:
+            report['verified'] = pixels_equivalent(original, optimized)
+            if report['verified'] is None:
+                raise RuntimeError("pixel check requested but cairosvg is not available")
+            if report['verified'] is False:
+                # Never ship a visual change; keep the source bytes instead
+                optimized = original
+
+        # Replace rather than write into output_path, which may be hard-linked by dedup_images.py
+        temp_path = f"{output_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(optimized)
+        os.replace(temp_path, output_path)
+
+        report['new_size'] = len(optimized)
+        report['success'] = True
+    except Exception as e:
+        report['error'] = str(e)
+    return report
+
+
+def _optimize_task(task):
+    """Process pool entry point."""
+    return optimize_svg_image(*task)
+
+
+def process_folders(input_folders, output_folder, precision=DEFAULT_PRECISION, verify=True, jobs=None):
+    """
+    Optimize every SVG in the input folders in parallel.
+
+    Each input folder is written to a subfolder of the output folder with the same name.
+
+    Returns:
+        dict: Processing statistics and per-file reports
+    """
+    tasks = []
+    for input_folder in input_folders:
+        input_path = Path(input_folder)
+        if not input_path.exists():
+            print(f"❌ Input folder does not exist: {input_folder}")
+            continue
+        subfolder = Path(output_folder) / input_path.resolve().name
+        subfolder.mkdir(parents=True, exist_ok=True)
+        for svg_file in sorted(input_path.glob("*.svg")):
+            tasks.append((str(svg_file), str(subfolder / svg_file.name), precision, verify))
+
+    if not tasks:
+        print("❌ No SVG files found in input folders")
+        return None
+
+    if verify and not rasterizer_available():
+        print("❌ cairosvg not available for the pixel check (pip install cairosvg, or pass --no-verify)")
+        return None
+
+    print(f"Found {len(tasks)} SVG files to optimize")
+    print(f"Output folder: {output_folder}")
+    print(f"Precision: {precision} significant digits")
+    print(f"Pixel check: {'on' if verify else 'off'} ({VERIFY_SIZE}x{VERIFY_SIZE})")
+    print("-" * 70)
+
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        reports = list(executor.map(_optimize_task, tasks, chunksize=8))
+
+    stats = {
+        'total_files': len(reports),
+        'processed': sum(1 for r in reports if r['success']),
+        'failed': sum(1 for r in reports if not r['success']),
+        'kept_original': sum(1 for r in reports if r['verified'] is False),
+        'total_original_size': sum(r['original_size'] for r in reports if r['success']),
+        'total_optimized_size': sum(r['new_size'] for r in reports if r['success']),
+        'reports': reports,
+    }
+
+    for (input_file, _, _, _), report in zip(tasks, reports):
+        if not report['success']:
+            print(f"  ❌ {input_file}: {report['error']}")
+            continue
+        reduction = ((report['original_size'] - report['new_size']) / report['original_size']) * 100 if report['original_size'] else 0
+        status = {True: '✓', False: '⚠️  pixels differ, kept original', None: ''}[report['verified']]
+        print(f"  {report['file']:<28} {report['original_size']:>9,} → {report['new_size']:>9,} bytes ({reduction:5.1f}%) {status}")
+
+    elapsed_time = time.time() - start_time
+    print("\n" + "=" * 70)
+    print("OPTIMIZATION COMPLETE!")
+    print("=" * 70)
+    print(f"Total files: {stats['total_files']}")
+    print(f"Successfully processed: {stats['processed']}")
+    print(f"Failed: {stats['failed']}")
+    if verify:
+        print(f"Kept original (pixel check failed): {stats['kept_original']}")
+    print(f"Processing time: {elapsed_time:.1f} seconds")
+
+    if stats['processed'] > 0 and stats['total_original_size'] > 0:
+        total_reduction = ((stats['total_original_size'] - stats['total_optimized_size'])
+                           / stats['total_original_size']) * 100
+        print(f"\nOriginal total size: {stats['total_original_size']:,} bytes ({stats['total_original_size']/1024/1024:.2f} MB)")
+        print(f"Optimized total size: {stats['total_optimized_size']:,} bytes ({stats['total_optimized_size']/1024/1024:.2f} MB)")
+        print(f"Total size reduction: {total_reduction:.1f}%")
+
+    print(f"\nOptimized SVGs saved in: {output_folder}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Minify SVG images without visual change',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python optimize_svg_images.py
+    python optimize_svg_images.py ../../assets/img/positions -o optimized_svgs
+    python optimize_svg_images.py -p 4 --no-verify -j 8
+        """)
+
+    parser.add_argument('input_paths', nargs='*',
+                        default=['../../resources/kanji-data-media-master/radical-characters',
+                                 '../../assets/img/positions'],
+                        help='Input folders (default: radical-characters and positions)')
+    parser.add_argument('-o', '--output', default='optimized_svgs',
+                        help='Output folder (default: optimized_svgs)')
+    parser.add_argument('-p', '--precision', type=int, default=DEFAULT_PRECISION,
+                        help=f'Significant digits relative to the viewBox (default: {DEFAULT_PRECISION})')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--no-verify', action='store_true',
+                        help='Skip the pixel-equivalence check')
+
+    args = parser.parse_args()
+
+    print("SVG Image Optimizer")
+    print("===================")
+    print("Minify SVGs while preserving their rendering\n")
+
+    stats = process_folders(args.input_paths, args.output, args.precision,
+                            verify=not args.no_verify, jobs=args.jobs)
+
+    if stats is None:
+        sys.exit(1)
+    elif stats['failed'] > 0:
+        sys.exit(2)
+    else:
+        print("\n✅ All SVGs optimized successfully!")
+
+
+if __name__ == '__main__':
+    main()
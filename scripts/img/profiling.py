@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Script Profiling
+================
+
+Shared --profile switch for the image scripts. run() wraps a script's main()
+and, when --profile is given, profiles the whole run (or only the named stages
+given with --profile-stages). It then writes a profile artefact and a top-N
+summary:
+
+    cprofile     cProfile of the main thread      logs/profiles/{script}_cprofile_{time}_{pid}.pstats
+    tracemalloc  Python allocations by line       logs/profiles/{script}_tracemalloc_{time}_{pid}.snapshot
+    sampling     wall-clock stack sampler         logs/profiles/{script}_sampling_{time}_{pid}.collapsed
+
+The .collapsed file has one "frame;frame;frame count" line per stack, the input of
+flamegraph.pl and speedscope. The summary (…_summary.txt, also printed) lists
+the top functions or lines and the wall time spent in each stage.
+
+Scripts mark their stages with profiling.stage() or @profiling.staged(); both do
+nothing unless a profiler is running:
+
+    with profiling.stage('save'):
+        image.save(output_file)
+
+Stages nest; time is charged to the innermost one, and with --profile-stages the
+profiler only runs while the innermost stage is one of those listed.
+
+Usage:
+    python optimize_png_images.py images/ out/ --profile cprofile
+    python generate_radical_images.py --test --profile sampling --profile-stages denoise decode
+    python -m pstats logs/profiles/optimize_png_images_cprofile_1700000000_4242.pstats
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import functools
+import threading
+import contextlib
+import tracemalloc
+from pathlib import Path
+from collections import Counter
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+PROFILE_MODES = ('cprofile', 'tracemalloc', 'sampling')
+STAGES = ('load', 'encode', 'denoise', 'decode', 'save', 'quantise', 'write')
+PROFILE_DIR = Path('logs/profiles')
+
+DEFAULT_TOP = 25
+SAMPLE_INTERVAL = 0.005    # 200 Hz keeps the sampler below ~2% overhead
+TRACEMALLOC_FRAMES = 10
+
+# =============================================================================
+# COMMAND LINE
+# =============================================================================
+
+def add_arguments(parser):
+    """Add the --profile options to a script's argument parser."""
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                       help='Profile the run: cprofile (pstats), tracemalloc (allocations) or sampling (flame graph stacks)')
+    group.add_argument('--profile-stages', nargs='+', choices=STAGES, default=None, metavar='STAGE',
+                       help=f'Only profile inside these stages: {", ".join(STAGES)} (default: the whole run)')
+    group.add_argument('--profile-top', type=int, default=DEFAULT_TOP,
+                       help=f'Entries in the printed summary (default: {DEFAULT_TOP})')
+    group.add_argument('--profile-dir', type=Path, default=PROFILE_DIR,
+                       help=f'Folder for profile artefacts (default: {PROFILE_DIR})')
+    return group
+
+def forward_arguments(args):
+    """The --profile options of a parsed run, to pass on to a child script."""
+    if not args.profile:
+        return []
+    forwarded = ['--profile', args.profile, '--profile-top', str(args.profile_top),
+                 '--profile-dir', str(args.profile_dir)]
+    if args.profile_stages:
+        forwarded += ['--profile-stages', *args.profile_stages]
+    return forwarded
+
+# =============================================================================
+# PROFILER
+# =============================================================================
+
+_active = None
+
+# The profiler's own frames and allocations are left out of every report
+_OWN_FILES = (__file__, tracemalloc.__file__)
+_OWN_TRACES = [tracemalloc.Filter(False, filename) for filename in _OWN_FILES]
+
+def _frame_label(code):
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+class Profiler:
+    """One profiling session of the main thread, optionally scoped to named stages."""
+
+    def __init__(self, mode, name, stages=None, top=DEFAULT_TOP, output_dir=PROFILE_DIR):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}, expected one of {', '.join(PROFILE_MODES)}")
+        self.mode = mode
+        self.name = name
+        self.stages = set(stages) if stages else None
+        self.top = top
+        self.output_dir = Path(output_dir)
+
+        self.pid = os.getpid()
+        self.thread_id = threading.get_ident()
+        self.stack = []                  # [stage, start, seconds spent in nested stages]
+        self.stage_totals = {}           # stage -> [calls, inclusive seconds, exclusive seconds]
+        self.running = False
+        self.started = None
+        self.elapsed = 0.0
+
+        self.profile = None              # cprofile
+        self.samples = Counter()         # sampling: stack tuple -> samples
+        self.sampler = None
+        self.stop_sampler = threading.Event()
+        self.scope_stage = None          # tracemalloc: stage that opened the current scope
+        self.allocations = {}            # tracemalloc: traceback -> [size diff, count diff]
+        self.stage_peaks = {}
+        self.heaviest_scope = (-1, None)  # tracemalloc: (bytes held, snapshot) of the heaviest scope
+        self.overhead = 0.0              # Seconds spent switching scope, kept out of the stage times
+
+    # -- scope ---------------------------------------------------------------
+
+    def _in_scope(self):
+        if self.stages is None:
+            return True
+        return bool(self.stack) and self.stack[-1][0] in self.stages
+
+    def _update_scope(self):
+        wanted = self._in_scope()
+        if wanted and not self.running:
+            self._resume()
+        elif not wanted and self.running:
+            self._pause()
+
+    def _resume(self):
+        self.running = True
+        if self.mode == 'cprofile':
+            self.profile.enable()
+        elif self.mode == 'tracemalloc' and self.stages is not None:
+            # Trace only inside the scope: the snapshot at its end then holds just the blocks
+            # the scope allocated and kept, and is as cheap as the scope is small
+            self.scope_stage = self.stack[-1][0]
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def _pause(self):
+        self.running = False
+        if self.mode == 'cprofile':
+            self.profile.disable()
+        elif self.mode == 'tracemalloc' and self.stages is not None:
+            held, peak = tracemalloc.get_traced_memory()
+            self.stage_peaks[self.scope_stage] = max(self.stage_peaks.get(self.scope_stage, 0), peak)
+            snapshot = tracemalloc.take_snapshot().filter_traces(_OWN_TRACES)
+            tracemalloc.stop()
+            for stat in snapshot.statistics('traceback'):
+                totals = self.allocations.setdefault(stat.traceback, [0, 0])
+                totals[0] += stat.size
+                totals[1] += stat.count
+            if held > self.heaviest_scope[0]:
+                self.heaviest_scope = (held, snapshot)
+
+    # -- sampling ------------------------------------------------------------
+
+    def _sample(self):
+        while not self.stop_sampler.wait(SAMPLE_INTERVAL):
+            if not self.running:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                if frame.f_code.co_filename not in _OWN_FILES:
+                    stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            try:
+                stack.insert(0, f"[{self.stack[-1][0]}]")
+            except IndexError:
+                pass  # Outside any stage (or it just ended)
+            self.samples[tuple(stack)] += 1
+
+    # -- session -------------------------------------------------------------
+
+    def start(self):
+        self.started = time.perf_counter()
+        if self.mode == 'cprofile':
+            import cProfile  # cProfile/pstats stay out of the scripts' import time
+            self.profile = cProfile.Profile()
+        elif self.mode == 'tracemalloc' and self.stages is None:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        elif self.mode == 'sampling':
+            self.sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+            self.sampler.start()
+        self._update_scope()
+
+    def stop(self):
+        while self.stack:
+            self._exit_stage()  # A stage left open by an exception escaping main()
+        if self.running:
+            self._pause()
+        self.elapsed = time.perf_counter() - self.started
+        if self.sampler is not None:
+            self.stop_sampler.set()
+            self.sampler.join()
+
+    def _switch_scope(self):
+        """Update the scope, moving the open stages' start times past the time it took."""
+        start = time.perf_counter()
+        self._update_scope()
+        overhead = time.perf_counter() - start
+        self.overhead += overhead
+        for entry in self.stack:
+            entry[1] += overhead
+
+    def _enter_stage(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+        self._switch_scope()
+
+    def _exit_stage(self):
+        name, start, nested = self.stack.pop()
+        seconds = time.perf_counter() - start
+        totals = self.stage_totals.setdefault(name, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += seconds - nested
+        if self.stack:
+            self.stack[-1][2] += seconds
+        self._switch_scope()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage {name!r}, expected one of {', '.join(STAGES)}")
+        # Forked workers inherit the profiler but never report it; other threads are not profiled
+        if os.getpid() != self.pid or threading.get_ident() != self.thread_id:
+            yield
+            return
+        self._enter_stage(name)
+        try:
+            yield
+        finally:
+            self._exit_stage()
+
+    # -- report --------------------------------------------------------------
+
+    def _summary_cprofile(self, artefact):
+        import pstats
+        self.profile.dump_stats(artefact)
+        stream = io.StringIO()
+        try:
+            stats = pstats.Stats(self.profile, stream=stream)
+        except TypeError:
+            return ["No calls recorded (no profiled stage ran)"]
+        stats.sort_stats('cumulative').print_stats(self.top)
+        stats.sort_stats('tottime').print_stats(self.top)
+        return [line for line in stream.getvalue().splitlines() if line.strip()]
+
+    def _summary_tracemalloc(self, artefact):
+        if self.stages is None:
+            snapshot = tracemalloc.take_snapshot().filter_traces(_OWN_TRACES)
+            snapshot.dump(artefact)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            lines = [f"Traced memory: {current / 1024**2:.1f}MB at exit, {peak / 1024**2:.1f}MB peak",
+                     f"Top {self.top} lines by memory still allocated at exit:"]
+            stats = snapshot.statistics('lineno')[:self.top]
+            for stat in stats:
+                frame = stat.traceback[0]
+                lines.append(f"  {stat.size / 1024:10.1f} KB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+            return lines
+
+        if self.heaviest_scope[1] is None:
+            return ["No allocations recorded (no profiled stage ran)"]
+        # Scoped runs keep the snapshot of the stage run that held the most memory at its end
+        self.heaviest_scope[1].dump(artefact)
+        lines = ["Peak memory allocated inside each stage:"]
+        for stage_name, stage_peak in sorted(self.stage_peaks.items()):
+            lines.append(f"  {stage_name:<10} {stage_peak / 1024**2:10.1f} MB")
+        lines.append(f"Top {self.top} allocation sites by memory allocated and still held at the end of the profiled stages:")
+        by_line = Counter()
+        for traceback, (size_diff, _) in self.allocations.items():
+            frame = traceback[0]
+            by_line[f"{frame.filename}:{frame.lineno}"] += size_diff
+        for location, size_diff in by_line.most_common(self.top):
+            lines.append(f"  {size_diff / 1024:+10.1f} KB  {location}")
+        return lines
+
+    def _summary_sampling(self, artefact):
+        with open(artefact, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        total = sum(self.samples.values())
+        if not total:
+            return ["No samples recorded (no profiled stage ran)"]
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.samples.items():
+            frames = [frame for frame in stack if not frame.startswith('[')]
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        lines = [f"{total} samples every {SAMPLE_INTERVAL * 1000:.0f}ms",
+                 f"Top {self.top} functions by own samples:"]
+        lines += [f"  {count / total:6.1%}  {frame}" for frame, count in own.most_common(self.top)]
+        lines.append(f"Top {self.top} functions by total samples (including callees):")
+        lines += [f"  {count / total:6.1%}  {frame}" for frame, count in inclusive.most_common(self.top)]
+        return lines
+
+    def report(self):
+        """Write the artefact and summary; returns the artefact path."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Concurrent jobs (generate_all_styles.py) share --profile-dir, so the pid keeps their files apart
+        stem = f"{self.name}_{self.mode}_{int(time.time())}_{self.pid}"
+        extension = {'cprofile': 'pstats', 'tracemalloc': 'snapshot', 'sampling': 'collapsed'}[self.mode]
+        artefact = self.output_dir / f"{stem}.{extension}"
+
+        summary = getattr(self, f"_summary_{self.mode}")(artefact)
+        scope = ', '.join(sorted(self.stages)) if self.stages else 'whole run'
+        lines = [f"Profile: {self.name} ({self.mode}, {scope}), {self.elapsed:.2f}s wall time"]
+        if self.stage_totals:
+            lines.append(f"{'Stage':<10} {'calls':>7} {'total s':>10} {'self s':>10} {'self %':>7}")
+            for stage_name, (calls, inclusive, exclusive) in sorted(self.stage_totals.items(),
+                                                                    key=lambda item: -item[1][2]):
+                lines.append(f"{stage_name:<10} {calls:>7} {inclusive:>10.3f} {exclusive:>10.3f} "
+                             f"{exclusive / max(self.elapsed, 1e-9):>7.1%}")
+        if self.overhead >= 0.01:
+            lines.append(f"Profiler scope switches: {self.overhead:.2f}s, not counted in the stage times")
+        lines += summary
+
+        summary_file = self.output_dir / f"{stem}_summary.txt"
+        summary_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+        print("\n" + "=" * 70)
+        print('\n'.join(lines))
+        print("=" * 70)
+        print(f"📊 Profile: {artefact}")
+        print(f"📄 Summary: {summary_file}")
+        if self.mode == 'sampling':
+            print(f"🔥 Flame graph: flamegraph.pl {artefact} > {artefact.with_suffix('.svg')}  (or open in speedscope.app)")
+        elif self.mode == 'cprofile':
+            print(f"🔍 Explore: python -m pstats {artefact}")
+        return artefact
+
+# =============================================================================
+# STAGES
+# =============================================================================
+
+def active():
+    """The running Profiler, or None."""
+    return _active
+
+def stage(name):
+    """Context manager marking a named stage of the run; a no-op when not profiling."""
+    if _active is None:
+        return contextlib.nullcontext()
+    return _active.stage(name)
+
+def staged(name):
+    """Decorator running a whole function as one stage."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def wrap_stage(obj, attribute, name):
+    """Run obj.attribute (a method of an object owned by someone else) as a stage, once."""
+    method = getattr(obj, attribute, None)
+    if method is None or getattr(method, '_profile_stage', None) == name:
+        return
+    wrapper = staged(name)(method)
+    wrapper._profile_stage = name
+    setattr(obj, attribute, wrapper)
+
+# =============================================================================
+# ENTRY POINT
+# =============================================================================
+
+def run(main, name=None, argv=None):
+    """
+    Call main(), profiled if the command line has --profile.
+
+    The script's own parser must also accept the options (see add_arguments());
+    they are read here first so the profiler is running before main() starts.
+    """
+    global _active
+    parser = argparse.ArgumentParser(add_help=False)
+    add_arguments(parser)
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    if not args.profile:
+        return main()
+
+    name = name or Path(sys.argv[0]).stem
+    profiler = Profiler(args.profile, name, args.profile_stages, args.profile_top, args.profile_dir)
+    _active = profiler
+    profiler.start()
+    try:
+        return main()
+    finally:
+        profiler.stop()
+        _active = None
+        profiler.report()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Radical Generation Config
+=========================
+
+The torch-free half of generate_radical_images.py: model, scheduler, memory
+strategy and CPU profile tables, radical loading, prompts and the output folder
+manifest. The CLI, generate_all_styles.py and the other tools import this
+module without paying for torch/diffusers; the diffusion engine lives in
+radical_engine.py.
+"""
+
+import json
+from pathlib import Path
+
+import profiling
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Shared progress manifest written by --workers runs
+MANIFEST_FILENAME = 'manifest.jsonl'
+
+# Step counts chosen by --tune-steps (relative to scripts/img/)
+STEP_TUNING_FILE = Path('step_tuning.json')
+
+# CPU inference profile: threads (None = keep torch's setting), memory format, bfloat16
+# autocast ('auto' = only on CPUs with native bf16), torch.compile and dynamic int8 linears
+DEFAULT_CPU_PROFILE = {
+    'threads': None,
+    'channels_last': True,
+    'bf16': 'auto',
+    'compile': False,
+    'quantize': False
+}
+
+# CPU profile variants timed by --benchmark-cpu (and benchmark_generator.py), plain float32 first
+CPU_BENCHMARK_PROFILES = [
+    ('float32', {'channels_last': False, 'bf16': 'off'}),
+    ('channels_last', {'channels_last': True, 'bf16': 'off'}),
+    ('bf16 autocast', {'channels_last': True, 'bf16': 'on'}),
+    ('torch.compile', {'channels_last': True, 'bf16': 'auto', 'compile': True}),
+    ('int8 dynamic', {'channels_last': True, 'bf16': 'off', 'quantize': True}),
+]
+
+# Memory strategies probed by the auto-tuner, roughly fastest first. attention_slicing is
+# None (off), 'auto' (half the heads) or 1 (one head at a time); offload is only used
+# when nothing else fits, because it cannot be cleanly undone after probing.
+MEMORY_STRATEGIES = {
+    'none': {'attention_slicing': None, 'vae_slicing': False, 'vae_tiling': False, 'offload': False},
+    'vae-slicing': {'attention_slicing': None, 'vae_slicing': True, 'vae_tiling': False, 'offload': False},
+    'vae-tiling': {'attention_slicing': None, 'vae_slicing': True, 'vae_tiling': True, 'offload': False},
+    'attention-slicing': {'attention_slicing': 'auto', 'vae_slicing': True, 'vae_tiling': False, 'offload': False},
+    'max-slicing': {'attention_slicing': 1, 'vae_slicing': True, 'vae_tiling': True, 'offload': False},
+    'offload': {'attention_slicing': 1, 'vae_slicing': True, 'vae_tiling': True, 'offload': True}
+}
+
+# Share of device (or system) memory the memory tuner may plan for; overridden by
+# --memory-budget or $RADICAL_MEMORY_BUDGET
+MEMORY_BUDGET_ENV = 'RADICAL_MEMORY_BUDGET'
+DEFAULT_MEMORY_BUDGET = 0.7
+
+# Draft previews: small, few-step renders that can be promoted to full resolution later
+DRAFT_SIZE = 256
+DRAFT_STEPS = 8
+PROMOTE_STRENGTH = 0.55  # img2img strength when refining upsampled draft latents
+SELECTED_DIR = Path('../../assets/img/selected')
+
+# Scheduler registry: CLI name -> diffusers class name, config overrides and call parameter defaults
+SCHEDULERS = {
+    'euler': {
+        'class': 'EulerDiscreteScheduler',
+        'config': {},
+        'params': {},
+        'description': 'Euler (simple, stable baseline)'
+    },
+    'dpm++': {
+        'class': 'DPMSolverMultistepScheduler',
+        'config': {'algorithm_type': 'dpmsolver++', 'use_karras_sigmas': True},
+        'params': {},
+        'description': 'DPM-Solver++ 2M Karras (good quality in 15-25 steps)'
+    },
+    'unipc': {
+        'class': 'UniPCMultistepScheduler',
+        'config': {},
+        'params': {},
+        'description': 'UniPC (good quality in 10-20 steps)'
+    },
+    'lcm': {
+        'class': 'LCMScheduler',
+        'config': {},
+        'params': {'num_inference_steps': 4, 'guidance_scale': 1.5},
+        'description': 'LCM (2-8 steps, needs an LCM-distilled model or LoRA)'
+    }
+}
+
+# Model mapping: CLI name -> Hugging Face model, pacing settings and scheduler
+# (a SCHEDULERS key, or None to keep the model's own; FLUX models always keep their flow-matching scheduler)
+MODEL_CONFIGS = {
+    'tiny-sd': {
+        'model_id': 'segmind/tiny-sd',
+        'chunk_size': 15,
+        'delay': 8,
+        'scheduler': None,
+        'description': 'Tiny-SD (fastest, most memory efficient)'
+    },
+    'dreamlike': {
+        'model_id': 'dreamlike-art/dreamlike-anime-1.0',
+        'chunk_size': 15,
+        'delay': 10,
+        'scheduler': None,
+        'description': 'Dreamlike Anime (higher quality, slower)'
+    },
+    # 'sd15': {
+    #     'model_id': 'runwayml/stable-diffusion-v1-5',
+    #     'chunk_size': 15,
+    #     'delay': 10,
+    #     'description': 'Stable Diffusion 1.5 (balanced)'
+    # },
+    # 'flux-schnell': {
+    #     'model_id': 'black-forest-labs/FLUX.1-schnell',
+    #     'chunk_size': 1,
+    #     'delay': 12,
+    #     'description': 'FLUX.1-schnell (highest quality, no token required)'
+    # },
+    # 'flux-dev': {
+    #     'model_id': 'black-forest-labs/FLUX.1-dev',
+    #     'chunk_size': 1,
+    #     'delay': 15,
+    #     'description': 'FLUX.1-dev (best quality, requires HF_TOKEN)'
+    # },
+    # 'watercolor': {
+    #     'model_id': 'SG161222/Realistic_Vision_V6.0_B1_noVAE',
+    #     'chunk_size': 10,
+    #     'delay': 10,
+    #     'description': 'Realistic Vision (watercolor/painterly style)'
+    # },
+    'sketch': {
+        'model_id': 'nitrosocke/Arcane-Diffusion',
+        'chunk_size': 10,
+        'delay': 9,
+        'scheduler': None,
+        'description': 'Arcane Style (hand-drawn sketch style)'
+    },
+    'vintage': {
+        'model_id': 'wavymulder/Analog-Diffusion',
+        'chunk_size': 10,
+        'delay': 9,
+        'scheduler': None,
+        'description': 'Analog Style (vintage illustration)'
+    },
+    'japanese-art': {
+        'model_id': 'hakurei/waifu-diffusion',
+        'chunk_size': 10,
+        'delay': 10,
+        'scheduler': None,
+        'description': 'Waifu Diffusion (anime/Japanese art style)'
+    },
+    'minimalist': {
+        'model_id': 'stabilityai/stable-diffusion-2-1',
+        'chunk_size': 10,
+        'delay': 10,
+        'scheduler': None,
+        'description': 'Stable Diffusion 2.1 (clean, minimalist style)'
+    },
+    # 'papercut': {
+    #     'model_id': 'Fictiverse/Stable_Diffusion_PaperCut_Model',
+    #     'chunk_size': 10,
+    #     'delay': 10,
+    #     'description': 'Paper Cut Style (3D layered look)'
+    # },
+    # 'photoreal': {
+    #     'model_id': 'dreamlike-art/dreamlike-photoreal-2.0',
+    #     'chunk_size': 10,
+    #     'delay': 10,
+    #     'description': 'Dreamlike Photoreal (realistic style)'
+    # },
+    'heartsync-anime': {
+        'model_id': 'Linaqruf/anything-v3.0',  # Popular uncensored anime model
+        'chunk_size': 12,
+        'delay': 9,
+        'scheduler': None,
+        'description': 'Anything v3.0 (uncensored anime style, versatile model)'
+    },
+    'dreamshaper-8': {
+        'model_id': 'Lykon/dreamshaper-8',
+        'chunk_size': 10,
+        'delay': 10,
+        'scheduler': None,
+        'description': 'DreamShaper v8 (realistic anime style, high quality)'
+    },
+    'counterfeit-v30': {
+        'model_id': 'gsdf/Counterfeit-V3.0',
+        'chunk_size': 10,
+        'delay': 10,
+        'scheduler': None,
+        'description': 'Counterfeit v3.0 (anime illustration style, detailed)'
+    },
+    'flux-experimental': {
+        'model_id': 'Heartsync/Flux-NSFW-uncensored',
+        'chunk_size': 6,
+        'delay': 15,
+        'description': 'FLUX.1 + NSFW LoRA (highest quality uncensored, experimental)'
+    }
+}
+
+# =============================================================================
+# RADICALS AND PROMPTS
+# =============================================================================
+
+@profiling.staged('load')
+def load_all_radicals():
+    """Load all radicals from r214.yml file."""
+    # Use r214.yml file in the project root (relative to scripts/img/ folder)
+    r214_file = Path('../../_data/r214.yml')
+    
+    if not r214_file.exists():
+        print(f"❌ r214.yml file not found: {r214_file}")
+        return []
+    
+    print("📚 Loading radicals from r214.yml...")
+    
+    try:
+        import yaml
+        with open(r214_file, 'r', encoding='utf-8') as f:
+            content = yaml.safe_load(f)
+            
+        if not content:
+            print("❌ r214.yml file is empty or invalid")
+            return []
+        
+        # Convert the structure to match what the rest of the code expects
+        all_radicals = []
+        for radical_data in content:
+            # Transform the r214.yml structure to match expected format
+            transformed = {
+                'number': int(radical_data.get('Number', 0)),
+                'radical': radical_data.get('Radical', '?'),
+                'meaning': radical_data.get('Meaning', 'unknown'),
+                'category': radical_data.get('Category', 'unknown'),
+                'reading_j': radical_data.get('Reading-J', ''),
+                'reading_r': radical_data.get('Reading-R', ''),
+                'strokes': radical_data.get('Strokes', '1'),
+                'frequency': radical_data.get('Frequency', '0'),
+                'examples': radical_data.get('Examples', ''),
+                # Use interpretation from guide if available, otherwise fall back to meaning
+                'interpretation': radical_data.get('Interpretation', radical_data.get('Meaning', 'unknown'))
+            }
+            all_radicals.append(transformed)
+                
+    except Exception as e:
+        print(f"  ⚠️  Error loading r214.yml: {e}")
+        return []
+    
+    print(f"✅ Loaded {len(all_radicals)} radicals total")
+    return all_radicals
+
+def load_step_tuning():
+    """Load step counts chosen by --tune-steps: {model_id: {"scheduler@device": result}}."""
+    if not STEP_TUNING_FILE.exists():
+        return {}
+    try:
+        with open(STEP_TUNING_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_step_tuning(model_id, tuning_key, result):
+    """Store one tuning result, keeping the results for other models and schedulers."""
+    tuning = load_step_tuning()
+    tuning.setdefault(model_id, {})[tuning_key] = result
+    with open(STEP_TUNING_FILE, 'w', encoding='utf-8') as f:
+        json.dump(tuning, f, indent=2)
+
+def is_anime_model(model_id):
+    """Whether a model gets the anime-style prompt and negative prompt."""
+    model_id = model_id.lower()
+    return any(name in model_id for name in ('anime', 'anything', 'heartsync', 'dreamshaper', 'counterfeit', 'waifu'))
+
+def build_prompt(model_id, radical):
+    """Prompt for a radical in a model's style."""
+    meaning = radical.get('meaning', 'unknown')
+    category = radical.get('category', 'unknown')
+    interpretation = radical.get('interpretation', 'unknown')
+    
+    # Use interpretation from guide files for richer description, fallback to meaning
+    if interpretation != 'unknown' and interpretation != meaning:
+        representation = interpretation
+    else:
+        representation = meaning
+        if category.lower() != 'unknown' and category.lower() != 'other':
+            representation = f"{meaning}, {category.lower()} related"
+    
+    # Customize prompt based on model type
+    if is_anime_model(model_id):
+        # Anime-optimized prompts
+        return f"Anime style illustration of {representation}, clean lineart, vibrant colors, simple design, high quality, detailed"
+    return f"{representation}."
+
+def normalize_prompt(prompt, case_sensitive=False):
+    """
+    Canonical prompt text for grouping.
+    
+    Only folds what the text encoder ignores anyway: runs of whitespace, and case
+    for the CLIP tokenizer (which lowercases). T5-based models (FLUX) stay case-sensitive.
+    """
+    prompt = ' '.join(prompt.split())
+    return prompt if case_sensitive else prompt.lower()
+
+def plan_prompt_groups(model_id, radicals):
+    """
+    Group radicals whose prompts are identical after normalisation.
+    
+    Returns lists of radicals in first-appearance order. Only the first radical of a
+    group is generated; the others reuse its image, so a full pass runs one
+    denoising job per unique (prompt, model, seed).
+    """
+    case_sensitive = "flux" in model_id.lower()
+    groups = {}
+    for radical in radicals:
+        key = normalize_prompt(build_prompt(model_id, radical), case_sensitive)
+        groups.setdefault(key, []).append(radical)
+    return list(groups.values())
+
+# =============================================================================
+# OUTPUT FOLDER
+# =============================================================================
+
+def load_manifest(output_dir):
+    """Load the latest manifest entry per radical from a shared output folder."""
+    manifest_file = Path(output_dir) / MANIFEST_FILENAME
+    entries = {}
+    if manifest_file.exists():
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Partial line from an interrupted run
+                entries[entry['radical']] = entry
+    return entries
+
+@profiling.staged('write')
+def append_manifest(output_dir, entry):
+    """Append one entry as a single line; small O_APPEND writes do not interleave between processes."""
+    with open(Path(output_dir) / MANIFEST_FILENAME, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
+        f.flush()
+
+@profiling.staged('write')
+def update_selector_thumbnails(output_dir):
+    """Refresh radical-selector's thumbnails and manifest for a finished run's folder."""
+    try:
+        from build_thumbnails import update_folder
+        stats = update_folder(output_dir)
+        print(f"🖼️  Selector manifest: {stats['candidates']} candidates, {stats['thumbnails']} thumbnails written")
+    except Exception as e:
+        print(f"⚠️  Could not update selector thumbnails: {e} (run build_thumbnails.py later)")
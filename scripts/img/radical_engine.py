@@ -0,0 +1,2052 @@
+#!/usr/bin/env python3
+"""
+Apple Silicon M4 Optimized Radical Image Generator - diffusion engine
+
+Everything that needs torch/diffusers: the M4OptimizedRadicalGenerator pipeline
+wrapper, sharded CPU workers, draft promotion and the CPU profile benchmark.
+generate_radical_images.py (the command line) only imports this module once
+a pipeline is actually built; model tables, prompts and radical loading live in
+radical_config.py.
+"""
+
+import torch
+import time
+import os
+import random
+import gc
+import uuid
+import json
+import filecmp
+import inspect
+import platform
+import contextlib
+import subprocess
+import threading
+import ctypes
+import ctypes.util
+import multiprocessing
+import queue
+import shutil
+from pathlib import Path
+import diffusers
+from diffusers import StableDiffusionPipeline, StableDiffusionImg2ImgPipeline, DiffusionPipeline
+from PIL import Image
+import numpy as np
+import psutil
+
+from model_store import lookup_model
+from telemetry import EventLog, EVENTS_ENV, RUN_ENV
+from radical_config import (STEP_TUNING_FILE, DEFAULT_CPU_PROFILE, CPU_BENCHMARK_PROFILES, MEMORY_STRATEGIES,
+                            MEMORY_BUDGET_ENV, DEFAULT_MEMORY_BUDGET,
+                            DRAFT_SIZE, DRAFT_STEPS, PROMOTE_STRENGTH, SELECTED_DIR, SCHEDULERS, MODEL_CONFIGS,
+                            load_all_radicals, load_step_tuning, save_step_tuning, is_anime_model, build_prompt,
+                            plan_prompt_groups, load_manifest, append_manifest, update_selector_thumbnails)
+import profiling
+
+# Set ultra-conservative MPS memory management, unless the operator already chose limits
+os.environ.setdefault('PYTORCH_MPS_HIGH_WATERMARK_RATIO', '0.7')  # Use only 70% of available memory
+os.environ.setdefault('PYTORCH_MPS_LOW_WATERMARK_RATIO', '0.5')   # Start cleanup at 50%
+
+# Latents whose standard deviation falls below this have collapsed to a flat image
+LATENT_MIN_STD = 1e-3
+
+# Denoising steps of each memory strategy probe
+MEMORY_PROBE_STEPS = 3
+
+# Recycle the pipeline in process once RSS or device memory grows this much past the
+# warm baseline taken after the first image, or when free system memory drops below the floor
+RECYCLE_GROWTH_RATIO = 0.25
+MIN_AVAILABLE_GB = 2.0
+MEMORY_TUNING_FILE = Path('.cache/memory_tuning.json')
+
+def cpu_supports_bf16():
+    """True if the CPU has native bfloat16 instructions (AVX512-BF16/AMX on x86, BF16 on ARM)."""
+    if platform.system() == 'Darwin':
+        try:
+            result = subprocess.run(['sysctl', '-n', 'hw.optional.arm.FEAT_BF16'],
+                                    capture_output=True, text=True, timeout=5)
+            return result.stdout.strip() == '1'
+        except (OSError, subprocess.SubprocessError):
+            return False
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            flags = set(f.read().split())
+    except OSError:
+        return False
+    return bool(flags & {'avx512_bf16', 'amx_bf16', 'bf16'})
+
+def trim_heap():
+    """Return freed heap pages to the OS (glibc only); a no-op elsewhere."""
+    libc_name = ctypes.util.find_library('c')
+    if platform.system() != 'Linux' or not libc_name:
+        return
+    try:
+        ctypes.CDLL(libc_name).malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+def image_similarity(image_a, image_b, size=128):
+    """Mean SSIM of two images over 8x8 blocks of their grayscale thumbnails (1.0 = identical)."""
+    def blocks(image):
+        pixels = np.asarray(image.convert('L').resize((size, size), Image.Resampling.LANCZOS), dtype=np.float64)
+        return pixels.reshape(size // 8, 8, size // 8, 8).swapaxes(1, 2).reshape(-1, 64)
+    
+    a, b = blocks(image_a), blocks(image_b)
+    mean_a, mean_b = a.mean(axis=1), b.mean(axis=1)
+    covariance = ((a - mean_a[:, None]) * (b - mean_b[:, None])).mean(axis=1)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    ssim = ((2 * mean_a * mean_b + c1) * (2 * covariance + c2)) / \
+           ((mean_a ** 2 + mean_b ** 2 + c1) * (a.var(axis=1) + b.var(axis=1) + c2))
+    return float(ssim.mean())
+
+def link_or_copy(source, target):
+    """Hard-link target to source, or copy it where hard links are not supported."""
+    target = Path(target)
+    if target.exists():
+        target.unlink()
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+class PeakMemorySampler:
+    """Context manager polling a memory reading on a background thread and keeping its peak."""
+    
+    def __init__(self, read, interval=0.01):
+        self.read = read
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.read())
+            self._stop.wait(self.interval)
+    
+    def __enter__(self):
+        self.peak = self.read()
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.read())
+        return False
+
+def load_memory_tuning():
+    """Cached memory strategy choices, keyed by _memory_tuning_key (empty if missing or unreadable)."""
+    try:
+        with open(MEMORY_TUNING_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_memory_tuning(key, entry):
+    """
+    Store one tuning result, merged into the file as it is now.
+    
+    Several generation processes may tune at once (generate_all_styles.py), so the
+    cache is re-read just before writing and replaced atomically: readers never see
+    a partial file and other models' entries are kept.
+    """
+    MEMORY_TUNING_FILE.parent.mkdir(parents=True, exist_ok=True)
+    cache = load_memory_tuning()
+    cache[key] = entry
+    temp_file = MEMORY_TUNING_FILE.with_name(f"{MEMORY_TUNING_FILE.name}.{os.getpid()}.tmp")
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
+    os.replace(temp_file, MEMORY_TUNING_FILE)
+
+class GenerationAborted(Exception):
+    """Raised from the step callback to stop a diverged denoising run before decode."""
+    
+    def __init__(self, reason, step):
+        super().__init__(f"{reason} latents at step {step}")
+        self.reason = reason
+        self.step = step
+
+class PipelineRestartRequired(MemoryError):
+    """Raised when memory still exceeds the warm baseline after the pipeline was reloaded; only a new process helps."""
+    
+    def __init__(self, growth, output_dir):
+        super().__init__(f"memory still {growth:.0%} over the warm baseline after reloading the pipeline")
+        self.growth = growth
+        self.output_dir = str(output_dir)
+
+class M4OptimizedRadicalGenerator:
+    def __init__(self, model_id="segmind/tiny-sd", batch_size=None, delay_between_batches=8, output_dir=None,
+                 scheduler=None, num_inference_steps=None, draft=False, cpu_profile=None,
+                 memory_strategy='auto', retune_memory=False, memory_share=1.0, share_weights=False,
+                 memory_budget=None):
+        """
+        M4 MacBook Pro ultra-conservative image generator.
+        
+        Args:
+            model_id: Hugging Face model ID to use (default: Tiny-SD for efficiency)
+            batch_size: Auto-optimized for M4 if None  
+            delay_between_batches: Seconds to wait between batches (reduced for faster model)
+            output_dir: Output folder (default: a new generated-{model}-{id} folder)
+            scheduler: Key into SCHEDULERS (default: keep the model's own scheduler)
+            num_inference_steps: Fixed step count (default: tuned value from step_tuning.json, if any)
+            draft: Render small few-step previews and keep their seeds and latents for promotion
+            cpu_profile: Overrides for DEFAULT_CPU_PROFILE, applied when running on CPU
+            memory_strategy: Key into MEMORY_STRATEGIES, or 'auto' to probe and cache the fastest that fits
+            retune_memory: Probe again even if a cached memory strategy exists
+            memory_share: Fraction of the memory budget this generator may use (1/N for N workers)
+            share_weights: Other processes load the same store weights; skip CPU re-layouts that copy them
+            memory_budget: Share of device/system memory to plan for (default: $RADICAL_MEMORY_BUDGET, else 0.7)
+        """
+        self.model_id = model_id
+        self.delay_between_batches = delay_between_batches
+        self.scheduler = scheduler
+        self.draft = draft
+        self.cpu_profile = {**DEFAULT_CPU_PROFILE, **(cpu_profile or {})}
+        self.use_bf16_autocast = False
+        self.memory_strategy = memory_strategy
+        self.retune_memory = retune_memory
+        self.memory_share = memory_share
+        self.memory_budget = memory_budget or float(os.environ.get(MEMORY_BUDGET_ENV, DEFAULT_MEMORY_BUDGET))
+        if not 0 < self.memory_budget <= 1:
+            raise ValueError(f"Memory budget must be in (0, 1], got {self.memory_budget}")
+        self.share_weights = share_weights
+        self.loaded_from_store = False
+        self.active_memory_strategy = None
+        
+        # M4 specific optimizations
+        self.device = self._detect_optimal_device()
+        self.batch_size = batch_size or self._optimize_batch_size()
+        
+        # Step count: explicit value, then the --tune-steps result for this model/scheduler/device
+        self.num_inference_steps = num_inference_steps
+        if self.num_inference_steps is None:
+            tuned = load_step_tuning().get(self.model_id, {}).get(self._tuning_key())
+            if tuned:
+                self.num_inference_steps = tuned['steps']
+                print(f"🎯 Using tuned step count: {self.num_inference_steps} ({self._tuning_key()})")
+        
+        # Check for HF token (only required for some FLUX models)
+        self.hf_token = os.getenv('HF_TOKEN')
+        if not self.hf_token and "flux.1-dev" in self.model_id.lower():
+            print("❌ ERROR: HF_TOKEN required for FLUX.1-dev model!")
+            print("💡 Set your token: export HF_TOKEN='your_token_here'")
+            print("💡 Get token from: https://huggingface.co/settings/tokens")
+            print("💡 Or use FLUX.1-schnell which doesn't need a token")
+        elif not self.hf_token and "flux" in self.model_id.lower():
+            print("✅ Using FLUX.1-schnell (no token required)")
+        elif not self.hf_token:
+            print("✅ Using public model (no token required)")
+        
+        # Create output directory with model name and random ID - updated path from scripts/img/ folder
+        model_name = self.model_id.split('/')[-1].replace('.', '-').lower()
+        if output_dir is None:
+            random_folder_name = f"generated-{model_name}-{'draft-' if draft else ''}{uuid.uuid4().hex[:8]}"
+            output_dir = Path("../../assets/img/radical") / random_folder_name
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Create logs directory in the same folder as the script
+        self.logs_dir = Path('./logs')
+        self.logs_dir.mkdir(exist_ok=True)
+        
+        print(f"📁 Output directory: {self.output_dir}")
+        print(f"📋 Logs directory: {self.logs_dir}")
+        
+        # Structured event stream (JSON lines); workers of one run share the file and run id via the environment
+        events_file = os.environ.get(EVENTS_ENV) or self.logs_dir / f"events_{model_name}_{int(time.time())}.jsonl"
+        self.events = EventLog(events_file, run=os.environ.get(RUN_ENV) or uuid.uuid4().hex[:8], model=self.model_id)
+        self.events.emit('run_start', output_dir=str(self.output_dir), device=self.device, scheduler=self.scheduler,
+                         steps=self.num_inference_steps, draft=self.draft)
+        
+        self.pipe = None
+        self.img2img_pipe = None
+        self.generation_count = 0
+        self.last_seed = None
+        self.last_attempts = 0
+        self.last_step_ms = []
+        
+        # Early-abort statistics from the per-step latent check
+        self.abort_stats = {'nan': 0, 'inf': 0, 'collapsed': 0, 'steps_saved': 0}
+        
+        # Memory growth tracking: the pipeline is recycled in process instead of capping images per session
+        self.memory_baseline = None
+        self.recycle_stats = []
+        self.memory_check_interval = 1   # Check memory after every image
+        print(f"♻️  Pipeline recycling: at {RECYCLE_GROWTH_RATIO:.0%} memory growth or under {MIN_AVAILABLE_GB:.0f}GB free")
+        print(f"🔍 Memory monitoring: Check every {self.memory_check_interval} images")
+        
+        # Pre-check memory before initialization
+        self._pre_check_memory_availability()
+    
+    def _pre_check_memory_availability(self):
+        """Check if system has enough memory before starting."""
+        available_gb, used_percent = self._get_memory_info()
+        
+        print(f"💾 Pre-flight memory check:")
+        print(f"   Available: {available_gb:.1f}GB")
+        print(f"   Used: {used_percent:.1f}%")
+        
+        if available_gb < 4.0:
+            print("⚠️  WARNING: Low available memory detected!")
+            print("💡 Consider closing other applications before proceeding")
+        
+        if used_percent > 80:
+            print("⚠️  WARNING: High memory usage detected!")
+            print("💡 Consider restarting your system for optimal performance")
+            
+        print("✅ Memory pre-check complete")
+    
+    def _clear_model_cache(self):
+        """Clear the model cache for this specific model to force re-download."""
+        from huggingface_hub import snapshot_download
+        
+        # Convert model_id to cache directory name
+        cache_model_name = self.model_id.replace('/', '--')
+        cache_path = Path.home() / '.cache' / 'huggingface' / 'hub' / f'models--{cache_model_name}'
+        
+        if cache_path.exists():
+            print(f"🧹 Clearing cache for {self.model_id}...")
+            try:
+                shutil.rmtree(cache_path)
+                print(f"✅ Model cache cleared: {cache_path}")
+            except Exception as e:
+                print(f"⚠️  Warning: Could not clear cache: {e}")
+        else:
+            print(f"💡 No cache found for {self.model_id}")
+        
+    def _get_memory_info(self):
+        """Get current memory usage information."""
+        memory = psutil.virtual_memory()
+        available_gb = memory.available / (1024**3)
+        used_percent = memory.percent
+        return available_gb, used_percent
+        
+    def _detect_optimal_device(self):
+        """Detect the best device for M4 MacBook Pro."""
+        if torch.backends.mps.is_available():
+            print("🍎 Apple Silicon M4 MPS detected")
+            # Verify MPS is working properly
+            try:
+                test_tensor = torch.randn(10, 10).to('mps')
+                _ = torch.mm(test_tensor, test_tensor)
+                print("✅ MPS verification successful")
+                return 'mps'
+            except Exception as e:
+                print(f"⚠️  MPS test failed: {e}, falling back to CPU")
+                return 'cpu'
+        elif torch.cuda.is_available():
+            print("🖥️  CUDA GPU detected")
+            return 'cuda'
+        else:
+            print("🖥️  Using CPU")
+            return 'cpu'
+    
+    def _optimize_batch_size(self):
+        """Ultra-conservative batch size for M4 chip to prevent OOM."""
+        if self.device == 'mps':
+            return 1  # Single image only for MPS to prevent OOM
+        elif self.device == 'cuda':
+            return 1  # Single image for CUDA too (conservative)
+        else:
+            return 1  # Single image for CPU
+    
+    @profiling.staged('load')
+    def initialize_pipeline(self, force_reload=False, fallback=True):
+        """
+        Initialize the diffusion pipeline with M4 optimizations.
+        
+        With fallback=False a load failure raises instead of switching to CPU or to
+        another model, for reloads that must give back the same model on the same device.
+        """
+        print(f"🚀 Initializing pipeline for M4 MacBook Pro...")
+        print(f"📦 Model: {self.model_id}")
+        print(f"🖥️  Device: {self.device}")
+        
+        # Clear cache if force_reload is requested
+        if force_reload:
+            self._clear_model_cache()
+        
+        load_start = time.time()
+        try:
+            # M4 specific dtype selection to prevent black images
+            if self.device == 'mps':
+                # Use float32 for MPS to prevent black image issues
+                torch_dtype = torch.float32
+                print("🍎 Using float32 for MPS stability (prevents black images)")
+            elif self.device == 'cuda':
+                torch_dtype = torch.float16
+                print("🖥️  Using float16 for CUDA efficiency")
+            else:
+                torch_dtype = torch.float32
+                print("🖥️  Using float32 for CPU compatibility")
+            
+            # Prefer the local safetensors store: no network, weights memory-mapped from the page cache
+            dtype_name = str(torch_dtype).replace('torch.', '')
+            store_path = lookup_model(self.model_id, dtype=dtype_name)
+            self.loaded_from_store = bool(store_path)
+            if store_path:
+                print(f"🗄️  Loading from local model store: {store_path}")
+                if "flux" in self.model_id.lower():
+                    self.pipe = DiffusionPipeline.from_pretrained(
+                        str(store_path),
+                        torch_dtype=torch_dtype,
+                        local_files_only=True,
+                        use_safetensors=True
+                    )
+                else:
+                    self.pipe = StableDiffusionPipeline.from_pretrained(
+                        str(store_path),
+                        torch_dtype=torch_dtype,
+                        local_files_only=True,
+                        use_safetensors=True,
+                        safety_checker=None,
+                        requires_safety_checker=False
+                    )
+            # Load pipeline - use DiffusionPipeline for FLUX models
+            elif "flux" in self.model_id.lower():
+                print("🔥 Loading FLUX model for enhanced quality")
+                try:
+                    if self.hf_token and "flux.1-dev" in self.model_id.lower():
+                        # Only use token for dev model
+                        self.pipe = DiffusionPipeline.from_pretrained(
+                            self.model_id,
+                            torch_dtype=torch_dtype,
+                            token=self.hf_token
+                        )
+                    else:
+                        # No token needed for schnell
+                        self.pipe = DiffusionPipeline.from_pretrained(
+                            self.model_id,
+                            torch_dtype=torch_dtype
+                        )
+                except Exception as flux_error:
+                    if "diffusion_pytorch_model.safetensors" in str(flux_error):
+                        print("⚠️  FLUX model cache appears corrupted (missing safetensors files)")
+                        print("🔄 Attempting to clear cache and reload...")
+                        self._clear_model_cache()
+                        # Retry loading after cache clear
+                        if self.hf_token and "flux.1-dev" in self.model_id.lower():
+                            self.pipe = DiffusionPipeline.from_pretrained(
+                                self.model_id,
+                                torch_dtype=torch_dtype,
+                                token=self.hf_token
+                            )
+                        else:
+                            self.pipe = DiffusionPipeline.from_pretrained(
+                                self.model_id,
+                                torch_dtype=torch_dtype
+                            )
+                    else:
+                        raise flux_error
+            else:
+                print("🎨 Loading Stable Diffusion model")
+                try:
+                    self.pipe = StableDiffusionPipeline.from_pretrained(
+                        self.model_id,
+                        torch_dtype=torch_dtype,
+                        token=self.hf_token,
+                        safety_checker=None,  # Disable for speed
+                        requires_safety_checker=False
+                    )
+                except Exception as model_error:
+                    if "diffusion_pytorch_model.safetensors" in str(model_error):
+                        print("⚠️  Model cache appears corrupted (missing safetensors files)")
+                        print("🔄 Attempting to clear cache and reload...")
+                        self._clear_model_cache()
+                        # Retry loading after cache clear
+                        self.pipe = StableDiffusionPipeline.from_pretrained(
+                            self.model_id,
+                            torch_dtype=torch_dtype,
+                            token=self.hf_token,
+                            safety_checker=None,
+                            requires_safety_checker=False
+                        )
+                    else:
+                        raise model_error
+            
+            # Move to device
+            self.pipe = self.pipe.to(self.device)
+            self._apply_scheduler()
+            
+            # M4 specific optimizations
+            if self.device == 'mps':
+                self._apply_mps_optimizations()
+            elif self.device == 'cuda':
+                self._apply_cuda_optimizations()
+            else:
+                self._apply_cpu_optimizations()
+            
+            self._instrument_stages()
+            self.events.emit('model_load', seconds=round(time.time() - load_start, 2),
+                             source='store' if store_path else 'hub', dtype=dtype_name,
+                             memory_strategy=self.active_memory_strategy)
+            print("✅ Pipeline initialized successfully!")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Failed to initialize pipeline: {e}")
+            if not fallback:
+                raise
+            print(f"💡 Trying fallback to CPU...")
+            return self._fallback_to_cpu()
+    
+    def _instrument_stages(self):
+        """With --profile, split pipeline calls into encode/denoise/decode stages."""
+        if profiling.active() is None:
+            return
+        for pipe in (self.pipe, self.img2img_pipe):
+            if pipe is not None:
+                profiling.wrap_stage(pipe, 'encode_prompt', 'encode')
+                if getattr(pipe, 'vae', None) is not None:
+                    profiling.wrap_stage(pipe.vae, 'decode', 'decode')
+    
+    def _tuning_key(self):
+        """Key of this generator's entry in step_tuning.json."""
+        return f"{self.scheduler or 'default'}@{self.device}"
+    
+    def _apply_scheduler(self):
+        """Swap in the configured scheduler, reusing the pipeline's own scheduler config."""
+        if not self.scheduler:
+            return
+        if "flux" in self.model_id.lower():
+            print(f"⚠️  Keeping FLUX flow-matching scheduler (ignoring {self.scheduler})")
+            return
+        
+        entry = SCHEDULERS[self.scheduler]
+        scheduler_class = getattr(diffusers, entry['class'])
+        self.pipe.scheduler = scheduler_class.from_config(self.pipe.scheduler.config, **entry['config'])
+        print(f"⏱️  Scheduler: {entry['description']}")
+    
+    def _apply_mps_optimizations(self):
+        """Apply M4 specific MPS optimizations."""
+        # Set deterministic algorithms to prevent black images
+        torch.backends.cudnn.deterministic = True
+        torch.backends.cudnn.benchmark = False
+        
+        self._select_memory_strategy()
+        print("🍎 Applied M4 MPS optimizations")
+    
+    def _apply_cuda_optimizations(self):
+        """Apply CUDA optimizations."""
+        if hasattr(self.pipe, 'enable_xformers_memory_efficient_attention'):
+            try:
+                self.pipe.enable_xformers_memory_efficient_attention()
+                print("✅ Enabled xformers optimization")
+            except:
+                pass
+        
+        self._select_memory_strategy()
+    
+    def _apply_cpu_optimizations(self):
+        """Apply CPU optimizations and the CPU inference profile."""
+        profile = self.cpu_profile
+        if profile['threads']:
+            torch.set_num_threads(profile['threads'])
+        print(f"🧵 Torch threads: {torch.get_num_threads()}")
+        
+        denoiser = getattr(self.pipe, 'unet', None) or getattr(self.pipe, 'transformer', None)
+        
+        # Re-laying out or quantising weights copies them into private memory, so workers
+        # sharing mapped store weights keep them as loaded
+        keep_mapped = self.share_weights and self.loaded_from_store
+        if profile['channels_last'] and keep_mapped:
+            print("💡 Skipping channels_last: store weights stay mapped and shared between workers")
+        elif profile['channels_last']:
+            for module in (getattr(self.pipe, 'unet', None), getattr(self.pipe, 'vae', None)):
+                if module is not None:
+                    module.to(memory_format=torch.channels_last)
+            print("✅ channels_last memory format for UNet/VAE convolutions")
+        
+        if profile['quantize'] and keep_mapped:
+            print("⚠️  --quantize copies the quantised layers into each worker's private memory")
+        if profile['quantize'] and denoiser is not None:
+            # Dynamic int8 linears run in float32, so they are not combined with bf16 autocast
+            with profiling.stage('quantise'):
+                for module in (denoiser, getattr(self.pipe, 'text_encoder', None)):
+                    if module is not None:
+                        torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+            print("✅ Dynamic int8 quantisation of linear layers")
+        elif profile['bf16'] == 'on' or (profile['bf16'] == 'auto' and cpu_supports_bf16()):
+            self.use_bf16_autocast = True
+            print("✅ bfloat16 autocast")
+        elif profile['bf16'] == 'auto':
+            print("💡 No native bfloat16 on this CPU, staying in float32")
+        
+        # Probe memory strategies with the final dtype/layout, but before compiling
+        self._select_memory_strategy()
+        
+        if profile['compile'] and denoiser is not None:
+            compiled = torch.compile(denoiser)
+            if getattr(self.pipe, 'unet', None) is not None:
+                self.pipe.unet = compiled
+            else:
+                self.pipe.transformer = compiled
+            self._warm_up()
+    
+    def _current_memory(self):
+        """Bytes currently held on the generation device (process RSS on CPU)."""
+        if self.device == 'cuda':
+            return torch.cuda.memory_reserved()
+        if self.device == 'mps':
+            return torch.mps.driver_allocated_memory()
+        return psutil.Process().memory_info().rss
+    
+    def _memory_budget(self):
+        """Bytes this generator may use: memory_budget of device (or system) memory, times its share."""
+        if self.device == 'cuda':
+            total = torch.cuda.get_device_properties(0).total_memory
+        elif self.device == 'mps':
+            total = torch.mps.recommended_max_memory()
+        else:
+            total = psutil.virtual_memory().total
+        return int(total * self.memory_budget * self.memory_share)
+    
+    def _memory_tuning_key(self):
+        """Cache key: model, device, installed RAM and the share of it this generator gets."""
+        ram_gb = round(psutil.virtual_memory().total / (1024**3))
+        return f"{self.model_id}|{self.device}|{ram_gb}GB|x{round(1 / self.memory_share)}"
+    
+    def _apply_memory_strategy(self, name):
+        """Reset the pipeline's memory savers, then enable the ones in MEMORY_STRATEGIES[name]."""
+        strategy = MEMORY_STRATEGIES[name]
+        vae = getattr(self.pipe, 'vae', None)
+        
+        if hasattr(self.pipe, 'disable_attention_slicing'):
+            self.pipe.disable_attention_slicing()
+        if strategy['attention_slicing'] is not None and hasattr(self.pipe, 'enable_attention_slicing'):
+            self.pipe.enable_attention_slicing(strategy['attention_slicing'])
+        
+        if vae is not None and hasattr(vae, 'enable_slicing'):
+            vae.enable_slicing() if strategy['vae_slicing'] else vae.disable_slicing()
+            vae.enable_tiling() if strategy['vae_tiling'] else vae.disable_tiling()
+        
+        if strategy['offload'] and self.device != 'cpu' and hasattr(self.pipe, 'enable_model_cpu_offload'):
+            try:
+                self.pipe.enable_model_cpu_offload(device=self.device)
+            except Exception as e:
+                print(f"⚠️  CPU offloading not available: {e}")
+    
+    def _probe_memory_strategy(self):
+        """Time a short generation and record its peak memory; {'error': ...} if it fails (e.g. OOM)."""
+        params = self._get_generation_params()
+        params['num_inference_steps'] = MEMORY_PROBE_STEPS
+        self._force_memory_cleanup()
+        if self.device == 'cuda':
+            torch.cuda.reset_peak_memory_stats()
+        
+        try:
+            start_time = time.time()
+            with PeakMemorySampler(self._current_memory) as sampler:
+                with self._inference_context():
+                    self.pipe(prompt="memory probe", generator=torch.Generator(device=self.device).manual_seed(0),
+                              **params)
+            elapsed = time.time() - start_time
+        except Exception as e:
+            return {'error': str(e).splitlines()[0][:200]}
+        
+        peak = torch.cuda.max_memory_reserved() if self.device == 'cuda' else sampler.peak
+        return {'peak_bytes': peak, 'seconds_per_step': round(elapsed / MEMORY_PROBE_STEPS, 3)}
+    
+    def _auto_tune_memory(self):
+        """
+        Pick the fastest memory strategy whose peak fits the budget, probing once per
+        (model, device, RAM size) and caching the choice in .cache/memory_tuning.json.
+        """
+        key = self._memory_tuning_key()
+        cache = load_memory_tuning()
+        budget = self._memory_budget()
+        # A changed budget (--memory-budget) invalidates the cached choice
+        if key in cache and cache[key].get('budget_bytes') == budget and not self.retune_memory:
+            print(f"🧠 Cached memory strategy: {cache[key]['strategy']} ({key})")
+            return cache[key]['strategy']
+        
+        print(f"🧠 Probing memory strategies (budget {budget / 1024**3:.1f}GB)...")
+        results = {}
+        for name in MEMORY_STRATEGIES:
+            if name == 'offload':
+                continue
+            self._apply_memory_strategy(name)
+            results[name] = self._probe_memory_strategy()
+            if 'error' in results[name]:
+                print(f"   {name:<18} ❌ {results[name]['error']}")
+            else:
+                fits = results[name]['peak_bytes'] <= budget
+                print(f"   {name:<18} peak {results[name]['peak_bytes'] / 1024**3:.2f}GB, "
+                      f"{results[name]['seconds_per_step']:.2f}s/step {'✅' if fits else '❌ over budget'}")
+        
+        fitting = [name for name, result in results.items()
+                   if 'error' not in result and result['peak_bytes'] <= budget]
+        if fitting:
+            chosen = min(fitting, key=lambda name: results[name]['seconds_per_step'])
+        elif self.device != 'cpu':
+            chosen = 'offload'
+        else:
+            # Nothing fits in RAM: use the leanest strategy that ran at all
+            measured = [name for name, result in results.items() if 'error' not in result]
+            chosen = min(measured, key=lambda name: results[name]['peak_bytes']) if measured else 'max-slicing'
+        
+        self.retune_memory = False  # Re-initialising the pipeline reuses this result
+        save_memory_tuning(key, {'strategy': chosen, 'budget_bytes': budget, 'probes': results,
+                                 'tuned_at': time.strftime('%Y-%m-%d %H:%M:%S')})
+        return chosen
+    
+    def _select_memory_strategy(self):
+        """Apply the configured memory strategy, auto-tuning it if requested."""
+        name = self._auto_tune_memory() if self.memory_strategy == 'auto' else self.memory_strategy
+        self._apply_memory_strategy(name)
+        self.active_memory_strategy = name
+        print(f"✅ Memory strategy: {name}")
+    
+    def _warm_up(self):
+        """Run one short generation so torch.compile traces at the real resolution before timing starts."""
+        params = self._get_generation_params()
+        params['num_inference_steps'] = 2
+        print("🔥 Compiling denoiser (warm-up run)...")
+        start_time = time.time()
+        with self._inference_context():
+            self.pipe(prompt="warm-up", generator=torch.Generator(device=self.device).manual_seed(0), **params)
+        print(f"✅ torch.compile warm-up done in {time.time() - start_time:.1f}s")
+    
+    def _inference_context(self):
+        """no_grad, plus bfloat16 autocast when the CPU profile enabled it; the 'denoise' profiling stage."""
+        stack = contextlib.ExitStack()
+        stack.enter_context(profiling.stage('denoise'))
+        stack.enter_context(torch.no_grad())
+        if self.use_bf16_autocast:
+            stack.enter_context(torch.autocast('cpu', dtype=torch.bfloat16))
+        return stack
+    
+    def _force_memory_cleanup(self):
+        """Aggressively clean up memory."""
+        if self.device == 'mps':
+            torch.mps.empty_cache()
+        elif self.device == 'cuda':
+            torch.cuda.empty_cache()
+        
+        # Force Python garbage collection
+        gc.collect()
+        trim_heap()
+        
+        # Small delay to let cleanup complete
+        time.sleep(2)
+    
+    def _memory_snapshot(self):
+        """Process RSS and device memory in bytes (device equals RSS on CPU)."""
+        rss = psutil.Process().memory_info().rss
+        return {'rss': rss, 'device': self._current_memory() if self.device != 'cpu' else rss}
+    
+    def _memory_growth(self, snapshot):
+        """Largest relative growth of RSS or device memory over the warm baseline."""
+        return max((snapshot[key] - self.memory_baseline[key]) / max(self.memory_baseline[key], 1)
+                   for key in ('rss', 'device'))
+    
+    def _check_memory_growth(self):
+        """
+        Recycle the pipeline if memory grew past RECYCLE_GROWTH_RATIO since warm-up.
+        
+        The baseline is taken once, at the first check after an image, when allocator
+        caches are warm, and kept across recycles so growth is always measured from it.
+        Returns True if the pipeline was recycled.
+        """
+        if self.pipe is None:
+            return False
+        snapshot = self._memory_snapshot()
+        if self.memory_baseline is None:
+            if self.generation_count > 0:
+                self.memory_baseline = snapshot
+            return False
+        
+        growth = self._memory_growth(snapshot)
+        if growth < RECYCLE_GROWTH_RATIO:
+            return False
+        print(f"♻️  Memory grew {growth:.0%} since warm-up ({snapshot['rss'] / 1024**3:.2f}GB RSS), recycling pipeline...")
+        self._recycle_pipeline()
+        return True
+    
+    def _recycle_pipeline(self):
+        """
+        Release leaking pipeline state in process, escalating only as far as needed.
+        
+        Level 1 drops per-run state (img2img wrapper, scheduler state, allocator caches,
+        freed heap). Level 2 drops the pipeline and loads fresh modules, from the
+        memory-mapped local store when the model is in it. If memory is still over
+        the warm baseline after that, the leak is outside the pipeline and
+        PipelineRestartRequired asks the caller for a new process.
+        """
+        before = self._memory_snapshot()
+        
+        self.img2img_pipe = None
+        if getattr(self.pipe, 'scheduler', None) is not None:
+            self.pipe.scheduler = self.pipe.scheduler.__class__.from_config(self.pipe.scheduler.config)
+        self._force_memory_cleanup()
+        level = 'caches'
+        
+        if self.memory_baseline and self._memory_growth(self._memory_snapshot()) >= RECYCLE_GROWTH_RATIO:
+            if hasattr(self.pipe, 'remove_all_hooks'):
+                self.pipe.remove_all_hooks()
+            self.pipe = None
+            self._force_memory_cleanup()
+            # Same model, same device, same output folder: a failed reload stops the run
+            self.initialize_pipeline(fallback=False)
+            level = 'pipeline reload'
+        
+        after = self._memory_snapshot()
+        self.recycle_stats.append({'after_images': self.generation_count, 'level': level,
+                                   'rss_before': before['rss'], 'rss_after': after['rss']})
+        self.events.emit('recycle', level=level, after_images=self.generation_count,
+                         rss_before_gb=round(before['rss'] / 1024**3, 3), rss_after_gb=round(after['rss'] / 1024**3, 3))
+        print(f"✅ Recycled ({level}) after {self.generation_count} images: "
+              f"RSS {before['rss'] / 1024**3:.2f}GB → {after['rss'] / 1024**3:.2f}GB")
+        
+        if level == 'pipeline reload' and self._memory_growth(after) >= RECYCLE_GROWTH_RATIO:
+            growth = self._memory_growth(after)
+            self.events.emit('restart_required', after_images=self.generation_count, growth=round(growth, 3))
+            print(f"🛑 Memory still {growth:.0%} over the warm baseline after reloading, a new process is needed")
+            raise PipelineRestartRequired(growth, self.output_dir)
+    
+    def _check_memory_safety(self):
+        """Enhanced memory safety check with aggressive cleanup."""
+        available_gb, used_percent = self._get_memory_info()
+        
+        print(f"💾 Memory: {available_gb:.1f}GB available, {used_percent:.1f}% used")
+        
+        # Force cleanup if memory usage is high
+        if used_percent > 85:
+            print("⚠️  High memory usage detected, forcing cleanup...")
+            self._force_memory_cleanup()
+            
+            # Check again after cleanup
+            available_gb, used_percent = self._get_memory_info()
+            print(f"💾 After cleanup: {available_gb:.1f}GB available, {used_percent:.1f}% used")
+        
+        # Recycle leaking pipeline state in process instead of stopping after N images
+        if not self._check_memory_growth() and available_gb < MIN_AVAILABLE_GB and self.pipe is not None:
+            print(f"⚠️  Only {available_gb:.1f}GB available, recycling pipeline...")
+            self._recycle_pipeline()
+        
+        # Check available memory 
+        available_gb, used_percent = self._get_memory_info()
+        if available_gb < MIN_AVAILABLE_GB:
+            print(f"🛑 Low memory warning: Only {available_gb:.1f}GB available even after recycling")
+            print("💡 Close other applications and run again; existing images are skipped")
+            return False
+            
+        return True
+    
+    @profiling.staged('load')
+    def _fallback_to_cpu(self):
+        """Fallback to CPU if MPS fails."""
+        try:
+            self.device = 'cpu'
+            
+            # Try efficient models first, then fallback to larger ones
+            models_to_try = [
+                self.model_id,  # Original model
+                "segmind/tiny-sd",                    # Tiny efficient model
+                "runwayml/stable-diffusion-v1-5",    # Standard SD1.5
+                "stabilityai/stable-diffusion-2"     # Reliable fallback
+            ]
+            
+            for model_id in models_to_try:
+                try:
+                    print(f"🔄 Trying CPU fallback with: {model_id}")
+                    
+                    if "flux" in model_id.lower():
+                        if self.hf_token and "flux.1-dev" in model_id.lower():
+                            self.pipe = DiffusionPipeline.from_pretrained(
+                                model_id,
+                                torch_dtype=torch.float32,
+                                token=self.hf_token
+                            )
+                        else:
+                            self.pipe = DiffusionPipeline.from_pretrained(
+                                model_id,
+                                torch_dtype=torch.float32
+                            )
+                    else:
+                        self.pipe = StableDiffusionPipeline.from_pretrained(
+                            model_id,
+                            torch_dtype=torch.float32,
+                            token=self.hf_token,
+                            safety_checker=None,
+                            requires_safety_checker=False
+                        )
+                    
+                    self.pipe = self.pipe.to('cpu')
+                    self._apply_scheduler()
+                    self._apply_cpu_optimizations()
+                    self._instrument_stages()
+                    self.model_id = model_id  # Update model_id
+                    print(f"✅ CPU fallback successful with: {model_id}")
+                    return True
+                    
+                except Exception as e:
+                    print(f"❌ Failed {model_id}: {e}")
+                    continue
+            
+            print("❌ All CPU fallback attempts failed")
+            return False
+            
+        except Exception as e:
+            print(f"❌ CPU fallback error: {e}")
+            return False
+    
+    def load_all_radicals(self):
+        """Load all radicals from r214.yml file."""
+        return load_all_radicals()
+    
+    def create_prompt(self, radical):
+        """Create optimized prompt for different art styles."""
+        prompt = build_prompt(self.model_id, radical)
+        
+        # Add negative prompt for anime models
+        if is_anime_model(self.model_id) and hasattr(self, '_current_negative_prompt'):
+            self._current_negative_prompt = "lowres, bad anatomy, bad hands, text, error, missing fingers, extra digit, fewer digits, cropped, worst quality, low quality, normal quality, jpeg artifacts, signature, watermark, username, blurry"
+        
+        return prompt
+    
+    def plan_generation(self, radicals):
+        """Group radicals sharing a prompt (see plan_prompt_groups) and report the saving."""
+        groups = plan_prompt_groups(self.model_id, radicals)
+        shared = len(radicals) - len(groups)
+        if shared:
+            print(f"🔗 Prompt dedup: {len(radicals)} radicals → {len(groups)} unique prompts, "
+                  f"{shared} reuse another radical's image")
+        return groups
+    
+    def link_duplicates(self, lead, duplicates):
+        """
+        Give radicals that share the lead's prompt its image and record the mapping.
+        
+        Images (and draft latents) are hard-linked, or copied where links are not
+        supported. Each duplicate gets a manifest entry with duplicate_of set.
+        """
+        if not duplicates:
+            return 0
+        lead_number = lead['number']
+        source = self.output_dir / f"radical_{lead_number:03d}.png"
+        if not source.exists():
+            return 0
+        
+        lead_entry = load_manifest(self.output_dir).get(lead_number, {})
+        prompt = lead_entry.get('prompt') or self.create_prompt(lead)
+        seed = lead_entry.get('seed') or self.last_seed
+        append_manifest(self.output_dir, {
+            **lead_entry,
+            'radical': lead_number,
+            'status': 'ok',
+            'prompt': prompt,
+            'seed': seed,
+            'file': source.name,
+            'shared_with': [radical['number'] for radical in duplicates],
+            'time': time.strftime('%Y-%m-%d %H:%M:%S')
+        })
+        
+        for radical in duplicates:
+            number = radical['number']
+            target = self.output_dir / f"radical_{number:03d}.png"
+            link_or_copy(source, target)
+            entry = {
+                **lead_entry,
+                'radical': number,
+                'status': 'ok',
+                'prompt': prompt,
+                'seed': seed,
+                'file': target.name,
+                'duplicate_of': lead_number,
+                'time': time.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            if lead_entry.get('latents'):
+                latents_target = f"latents/radical_{number:03d}.pt"
+                link_or_copy(self.output_dir / lead_entry['latents'], self.output_dir / latents_target)
+                entry['latents'] = latents_target
+            append_manifest(self.output_dir, entry)
+            self.events.emit('image', radical=number, status='linked', duplicate_of=lead_number)
+            print(f"🔗 Radical {number}: same prompt as {lead_number}, linked {target.name}")
+        return len(duplicates)
+    
+    def _get_generation_params(self):
+        """Pipeline call parameters, with scheduler defaults and the tuned or fixed step count applied."""
+        params = self._get_default_generation_params()
+        if self.scheduler and "flux" not in self.model_id.lower():
+            params.update(SCHEDULERS[self.scheduler]['params'])
+        if self.num_inference_steps:
+            params['num_inference_steps'] = self.num_inference_steps
+        return params
+    
+    def _get_default_generation_params(self):
+        """Pipeline call parameters (size, steps, guidance, negative prompt) for this model and device."""
+        model_id = self.model_id.lower()
+        
+        # Ultra-conservative M4 generation parameters
+        if self.device != 'mps':
+            # Conservative settings for other devices
+            return {
+                'height': 512,               # Reduced size for memory conservation
+                'width': 512,                # Reduced size for memory conservation
+                'num_inference_steps': 15,   # Reduced steps
+                'guidance_scale': 7.0
+            }
+        
+        # Optimized settings for different model types on MPS
+        if "flux" in model_id:
+            # Extra conservative for FLUX
+            return {
+                'height': 512,               # Extra small for FLUX memory requirements
+                'width': 512,                # Extra small for FLUX memory requirements
+                'num_inference_steps': 12,   # Fewer steps for FLUX
+                'guidance_scale': 5.0        # Lower guidance for FLUX stability
+            }
+        elif "tiny-sd" in model_id:
+            # Optimized for Tiny-SD model (very efficient)
+            return {
+                'height': 512,               # Standard resolution for Tiny-SD
+                'width': 512,                # Standard resolution for Tiny-SD
+                'num_inference_steps': 12,   # Fewer steps work well for Tiny-SD
+                'guidance_scale': 6.0,       # Lower guidance for efficiency
+                'negative_prompt': "blurry, low quality, distorted, dark"
+            }
+        elif "stable-diffusion-v1" in model_id:
+            # Optimized for SD1.x models (more efficient)
+            return {
+                'height': 512,               # Higher resolution for SD1.x
+                'width': 512,                # Higher resolution for SD1.x
+                'num_inference_steps': 18,   # Good quality steps for SD1.x
+                'guidance_scale': 7.5,       # Standard guidance for SD1.x
+                'negative_prompt': "blurry, low quality, distorted, dark"
+            }
+        elif ("anime" in model_id or "anything" in model_id or "dreamshaper" in model_id or
+              "counterfeit" in model_id or "waifu" in model_id):
+            # Anime model optimizations
+            return {
+                'height': 512,               # Balanced resolution
+                'width': 512,                # Balanced resolution
+                'num_inference_steps': 20,   # More steps for anime quality
+                'guidance_scale': 7.5,       # Higher guidance for anime
+                'negative_prompt': "lowres, bad anatomy, bad hands, text, error, missing fingers, extra digit, fewer digits, cropped, worst quality, low quality, normal quality, jpeg artifacts, signature, watermark, username, blurry"
+            }
+        else:
+            # Default settings for other models
+            return {
+                'height': 512,               # Balanced resolution
+                'width': 512,                # Balanced resolution
+                'num_inference_steps': 15,   # Balanced steps
+                'guidance_scale': 6.0,       # Lower guidance for stability
+                'negative_prompt': "blurry, low quality, distorted"
+            }
+    
+    def _is_dark_image(self, image):
+        """Check if an image is black (common MPS issue); returns (is_dark, mean_brightness)."""
+        mean_brightness = np.mean(np.array(image))
+        return mean_brightness < 10, mean_brightness
+    
+    def _check_latents(self, latents):
+        """Return why latents are unusable ('nan', 'inf', 'collapsed') or None if they look fine."""
+        if torch.isnan(latents).any():
+            return 'nan'
+        if torch.isinf(latents).any():
+            return 'inf'
+        if latents.float().std() < LATENT_MIN_STD:
+            return 'collapsed'
+        return None
+    
+    def _get_step_callback_kwargs(self, per_sample=False, capture=None, step_marks=None):
+        """
+        Pipeline kwargs installing a callback_on_step_end that aborts on bad latents.
+        
+        With per_sample=True (batches) the run is only aborted once every sample is bad;
+        single bad samples are caught by the brightness check after decode.
+        If capture is a dict, the latest latents are kept in capture['latents'].
+        If step_marks is a list, a perf_counter() timestamp is appended after every step.
+        """
+        if 'callback_on_step_end' not in inspect.signature(self.pipe.__call__).parameters:
+            return {}
+        
+        def on_step_end(pipe, step, timestep, callback_kwargs):
+            if step_marks is not None:
+                step_marks.append(time.perf_counter())
+            latents = callback_kwargs['latents']
+            if per_sample:
+                reasons = [self._check_latents(sample) for sample in latents]
+                if all(reasons):
+                    raise GenerationAborted(reasons[0], step)
+            else:
+                reason = self._check_latents(latents)
+                if reason:
+                    raise GenerationAborted(reason, step)
+            if capture is not None:
+                capture['latents'] = latents
+            return callback_kwargs
+        
+        return {'callback_on_step_end': on_step_end, 'callback_on_step_end_tensor_inputs': ['latents']}
+    
+    def _record_abort(self, abort, num_inference_steps):
+        """Count an early abort and the denoising steps it saved."""
+        self.abort_stats[abort.reason] += 1
+        saved = max(0, num_inference_steps - abort.step - 1)
+        self.abort_stats['steps_saved'] += saved
+        return saved
+    
+    def _print_abort_stats(self):
+        """Summarise early aborts from the step callback, if any happened."""
+        aborted = sum(self.abort_stats[reason] for reason in ('nan', 'inf', 'collapsed'))
+        if aborted:
+            print(f"⚡ Early aborts: {aborted} (nan: {self.abort_stats['nan']}, inf: {self.abort_stats['inf']}, "
+                  f"collapsed: {self.abort_stats['collapsed']}), {self.abort_stats['steps_saved']} steps saved")
+    
+    def _get_draft_params(self):
+        """Generation parameters for a draft preview: small size and few steps."""
+        params = self._get_generation_params()
+        params['height'] = params['width'] = DRAFT_SIZE
+        params['num_inference_steps'] = min(params['num_inference_steps'], DRAFT_STEPS)
+        return params
+    
+    def _generate_with_validation(self, prompt, seed=None, params=None, capture=None):
+        """
+        Generate image with black image detection and retry.
+        
+        params overrides the pipeline parameters (default: _get_generation_params());
+        capture is passed to the step callback to keep the final latents.
+        """
+        max_retries = 3
+        
+        for attempt in range(max_retries):
+            try:
+                # Set random seed for consistency
+                if seed is None:
+                    seed = random.randint(0, 2**32 - 1)
+                
+                generator = torch.Generator(device=self.device).manual_seed(seed)
+                call_params = dict(params) if params else self._get_generation_params()
+                step_marks = [time.perf_counter()]
+                
+                with self._inference_context():
+                    result = self.pipe(
+                        prompt=prompt,
+                        generator=generator,
+                        **call_params,
+                        **self._get_step_callback_kwargs(capture=capture, step_marks=step_marks)
+                    )
+                
+                image = result.images[0]
+                
+                # Check if image is black (common MPS issue)
+                is_dark, mean_brightness = self._is_dark_image(image)
+                
+                if is_dark:  # Very dark image
+                    print(f"⚠️  Attempt {attempt + 1}: Dark image detected (brightness: {mean_brightness:.1f}), retrying...")
+                    self.events.emit('retry', reason='dark', attempt=attempt + 1, brightness=round(float(mean_brightness), 1))
+                    seed = random.randint(0, 2**32 - 1)  # New seed
+                    continue
+                
+                print(f"✅ Good image generated (brightness: {mean_brightness:.1f})")
+                self.last_seed = seed
+                self.last_attempts = attempt + 1
+                # Step latencies from the callback timestamps (the first also covers prompt encoding)
+                self.last_step_ms = [round((b - a) * 1000, 1) for a, b in zip(step_marks, step_marks[1:])]
+                return image
+            
+            except GenerationAborted as abort:
+                # Bad latents: skip the remaining steps and the VAE decode, retry right away
+                saved = self._record_abort(abort, call_params['num_inference_steps'])
+                print(f"⚡ Attempt {attempt + 1}: {abort} (saved {saved} steps + decode), retrying...")
+                self.events.emit('retry', reason=abort.reason, attempt=attempt + 1, step=abort.step, steps_saved=saved)
+                seed = random.randint(0, 2**32 - 1)
+                continue
+                
+            except Exception as e:
+                print(f"⚠️  Attempt {attempt + 1} failed: {e}")
+                self.events.emit('retry', reason='error', attempt=attempt + 1, error=str(e))
+                if attempt == max_retries - 1:
+                    raise e
+                seed = random.randint(0, 2**32 - 1)
+        
+        raise Exception("Failed to generate valid image after all retries")
+    
+    def _render(self, prompt, seed, steps):
+        """Render one image with a fixed seed and step count, without retries; None if aborted."""
+        params = self._get_generation_params()
+        params['num_inference_steps'] = steps
+        generator = torch.Generator(device=self.device).manual_seed(seed)
+        
+        try:
+            with self._inference_context():
+                return self.pipe(prompt=prompt, generator=generator, **params,
+                                 **self._get_step_callback_kwargs()).images[0]
+        except GenerationAborted as abort:
+            self._record_abort(abort, steps)
+            return None
+    
+    def tune_steps(self, radicals, step_candidates, reference_steps=50, threshold=0.8, seed=1234):
+        """
+        Find the fewest denoising steps whose output stays close to a high-step reference.
+        
+        Each radical is rendered once at reference_steps, then at decreasing step counts
+        with the same seed. A step count passes when every radical's SSIM against its
+        reference is at least threshold; tuning stops at the first step count that fails.
+        
+        Returns:
+            dict: Tuning result (chosen steps and per-step scores), also saved to step_tuning.json
+        """
+        prompts = [self.create_prompt(radical) for radical in radicals]
+        
+        print(f"🎯 Rendering {len(radicals)} references at {reference_steps} steps...")
+        references = []
+        for radical, prompt in zip(radicals, prompts):
+            reference = self._render(prompt, seed, reference_steps)
+            if reference is None or self._is_dark_image(reference)[0]:
+                print(f"⚠️  Radical {radical['number']}: no usable reference, skipping")
+                continue
+            references.append((radical, prompt, reference))
+        
+        if not references:
+            print("❌ No usable references, cannot tune")
+            return None
+        
+        best_steps = reference_steps
+        scores = {}
+        for steps in sorted({s for s in step_candidates if s < reference_steps}, reverse=True):
+            start_time = time.time()
+            similarities = []
+            for radical, prompt, reference in references:
+                image = self._render(prompt, seed, steps)
+                similarities.append(image_similarity(image, reference) if image is not None else 0.0)
+            
+            worst = min(similarities)
+            scores[steps] = {'min': round(worst, 4), 'mean': round(float(np.mean(similarities)), 4),
+                             'seconds_per_image': round((time.time() - start_time) / len(references), 2)}
+            passed = worst >= threshold
+            print(f"   {steps:>3} steps: min SSIM {worst:.3f}, mean {np.mean(similarities):.3f} "
+                  f"{'✅' if passed else '❌'}")
+            if not passed:
+                break
+            best_steps = steps
+        
+        result = {
+            'steps': best_steps,
+            'reference_steps': reference_steps,
+            'threshold': threshold,
+            'seed': seed,
+            'radicals': [radical['number'] for radical, _, _ in references],
+            'scores': scores,
+            'tuned_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        save_step_tuning(self.model_id, self._tuning_key(), result)
+        print(f"✅ Fewest acceptable steps: {best_steps} (saved to {STEP_TUNING_FILE})")
+        return result
+    
+    def generate_batch(self, prompts, seeds):
+        """
+        Generate several images in a single pipeline call, one per (prompt, seed).
+        
+        Dark or failed outputs are retried individually through _generate_with_validation.
+        
+        Returns:
+            list: (image, seed) tuples in input order; image is None if every retry failed
+        """
+        params = self._get_generation_params()
+        if 'negative_prompt' in params:
+            params['negative_prompt'] = [params['negative_prompt']] * len(prompts)
+        
+        generators = [torch.Generator(device=self.device).manual_seed(seed) for seed in seeds]
+        
+        try:
+            with self._inference_context():
+                images = self.pipe(prompt=list(prompts), generator=generators, **params,
+                                   **self._get_step_callback_kwargs(per_sample=True)).images
+        except GenerationAborted as abort:
+            saved = self._record_abort(abort, params['num_inference_steps'])
+            print(f"⚡ Batch of {len(prompts)}: {abort} in every sample (saved {saved} steps + decode)")
+            images = [None] * len(prompts)
+        except Exception as e:
+            print(f"⚠️  Batch of {len(prompts)} failed: {e}, falling back to single images")
+            images = [None] * len(prompts)
+        
+        results = []
+        for prompt, seed, image in zip(prompts, seeds, images):
+            if image is not None and not self._is_dark_image(image)[0]:
+                results.append((image, seed))
+                continue
+            
+            print(f"⚠️  Seed {seed}: dark or failed image in batch, retrying on its own...")
+            try:
+                # Retries switch seeds, so report the one that produced the image
+                image = self._generate_with_validation(prompt, seed=random.randint(0, 2**32 - 1))
+                results.append((image, self.last_seed))
+            except Exception as e:
+                print(f"❌ Retry failed: {e}")
+                results.append((None, seed))
+        
+        return results
+    
+    def generate_image(self, radical):
+        """Generate a single image for a radical with M4 optimizations."""
+        number = radical.get('number', '?')
+        character = radical.get('radical', '?')
+        
+        output_file = self.output_dir / f"radical_{number:03d}.png"
+        
+        # Skip if already exists
+        if output_file.exists():
+            print(f"⏭️  Skipping radical {number} (already exists)")
+            self.last_seed = None
+            return True
+        
+        prompt = self.create_prompt(radical)
+        print(f"🎨 Generating image for radical {number} ({character})...")
+        print(f"   Prompt: ...{prompt[-80:]}")
+        
+        image_start = time.time()
+        try:
+            # Generate with validation
+            if self.draft:
+                capture = {}
+                image = self._generate_with_validation(prompt, params=self._get_draft_params(), capture=capture)
+            else:
+                image = self._generate_with_validation(prompt)
+            generate_seconds = time.time() - image_start
+            
+            # Resize to 500x500
+            # image = image.resize((500, 500), Image.Resampling.LANCZOS)
+            
+            # Save image
+            write_start = time.time()
+            with profiling.stage('save'):
+                # Replaced, not written into: the output may be hard-linked by dedup_images.py
+                image.save(f"{output_file}.tmp", "PNG", quality=95)
+                os.replace(f"{output_file}.tmp", output_file)
+            write_seconds = time.time() - write_start
+            print(f"✅ Saved: {output_file}")
+            if self.draft:
+                self._record_draft(number, prompt, output_file, capture.get('latents'))
+            
+            self.generation_count += 1
+            self.events.emit('image', radical=number, status='ok', seed=self.last_seed,
+                             seconds=round(time.time() - image_start, 3), generate_seconds=round(generate_seconds, 3),
+                             write_seconds=round(write_seconds, 4), attempts=self.last_attempts,
+                             steps=len(self.last_step_ms), step_ms=self.last_step_ms)
+            
+            # Ultra-aggressive M4 memory management after EVERY image
+            print("🧹 Performing aggressive memory cleanup...")
+            self._force_memory_cleanup()
+            snapshot = self._memory_snapshot()
+            self.events.emit('memory', rss_gb=round(snapshot['rss'] / 1024**3, 3),
+                             device_gb=round(snapshot['device'] / 1024**3, 3),
+                             available_gb=round(self._get_memory_info()[0], 2))
+            
+            # Additional delay for M4 stability (reduced for Tiny-SD efficiency)
+            if self.device == 'mps':
+                time.sleep(2)  # Shorter delay for efficient Tiny-SD model
+                print("⏳ MPS memory stabilization complete")
+            
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error generating image for radical {number}: {e}")
+            print(f"🔄 Continuing with next radical...")
+            self.events.emit('image', radical=number, status='failed', seconds=round(time.time() - image_start, 3),
+                             error=str(e))
+            return False
+    
+    def _record_draft(self, number, prompt, output_file, latents):
+        """Save a draft's final latents and add its seed and settings to the folder manifest."""
+        latents_file = None
+        if latents is not None:
+            latents_dir = self.output_dir / 'latents'
+            latents_dir.mkdir(exist_ok=True)
+            latents_file = latents_dir / f"radical_{number:03d}.pt"
+            with profiling.stage('save'):
+                torch.save(latents.detach().cpu(), latents_file)
+        
+        params = self._get_draft_params()
+        append_manifest(self.output_dir, {
+            'radical': number,
+            'status': 'ok',
+            'draft': True,
+            'model_id': self.model_id,
+            'scheduler': self.scheduler,
+            'seed': self.last_seed,
+            'prompt': prompt,
+            'size': params['width'],
+            'steps': params['num_inference_steps'],
+            'file': output_file.name,
+            'latents': f"latents/{latents_file.name}" if latents_file else None,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S')
+        })
+    
+    def _get_img2img_pipeline(self):
+        """Img2img pipeline sharing the loaded components, used to refine upsampled draft latents."""
+        if self.img2img_pipe is None:
+            self.img2img_pipe = StableDiffusionImg2ImgPipeline.from_pipe(self.pipe)
+            self._instrument_stages()
+        return self.img2img_pipe
+    
+    def promote_draft(self, entry, draft_dir, mode='latent', strength=PROMOTE_STRENGTH):
+        """
+        Render a selected draft at full resolution with the same seed and prompt.
+        
+        mode='latent' upsamples the draft's latents to full size and refines them with
+        img2img, keeping the draft's composition and running only strength * steps.
+        mode='rerender' (or no saved latents, or FLUX) runs the full pipeline again; a
+        different resolution changes the noise shape, so the result can differ from the draft.
+        """
+        number = entry['radical']
+        output_file = self.output_dir / entry['file']
+        params = self._get_generation_params()
+        generator = torch.Generator(device=self.device).manual_seed(entry['seed'])
+        latents_file = Path(draft_dir) / entry['latents'] if entry.get('latents') else None
+        
+        use_latents = (mode == 'latent' and latents_file is not None and latents_file.exists()
+                       and "flux" not in self.model_id.lower())
+        if mode == 'latent' and not use_latents:
+            print(f"⚠️  Radical {number}: no usable draft latents, re-rendering instead")
+        
+        try:
+            if use_latents:
+                img2img = self._get_img2img_pipeline()
+                latents = torch.load(latents_file).to(self.device, dtype=img2img.unet.dtype)
+                latents = torch.nn.functional.interpolate(
+                    latents, size=(params.pop('height') // 8, params.pop('width') // 8), mode='bicubic')
+                with self._inference_context():
+                    image = img2img(prompt=entry['prompt'], image=latents, strength=strength,
+                                    generator=generator, **params).images[0]
+                if self._is_dark_image(image)[0]:
+                    print(f"⚠️  Radical {number}: dark refinement, re-rendering instead")
+                    use_latents = False
+            if not use_latents:
+                image = self._generate_with_validation(entry['prompt'], seed=entry['seed'])
+            
+            with profiling.stage('save'):
+                # Replaced, not written into: an existing output may be hard-linked by dedup_images.py
+                image.save(f"{output_file}.tmp", "PNG", quality=95)
+                os.replace(f"{output_file}.tmp", output_file)
+        except Exception as e:
+            print(f"❌ Error promoting radical {number}: {e}")
+            return False
+        
+        append_manifest(self.output_dir, {
+            'radical': number,
+            'status': 'ok',
+            'promoted_from': str(draft_dir),
+            'mode': 'latent' if use_latents else 'rerender',
+            'seed': entry['seed'] if use_latents else self.last_seed,
+            'file': output_file.name,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S')
+        })
+        print(f"✅ Promoted radical {number} ({'latent upsample' if use_latents else 're-render'}): {output_file}")
+        return True
+    
+    def generate_test_images(self, test_radicals=[4, 5, 6]):
+        """Generate test images for specific radicals (0-based indices)."""
+        print(f"🧪 Testing M4 optimized generation on radicals: {[i+1 for i in test_radicals]}")
+        print("=" * 60)
+        
+        if not self.initialize_pipeline():
+            return False
+        
+        radicals = self.load_all_radicals()
+        if not radicals:
+            print("❌ No radicals found")
+            return False
+        
+        # Get specific test radicals
+        test_radical_objects = [radicals[i] for i in test_radicals if i < len(radicals)]
+        success_count = 0
+        
+        for i, radical in enumerate(test_radical_objects):
+            if self.generate_image(radical):
+                success_count += 1
+            
+            # Small delay between images (reduced for Tiny-SD efficiency)
+            if i < len(test_radical_objects) - 1:
+                print("⏳ Brief pause...")
+                time.sleep(2)
+        
+        # Save test log
+        model_name = self.model_id.split('/')[-1].replace('.', '-').lower()
+        log_file = self.logs_dir / f"test_log_{model_name}_{int(time.time())}.txt"
+        with open(log_file, 'w') as f:
+            f.write(f"M4 Test Complete!\n")
+            f.write(f"Model: {self.model_id}\n")
+            f.write(f"Device: {self.device}\n")
+            f.write(f"Test radicals: {[i+1 for i in test_radicals]}\n")
+            f.write(f"Success: {success_count}/{len(test_radical_objects)}\n")
+            f.write(f"Early aborts: {self.abort_stats}\n")
+            f.write(f"Images saved to: {self.output_dir}\n")
+            f.write(f"Test time: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        
+        self.events.emit('run_end', mode='test', success=success_count, total=len(test_radical_objects),
+                         output_dir=str(self.output_dir))
+        update_selector_thumbnails(self.output_dir)
+        print(f"✅ M4 test complete: {success_count}/{len(test_radical_objects)} images generated successfully")
+        print(f"📋 Test log saved to: {log_file}")
+        return success_count > 0
+    
+    def generate_all_images(self):
+        """Generate all 214 radical images with M4 optimizations."""
+        print("🚀 Starting M4 optimized radical generation...")
+        print("=" * 50)
+        
+        if not self.initialize_pipeline():
+            return False
+        
+        radicals = self.load_all_radicals()
+        if not radicals:
+            print("❌ No radicals found")
+            return False
+        
+        total_radicals = len(radicals)
+        success_count = 0
+        failed_radicals = []
+        duplicates = {group[0]['number']: group[1:] for group in self.plan_generation(radicals)}
+        
+        print(f"📊 Total radicals: {total_radicals}")
+        print(f"📦 Batch size: {self.batch_size}")
+        print(f"⏱️  Delay: {self.delay_between_batches}s")
+        print(f"🖥️  Device: {self.device}")
+        print()
+        
+        # Process in batches
+        for batch_start in range(0, total_radicals, self.batch_size):
+            batch_end = min(batch_start + self.batch_size, total_radicals)
+            batch_radicals = radicals[batch_start:batch_end]
+            batch_num = (batch_start // self.batch_size) + 1
+            total_batches = (total_radicals + self.batch_size - 1) // self.batch_size
+            
+            print(f"📦 Batch {batch_num}/{total_batches} ({len(batch_radicals)} radicals)")
+            
+            for radical in batch_radicals:
+                if radical['number'] not in duplicates:
+                    continue  # Linked when its group's first radical was generated
+                
+                # Check memory safety before each image
+                if not self._check_memory_safety():
+                    print(f"🛑 Stopping generation for memory safety")
+                    print(f"📊 Generated {success_count} images before stopping")
+                    return success_count > 0
+                
+                if self.generate_image(radical):
+                    success_count += 1 + self.link_duplicates(radical, duplicates[radical['number']])
+                else:
+                    failed_radicals.append(radical.get('number', '?'))
+                    failed_radicals.extend(duplicate['number'] for duplicate in duplicates[radical['number']])
+            
+            # Extended wait between batches for M4 stability
+            if batch_end < total_radicals:
+                wait_time = self.delay_between_batches
+                if self.device == 'mps':
+                    wait_time = max(wait_time, 8)  # Minimum 8s for MPS with Tiny-SD
+                print(f"⏳ Waiting {wait_time}s for M4 stability...")
+                time.sleep(wait_time)
+                
+                # Extra memory cleanup between batches
+                if self.device == 'mps':
+                    torch.mps.empty_cache()
+                    import gc
+                    gc.collect()
+                    print("🧹 Deep memory cleanup between batches")
+            print()
+        
+        # Save generation log
+        model_name = self.model_id.split('/')[-1].replace('.', '-').lower()
+        log_file = self.logs_dir / f"generation_log_{model_name}_{int(time.time())}.txt"
+        with open(log_file, 'w') as f:
+            f.write(f"M4 Generation Complete!\n")
+            f.write(f"Model: {self.model_id}\n")
+            f.write(f"Device: {self.device}\n")
+            f.write(f"Success: {success_count}/{total_radicals}\n")
+            f.write(f"Failed: {len(failed_radicals)}\n")
+            if failed_radicals:
+                f.write(f"Failed radicals: {failed_radicals}\n")
+            f.write(f"Early aborts: {self.abort_stats}\n")
+            f.write(f"Pipeline recycles: {self.recycle_stats}\n")
+            f.write(f"Images saved to: {self.output_dir}\n")
+            f.write(f"Generation time: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        
+        self.events.emit('run_end', mode='all', success=success_count, total=total_radicals,
+                         output_dir=str(self.output_dir))
+        update_selector_thumbnails(self.output_dir)
+        
+        # Final summary
+        print("🎉 M4 Generation Complete!")
+        print(f"✅ Success: {success_count}/{total_radicals}")
+        print(f"❌ Failed: {len(failed_radicals)}")
+        self._print_abort_stats()
+        print(f"♻️  Pipeline recycles: {len(self.recycle_stats)}")
+        
+        if failed_radicals:
+            print(f"🔄 Failed radicals: {failed_radicals[:10]}...")  # Show first 10
+        
+        print(f"📁 Images saved to: {self.output_dir}")
+        print(f"📋 Log saved to: {log_file}")
+        return success_count > 0
+
+def generate_in_safe_chunks(start_radical=1, chunk_size=20):
+    """
+    Generate images in safe memory chunks to prevent freezing.
+    
+    Args:
+        start_radical: Which radical number to start from (1-214)
+        chunk_size: How many radicals to process in this session
+    """
+    print(f"🛡️  MEMORY-SAFE MODE: Processing radicals {start_radical} to {start_radical + chunk_size - 1}")
+    print("=" * 60)
+    
+    generator = M4OptimizedRadicalGenerator()
+    
+    if not generator.initialize_pipeline():
+        return False
+    
+    radicals = generator.load_all_radicals()
+    if not radicals:
+        print("❌ No radicals found")
+        return False
+    
+    # Select chunk of radicals
+    start_idx = start_radical - 1  # Convert to 0-based
+    end_idx = min(start_idx + chunk_size, len(radicals))
+    chunk_radicals = radicals[start_idx:end_idx]
+    
+    print(f"📊 Processing {len(chunk_radicals)} radicals in this safe chunk")
+    print(f"♻️  Pipeline recycled in process at {RECYCLE_GROWTH_RATIO:.0%} memory growth")
+    print()
+    
+    success_count = 0
+    for i, radical in enumerate(chunk_radicals):
+        generator._check_memory_growth()
+        if generator.generate_image(radical):
+            success_count += 1
+        
+        # Small delay between each image for stability (reduced for Tiny-SD)
+        if i < len(chunk_radicals) - 1:
+            time.sleep(1.5)
+    
+    # Save chunk log
+    logs_dir = Path('./logs')
+    logs_dir.mkdir(exist_ok=True)
+    log_file = logs_dir / f"chunk_log_{start_radical}_{int(time.time())}.txt"
+    with open(log_file, 'w') as f:
+        f.write(f"Safe Chunk Complete!\n")
+        f.write(f"Chunk: radicals {start_radical} to {start_radical + chunk_size - 1}\n")
+        f.write(f"Success: {success_count}/{len(chunk_radicals)}\n")
+        f.write(f"Images saved to: {generator.output_dir}\n")
+        f.write(f"Chunk time: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+    
+    generator.events.emit('run_end', mode='chunk', success=success_count, total=len(chunk_radicals),
+                          output_dir=str(generator.output_dir))
+    update_selector_thumbnails(generator.output_dir)
+    print(f"✅ Chunk complete: {success_count}/{len(chunk_radicals)} images generated")
+    print(f"📋 Chunk log saved to: {log_file}")
+    print(f"🔄 To continue: generate_in_safe_chunks({start_radical + chunk_size})")
+    return success_count > 0
+
+def _pin_worker(cpu_ids, threads):
+    """Pin the current process to cpu_ids and fix torch's thread pools."""
+    if cpu_ids:
+        try:
+            if hasattr(os, 'sched_setaffinity'):
+                os.sched_setaffinity(0, cpu_ids)
+            else:
+                psutil.Process().cpu_affinity(cpu_ids)
+        except (OSError, AttributeError, ValueError) as e:
+            print(f"⚠️  Could not pin CPU affinity: {e}")
+    
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Already fixed once parallel work has started
+
+def _shard_worker(worker_index, model_key, groups, output_dir, cpu_ids, threads, stats_queue,
+                  scheduler=None, num_inference_steps=None, cpu_profile=None, memory_options=None):
+    """Worker process: load a private pipeline and generate one shard of prompt groups (lists of radical numbers)."""
+    _pin_worker(cpu_ids, threads)
+    
+    config = MODEL_CONFIGS[model_key]
+    stats = {
+        'worker': worker_index,
+        'cpus': cpu_ids,
+        'threads': threads,
+        'images': 0,
+        'linked': 0,
+        'failed': 0,
+        'skipped': 0,
+        'busy_seconds': 0.0,
+        'cpu_seconds': 0.0,
+        'wall_seconds': 0.0,
+        'early_aborts': {},
+        'restart_required': False
+    }
+    start_wall = time.time()
+    generator = None
+    start_cpu = time.process_time()
+    
+    try:
+        generator = M4OptimizedRadicalGenerator(
+            model_id=config['model_id'],
+            delay_between_batches=config['delay'],
+            output_dir=output_dir,
+            scheduler=scheduler or config.get('scheduler'),
+            num_inference_steps=num_inference_steps,
+            cpu_profile=cpu_profile,
+            share_weights=True,
+            **(memory_options or {})
+        )
+        if not generator.initialize_pipeline():
+            stats['failed'] = sum(len(group) for group in groups)
+            return
+        
+        radicals = {radical['number']: radical for radical in generator.load_all_radicals()}
+        done = {number for number, entry in load_manifest(output_dir).items() if entry.get('status') == 'ok'}
+        
+        for group in groups:
+            number, duplicates = group[0], group[1:]
+            output_file = generator.output_dir / f"radical_{number:03d}.png"
+            if all(n in done and (generator.output_dir / f"radical_{n:03d}.png").exists() for n in group):
+                stats['skipped'] += len(group)
+                continue
+            
+            generator._check_memory_growth()
+            image_start = time.time()
+            success = generator.generate_image(radicals[number])
+            elapsed = time.time() - image_start
+            stats['busy_seconds'] += elapsed
+            
+            if success:
+                stats['images'] += 1
+            else:
+                stats['failed'] += len(group)
+            append_manifest(output_dir, {
+                'radical': number,
+                'status': 'ok' if success else 'failed',
+                'worker': worker_index,
+                'seconds': round(elapsed, 2),
+                'file': output_file.name,
+                'time': time.strftime('%Y-%m-%d %H:%M:%S')
+            })
+            if success:
+                stats['linked'] += generator.link_duplicates(radicals[number], [radicals[n] for n in duplicates])
+    except PipelineRestartRequired:
+        # The manifest records what is done; generate_sharded starts a fresh worker set for the rest
+        stats['restart_required'] = True
+    finally:
+        if generator is not None:
+            stats['early_aborts'] = generator.abort_stats
+            stats['recycles'] = len(generator.recycle_stats)
+            generator.events.emit('run_end', mode='shard', worker=worker_index,
+                                  success=stats['images'] + stats['linked'],
+                                  total=sum(len(group) for group in groups), output_dir=str(output_dir))
+        stats['wall_seconds'] = time.time() - start_wall
+        stats['cpu_seconds'] = time.process_time() - start_cpu
+        try:
+            # Proportional set size: shared pages (mapped store weights) count 1/N per process
+            stats['pss_gb'] = round(psutil.Process().memory_full_info().pss / 1024**3, 2)
+        except (AttributeError, psutil.Error):
+            stats['pss_gb'] = None  # PSS is only reported on Linux
+        stats_queue.put(stats)
+
+def generate_sharded(model_key, workers, output_dir=None, threads_per_worker=None, scheduler=None,
+                     num_inference_steps=None, cpu_profile=None, memory_options=None):
+    """
+    Generate all radicals with N worker processes, each owning one pipeline.
+    
+    Radicals are grouped by prompt (see plan_prompt_groups) and the groups dealt
+    round-robin into N shards, so each prompt is generated once. Each worker is pinned to its own
+    block of CPUs with a fixed torch thread count, and all workers record progress
+    in a shared manifest.jsonl so an interrupted run resumes where it stopped.
+    
+    Args:
+        model_key: Key into MODEL_CONFIGS
+        workers: Number of worker processes
+        output_dir: Existing folder to resume into (default: new generated-* folder)
+        threads_per_worker: Torch threads per worker (default: CPUs in its block)
+        scheduler: Key into SCHEDULERS (default: the model's configured scheduler)
+        num_inference_steps: Fixed step count (default: tuned value, if any)
+        cpu_profile: Overrides for DEFAULT_CPU_PROFILE (threads stay as pinned per worker)
+        memory_options: memory_strategy / retune_memory / memory_share; each worker gets 1/N of the run's share
+    """
+    config = MODEL_CONFIGS[model_key]
+    
+    if output_dir is None:
+        model_name = config['model_id'].split('/')[-1].replace('.', '-').lower()
+        output_dir = Path("../../assets/img/radical") / f"generated-{model_name}-{uuid.uuid4().hex[:8]}"
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    radicals = load_all_radicals()
+    if not radicals:
+        print("❌ No radicals found")
+        return False
+    
+    done = {number for number, entry in load_manifest(output_dir).items() if entry.get('status') == 'ok'}
+    numbers = [radical['number'] for radical in radicals]
+    remaining = [number for number in numbers if number not in done]
+    groups = [[radical['number'] for radical in group] for group in plan_prompt_groups(config['model_id'], radicals)]
+    remaining_groups = [group for group in groups if any(number not in done for number in group)]
+    
+    # Contiguous CPU blocks keep each worker on one socket / cache domain
+    if hasattr(os, 'sched_getaffinity'):
+        available_cpus = sorted(os.sched_getaffinity(0))
+    else:
+        available_cpus = list(range(os.cpu_count() or 1))
+    workers = max(1, min(workers, len(available_cpus), len(remaining_groups) or 1))
+    block_size = len(available_cpus) // workers
+    cpu_blocks = [available_cpus[i * block_size:(i + 1) * block_size] for i in range(workers)]
+    shards = [remaining_groups[i::workers] for i in range(workers)]
+    
+    print(f"🧩 SHARDED MODE: {workers} workers, {len(remaining)}/{len(numbers)} radicals remaining")
+    if len(groups) < len(numbers):
+        print(f"🔗 Prompt dedup: {len(numbers)} radicals → {len(groups)} unique prompts")
+    print(f"📁 Output directory: {output_dir}")
+    for index in range(workers):
+        threads = threads_per_worker or len(cpu_blocks[index])
+        print(f"   Worker {index}: {sum(len(group) for group in shards[index])} radicals, {threads} threads, CPUs {cpu_blocks[index][0]}-{cpu_blocks[index][-1]}")
+    print()
+    
+    if not remaining:
+        print("✅ Nothing to do, every radical is already in the manifest")
+        return True
+    
+    # spawn gives each worker a clean interpreter instead of a forked copy of torch state
+    context = multiprocessing.get_context('spawn')
+    stats_queue = context.Queue()
+    processes = []
+    start_time = time.time()
+    
+    for index in range(workers):
+        threads = threads_per_worker or len(cpu_blocks[index])
+        process = context.Process(
+            target=_shard_worker,
+            args=(index, model_key, shards[index], str(output_dir), cpu_blocks[index], threads, stats_queue,
+                  scheduler, num_inference_steps, {**(cpu_profile or {}), 'threads': None},
+                  {**(memory_options or {}), 'memory_share': (memory_options or {}).get('memory_share', 1.0) / workers}),
+            name=f"shard-{index}"
+        )
+        process.start()
+        processes.append(process)
+    
+    worker_stats = []
+    while len(worker_stats) < len(processes):
+        try:
+            worker_stats.append(stats_queue.get(timeout=10))
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                print("⚠️  A worker exited without reporting (crash?), resume with --output-dir to retry")
+                break
+    for process in processes:
+        process.join()
+    
+    wall_seconds = time.time() - start_time
+    total_images = sum(stats['images'] for stats in worker_stats)
+    total_linked = sum(stats.get('linked', 0) for stats in worker_stats)
+    total_failed = sum(stats['failed'] for stats in worker_stats)
+    images_per_minute = total_images / (wall_seconds / 60) if wall_seconds > 0 else 0
+    
+    print("🎉 SHARDED GENERATION COMPLETE!")
+    print(f"✅ Generated: {total_images} images, 🔗 Linked: {total_linked}, ❌ Failed: {total_failed}")
+    print(f"⏱️  Wall time: {wall_seconds / 60:.1f} min")
+    print(f"🚀 Aggregate throughput: {images_per_minute:.2f} images/min")
+    for stats in sorted(worker_stats, key=lambda s: s['worker']):
+        busy = stats['busy_seconds'] / stats['wall_seconds'] if stats['wall_seconds'] else 0
+        cpu = stats['cpu_seconds'] / (stats['wall_seconds'] * stats['threads']) if stats['wall_seconds'] else 0
+        print(f"   Worker {stats['worker']}: {stats['images']} images, {stats.get('linked', 0)} linked, {stats['failed']} failed, "
+              f"{stats['skipped']} skipped, busy {busy:.0%}, CPU utilisation {cpu:.0%} of {stats['threads']} threads"
+              + (f", PSS {stats['pss_gb']:.2f}GB" if stats.get('pss_gb') is not None else ''))
+    
+    # Save sharded run log
+    logs_dir = Path('./logs')
+    logs_dir.mkdir(exist_ok=True)
+    model_name = config['model_id'].split('/')[-1].replace('.', '-').lower()
+    log_file = logs_dir / f"sharded_log_{model_name}_{int(time.time())}.txt"
+    with open(log_file, 'w') as f:
+        f.write(f"Sharded Generation Complete!\n")
+        f.write(f"Model: {config['model_id']}\n")
+        f.write(f"Workers: {workers}\n")
+        f.write(f"Success: {total_images + total_linked}/{len(remaining)} ({total_linked} linked)\n")
+        f.write(f"Failed: {total_failed}\n")
+        f.write(f"Images per minute: {images_per_minute:.2f}\n")
+        for stats in worker_stats:
+            f.write(f"Worker {stats['worker']}: {json.dumps(stats)}\n")
+        f.write(f"Images saved to: {output_dir}\n")
+        f.write(f"Generation time: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+    
+    if any(stats.get('restart_required') for stats in worker_stats) and total_images > 0:
+        print("🔄 A worker leaked memory past a pipeline reload, resuming in fresh worker processes...")
+        return generate_sharded(model_key, workers, output_dir, threads_per_worker, scheduler,
+                                num_inference_steps, cpu_profile, memory_options) or total_images > 0
+    
+    # Once for the whole folder, after every worker has exited
+    update_selector_thumbnails(output_dir)
+    print(f"📁 Images saved to: {output_dir}")
+    print(f"📋 Log saved to: {log_file}")
+    return total_images > 0
+
+def benchmark_cpu_profiles(model_key, steps=4, runs=2, threads=None):
+    """
+    Time each CPU profile option on a fixed prompt and seed and print the speed-up over float32.
+    
+    Each profile loads a fresh pipeline (compile and quantisation modify it in place),
+    runs one untimed warm-up generation, then runs `runs` timed generations of `steps` steps.
+    Results are written to logs/cpu_benchmark_{model}_{time}.json.
+    """
+    config = MODEL_CONFIGS[model_key]
+    if not cpu_supports_bf16():
+        print("💡 No native bfloat16 on this CPU: the bf16 row shows emulated speed")
+    
+    radical = (load_all_radicals() or [{'number': 1, 'meaning': 'one'}])[0]
+    results = []
+    for name, overrides in CPU_BENCHMARK_PROFILES:
+        print(f"\n⏱️  CPU profile: {name}")
+        generator = M4OptimizedRadicalGenerator(
+            model_id=config['model_id'],
+            output_dir=Path('./logs/cpu_benchmark'),
+            scheduler=config.get('scheduler'),
+            num_inference_steps=steps,
+            cpu_profile={**overrides, 'threads': threads}
+        )
+        if generator.device != 'cpu':
+            print(f"❌ CPU benchmark needs the cpu device, found {generator.device}")
+            return False
+        try:
+            if not generator.initialize_pipeline():
+                results.append({'profile': name, 'error': 'pipeline failed to load'})
+                continue
+            
+            prompt = generator.create_prompt(radical)
+            params = generator._get_generation_params()
+            timings = []
+            for run in range(runs + 1):
+                start_time = time.time()
+                with generator._inference_context():
+                    generator.pipe(prompt=prompt, generator=torch.Generator(device='cpu').manual_seed(0), **params)
+                if run > 0:  # First run is the warm-up
+                    timings.append(time.time() - start_time)
+            
+            seconds = sum(timings) / len(timings)
+            results.append({'profile': name, 'seconds_per_image': round(seconds, 3),
+                            'seconds_per_step': round(seconds / params['num_inference_steps'], 3),
+                            'threads': torch.get_num_threads(), 'bf16': generator.use_bf16_autocast})
+            print(f"   {seconds:.2f}s per image ({seconds / params['num_inference_steps']:.2f}s per step)")
+        except Exception as e:
+            print(f"   ❌ {name} failed: {e}")
+            results.append({'profile': name, 'error': str(e)})
+        finally:
+            generator.pipe = None
+            gc.collect()
+    
+    baseline = next((r['seconds_per_image'] for r in results if r['profile'] == 'float32' and 'error' not in r), None)
+    print("\n📊 CPU PROFILE BENCHMARK")
+    print(f"{'Profile':<16}{'s/image':>10}{'s/step':>10}{'speed-up':>10}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['profile']:<16}{'failed':>10}")
+            continue
+        speedup = f"{baseline / result['seconds_per_image']:.2f}x" if baseline and result['seconds_per_image'] else '-'
+        result['speedup'] = speedup
+        print(f"{result['profile']:<16}{result['seconds_per_image']:>10.2f}{result['seconds_per_step']:>10.2f}{speedup:>10}")
+    
+    model_name = config['model_id'].split('/')[-1].replace('.', '-').lower()
+    log_file = Path('./logs') / f"cpu_benchmark_{model_name}_{int(time.time())}.json"
+    with open(log_file, 'w') as f:
+        json.dump({'model': config['model_id'], 'steps': steps, 'runs': runs, 'results': results}, f, indent=2)
+    print(f"📋 Benchmark saved to: {log_file}")
+    return True
+
+def find_selected_drafts(draft_dir, entries):
+    """Radical numbers whose image in assets/img/selected is this folder's draft (byte-identical)."""
+    selected = []
+    for number, entry in sorted(entries.items()):
+        draft_file = Path(draft_dir) / entry['file']
+        selected_file = SELECTED_DIR / entry['file']
+        if draft_file.exists() and selected_file.exists() and filecmp.cmp(draft_file, selected_file, shallow=False):
+            selected.append(number)
+    return selected
+
+def promote_drafts(draft_dir, radical_numbers=None, mode='latent', strength=PROMOTE_STRENGTH,
+                   scheduler=None, num_inference_steps=None, output_dir=None, cpu_profile=None,
+                   memory_options=None):
+    """
+    Promote selected drafts from a --draft folder to full-resolution renders.
+    
+    Args:
+        draft_dir: Folder written by a --draft run (with manifest.jsonl and latents/)
+        radical_numbers: Drafts to promote (default: the ones picked into assets/img/selected)
+        mode: 'latent' to refine upsampled draft latents, 'rerender' to render again from the seed
+        strength: img2img strength for 'latent' mode
+        scheduler: Key into SCHEDULERS (default: the scheduler the drafts were made with)
+        num_inference_steps: Fixed step count (default: tuned value, if any)
+        output_dir: Output folder (default: a new generated-{model}-{id} folder)
+        cpu_profile: Overrides for DEFAULT_CPU_PROFILE
+        memory_options: memory_strategy / retune_memory generator arguments
+    """
+    draft_dir = Path(draft_dir)
+    entries = {number: entry for number, entry in load_manifest(draft_dir).items()
+               if entry.get('draft') and entry.get('status') == 'ok'}
+    if not entries:
+        print(f"❌ No drafts found in {draft_dir}")
+        return False
+    
+    if radical_numbers is None:
+        radical_numbers = find_selected_drafts(draft_dir, entries)
+        print(f"🔍 {len(radical_numbers)} drafts picked in {SELECTED_DIR}")
+    missing = [number for number in radical_numbers if number not in entries]
+    if missing:
+        print(f"⚠️  No draft for radicals: {missing}")
+    radical_numbers = [number for number in radical_numbers if number in entries]
+    if not radical_numbers:
+        print("❌ Nothing to promote (pick drafts in radical-selector or pass --radicals)")
+        return False
+    
+    first = entries[radical_numbers[0]]
+    generator = M4OptimizedRadicalGenerator(
+        model_id=first['model_id'],
+        output_dir=output_dir,
+        scheduler=scheduler or first.get('scheduler'),
+        num_inference_steps=num_inference_steps,
+        cpu_profile=cpu_profile,
+        **(memory_options or {})
+    )
+    if not generator.initialize_pipeline():
+        return False
+    
+    print(f"⬆️  Promoting {len(radical_numbers)} drafts ({mode}) from {draft_dir}")
+    promoted = 0
+    for number in radical_numbers:
+        if generator.promote_draft(entries[number], draft_dir, mode=mode, strength=strength):
+            promoted += 1
+    
+    print(f"✅ Promoted {promoted}/{len(radical_numbers)} drafts")
+    print(f"📁 Images saved to: {generator.output_dir}")
+    return promoted > 0
+
+def test_memory_optimization():
+    """Quick test to verify memory optimizations work - generates only 1 image."""
+    print("🧪 Testing M4 memory optimizations with single image generation")
+    print("=" * 60)
+    
+    generator = M4OptimizedRadicalGenerator()
+    
+    if not generator.initialize_pipeline():
+        print("❌ Pipeline initialization failed")
+        return False
+    
+    radicals = generator.load_all_radicals()
+    if not radicals:
+        print("❌ No radicals found")
+        return False
+    
+    # Test with just the first radical
+    test_radical = radicals[0]
+    print(f"🎯 Testing with radical {test_radical.get('number', 1)}")
+    
+    success = generator.generate_image(test_radical)
+    
+    if success:
+        print("✅ Memory optimization test PASSED!")
+        print("💡 You can now run main() or generate_in_safe_chunks() for full generation")
+    else:
+        print("❌ Memory optimization test FAILED!")
+        print("💡 Try restarting Python and closing other applications")
+    
+    return success
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Candidate Scoring
+=================
+
+Pre-ranks generated candidates so reviewers look at the likely keepers first.
+All candidates of a radical (radical_NNN.png across the generated-* folders) are
+decoded in parallel, downscaled into one NumPy stack and measured together:
+
+    contrast        RMS contrast (standard deviation of luma)
+    colourfulness   Hasler-Süsstrunk colourfulness of the opponent channels
+    edge_density    share of pixels whose luma gradient is above EDGE_THRESHOLD
+    dominant        share of pixels in the most common luma bin (near-uniform images)
+    clipped_*       share of pixels crushed to black or blown to white
+    brightness      mean luma
+
+The metrics combine into a 0-100 triage score. Candidates flagged blank or uniform
+score 0; dark, clipped and noisy candidates are marked down. This is a heuristic
+for ordering the review, not a judgement of style.
+
+Every generated-* folder gets a candidate_scores.json sorted by score. Each
+entry has its metrics and flags. Ranks are not stored, since they depend on
+which folders exist: radical-selector ranks the scores of every folder it lists
+(?sort=score), and --radical ranks every scored folder next to the ones given.
+Scoring is incremental by SHA-256: a file whose hash is already in any folder's
+table (an unchanged file, or a hard-linked duplicate) is not decoded again.
+Hashes come from build_thumbnails.py's selector_manifest.json when its mtime and
+size match.
+
+Usage:
+    python score_candidates.py
+    python score_candidates.py --radical 85
+    python score_candidates.py --flagged --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from build_thumbnails import RADICAL_FILE_PATTERN, file_digest, load_selector_manifest
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Where radical-selector reads generated-* candidate folders (relative to scripts/img/)
+DEFAULT_ROOT = Path('../../_data/assets/img/radical')
+SCORES_FILENAME = 'candidate_scores.json'
+SCORES_VERSION = 1        # Bump when a metric changes, so every candidate is scored again
+
+SCORE_SIZE = 256          # Candidates are compared at this size, whatever their resolution
+
+# Metric thresholds, on luma in 0-1
+EDGE_THRESHOLD = 0.08     # Gradient that counts as an edge
+LUMA_BINS = 32            # Histogram bins for the dominant-value share
+CLIP_LOW = 2 / 255
+CLIP_HIGH = 253 / 255
+
+# Flags
+BLANK_CONTRAST = 0.02     # Below this the image is flat
+UNIFORM_SHARE = 0.9       # One luma bin covers this much of the image
+DARK_BRIGHTNESS = 10 / 255  # Same threshold as the generator's black-image retry
+CLIPPED_SHARE = 0.5
+NOISY_EDGES = 0.45        # Edges everywhere: noise or texture, not a clean illustration
+
+# Score: each term saturates at its target
+CONTRAST_TARGET = 0.25
+COLOUR_TARGET = 0.2
+EDGE_TARGET = 0.15
+WEIGHTS = {'contrast': 0.4, 'colourfulness': 0.3, 'edge_density': 0.3}
+CLIP_TOLERANCE = 0.35     # White or black backgrounds are fine up to this share
+
+# =============================================================================
+# METRICS
+# =============================================================================
+
+def load_pixels(path):
+    """Decode one candidate into a SCORE_SIZE x SCORE_SIZE RGB uint8 array."""
+    with Image.open(path) as image:
+        rgb = image.convert('RGB')
+        if rgb.size != (SCORE_SIZE, SCORE_SIZE):
+            rgb = rgb.resize((SCORE_SIZE, SCORE_SIZE), Image.Resampling.BILINEAR)
+        return np.asarray(rgb)
+
+def measure_stack(pixels):
+    """Metrics of a (N, H, W, 3) uint8 stack, each an array of N values."""
+    count = len(pixels)
+    rgb = pixels.astype(np.float32) / 255
+    red, green, blue = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    luma = 0.299 * red + 0.587 * green + 0.114 * blue
+    flat = luma.reshape(count, -1)
+
+    opponent_rg = (red - green).reshape(count, -1)
+    opponent_yb = (0.5 * (red + green) - blue).reshape(count, -1)
+    colourfulness = (np.hypot(opponent_rg.std(axis=1), opponent_yb.std(axis=1))
+                     + 0.3 * np.hypot(opponent_rg.mean(axis=1), opponent_yb.mean(axis=1)))
+
+    gradient = np.hypot(np.diff(luma, axis=2)[:, :-1, :], np.diff(luma, axis=1)[:, :, :-1])
+    edge_density = (gradient > EDGE_THRESHOLD).reshape(count, -1).mean(axis=1)
+
+    # Per-image histograms in one bincount, offset by image
+    bins = np.minimum((flat * LUMA_BINS).astype(np.int64), LUMA_BINS - 1)
+    bins += np.arange(count)[:, None] * LUMA_BINS
+    histogram = np.bincount(bins.ravel(), minlength=count * LUMA_BINS).reshape(count, LUMA_BINS)
+
+    return {
+        'brightness': flat.mean(axis=1),
+        'contrast': flat.std(axis=1),
+        'colourfulness': colourfulness,
+        'edge_density': edge_density,
+        'dominant': histogram.max(axis=1) / flat.shape[1],
+        'clipped_shadows': (flat <= CLIP_LOW).mean(axis=1),
+        'clipped_highlights': (flat >= CLIP_HIGH).mean(axis=1)
+    }
+
+def score_metrics(metrics):
+    """0-100 triage scores and flag masks for arrays of metrics (as returned by measure_stack)."""
+    contrast = np.asarray(metrics['contrast'])
+    edges = np.asarray(metrics['edge_density'])
+    clipped = np.maximum(metrics['clipped_shadows'], metrics['clipped_highlights'])
+
+    flags = {
+        'blank': contrast < BLANK_CONTRAST,
+        'uniform': np.asarray(metrics['dominant']) > UNIFORM_SHARE,
+        'dark': np.asarray(metrics['brightness']) < DARK_BRIGHTNESS,
+        'clipped': clipped > CLIPPED_SHARE,
+        'noisy': edges > NOISY_EDGES
+    }
+
+    score = (WEIGHTS['contrast'] * np.minimum(contrast / CONTRAST_TARGET, 1)
+             + WEIGHTS['colourfulness'] * np.minimum(np.asarray(metrics['colourfulness']) / COLOUR_TARGET, 1)
+             + WEIGHTS['edge_density'] * np.minimum(edges / EDGE_TARGET, 1))
+    score *= 1 - np.maximum(clipped - CLIP_TOLERANCE, 0)
+    score *= np.where(flags['dark'], 0.5, 1) * np.where(flags['noisy'], 0.5, 1)
+    score = np.where(flags['blank'] | flags['uniform'], 0, score)
+    return np.round(score * 100, 1), flags
+
+# =============================================================================
+# SCORE TABLES
+# =============================================================================
+
+def load_scores(folder):
+    """A folder's candidate_scores.json, or None if missing or from another metrics version."""
+    try:
+        with open(folder / SCORES_FILENAME, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        if table.get('version') == SCORES_VERSION:
+            return table
+    except (OSError, ValueError):
+        pass
+    return None
+
+def list_candidates(folder, previous):
+    """
+    (filename, radical, mtime, size, sha256) of every candidate in a folder.
+
+    Hashes are reused from the previous score table or the selector manifest when
+    mtime and size still match; only other files are hashed.
+    """
+    known = {}
+    for entry in (load_selector_manifest(folder) or {}).get('radicals', {}).values():
+        known[entry['filename']] = (entry['mtime'], entry['bytes'], entry['sha256'])
+    for entry in (previous or {}).get('candidates', []):
+        known[entry['filename']] = (entry['mtime'], entry['bytes'], entry['sha256'])
+
+    candidates = []
+    for path in sorted(folder.glob('radical_*.png')):
+        match = RADICAL_FILE_PATTERN.match(path.name)
+        if not match:
+            continue
+        stat = path.stat()
+        cached = known.get(path.name)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            digest = cached[2]
+        else:
+            digest = file_digest(path)
+        candidates.append((path.name, int(match.group(1)), stat.st_mtime, stat.st_size, digest))
+    return candidates
+
+def score_folders(folders, jobs=None, force=False):
+    """
+    Score every candidate in folders and rewrite their candidate_scores.json.
+
+    Returns {folder: table} and stats (candidates, scored, reused, seconds).
+    """
+    start_time = time.time()
+    folders = [Path(folder) for folder in folders]
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        previous = dict(zip(folders, executor.map(load_scores, folders)))
+        listed = dict(zip(folders, executor.map(lambda folder: list_candidates(folder, previous[folder]),
+                                                folders)))
+
+        # Metrics already measured, by file hash, from every folder's previous table
+        by_digest = {}
+        if not force:
+            for table in previous.values():
+                for entry in (table or {}).get('candidates', []):
+                    by_digest[entry['sha256']] = entry['metrics']
+
+        # New hashes, grouped by radical so each radical's candidates form one stack
+        pending, queued = {}, set()
+        for folder, candidates in listed.items():
+            for filename, number, _, _, digest in candidates:
+                if digest not in by_digest and digest not in queued:
+                    pending.setdefault(number, {})[digest] = folder / filename
+                    queued.add(digest)
+
+        for number, paths in sorted(pending.items()):
+            digests = list(paths)
+            pixels = np.stack(list(executor.map(load_pixels, paths.values())))
+            metrics = measure_stack(pixels)
+            for i, digest in enumerate(digests):
+                by_digest[digest] = {name: round(float(values[i]), 4) for name, values in metrics.items()}
+
+    # Score and rank every candidate (cheap), grouped by radical across folders
+    rows = [(folder, *candidate) for folder, candidates in listed.items() for candidate in candidates]
+    if rows:
+        names = list(by_digest[rows[0][5]])
+        arrays = {name: np.array([by_digest[row[5]][name] for row in rows]) for name in names}
+        scores, flags = score_metrics(arrays)
+    else:
+        scores, flags = np.zeros(0), {}
+
+    entries = {folder: [] for folder in folders}
+    for i, (folder, filename, number, mtime, size, digest) in enumerate(rows):
+        entry = {
+            'filename': filename,
+            'radical': number,
+            'score': float(scores[i]),
+            'flags': [name for name, mask in flags.items() if mask[i]],
+            'metrics': by_digest[digest],
+            'mtime': mtime,
+            'bytes': size,
+            'sha256': digest
+        }
+        entries[folder].append(entry)
+
+    tables = {}
+    for folder in folders:
+        table = {
+            'version': SCORES_VERSION,
+            'folder': folder.name,
+            'candidates': sorted(entries[folder], key=lambda entry: (-entry['score'], entry['radical']))
+        }
+        old = previous[folder]
+        if old is None or old.get('candidates') != table['candidates']:
+            table['updated_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+            temp_file = folder / f"{SCORES_FILENAME}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(table, f, indent=1)
+            os.replace(temp_file, folder / SCORES_FILENAME)
+        else:
+            table['updated_at'] = old.get('updated_at')
+        tables[folder] = table
+
+    scored = sum(len(paths) for paths in pending.values())
+    return tables, {'candidates': len(rows), 'scored': scored, 'reused': len(rows) - scored,
+                    'seconds': round(time.time() - start_time, 2)}
+
+def rank_rows(rows):
+    """Add rank and of (candidates of the same radical) to rows, best score first."""
+    by_radical = {}
+    for row in rows:
+        by_radical.setdefault(row['radical'], []).append(row)
+    for candidates in by_radical.values():
+        for rank, row in enumerate(sorted(candidates, key=lambda row: -row['score']), 1):
+            row['rank'] = rank
+            row['of'] = len(candidates)
+    return rows
+
+def sibling_tables(folders):
+    """Existing score tables of the other generated-* folders next to folders, without scoring them."""
+    given = {folder.resolve() for folder in folders}
+    tables = {}
+    for parent in {folder.resolve().parent for folder in folders}:
+        for folder in sorted(parent.glob('generated-*')):
+            if folder.is_dir() and folder not in given:
+                table = load_scores(folder)
+                if table:
+                    tables[folder] = table
+    return tables
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Score and pre-rank generated radical candidates',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python score_candidates.py
+    python score_candidates.py --radical 85
+    python score_candidates.py --flagged
+    python score_candidates.py ../../_data/assets/img/radical/generated-tiny-sd-1a2b3c4d --json
+        """)
+    parser.add_argument('folders', nargs='*',
+                        help=f'Candidate folders to score (default: every generated-* folder in {DEFAULT_ROOT})')
+    parser.add_argument('-r', '--radical', type=int, default=None,
+                        help='Print the ranking of one radical across folders')
+    parser.add_argument('--flagged', action='store_true',
+                        help='Print every flagged candidate (blank, uniform, dark, clipped, noisy)')
+    parser.add_argument('-f', '--force', action='store_true', help='Score every candidate again')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Decoding threads (default: CPU count)')
+    parser.add_argument('--json', action='store_true', help='Print the selected candidates as JSON')
+
+    args = parser.parse_args()
+    folders = [Path(folder) for folder in args.folders] or sorted(
+        path for path in DEFAULT_ROOT.glob('generated-*') if path.is_dir())
+    missing = [folder for folder in folders if not folder.is_dir()]
+    if missing or not folders:
+        print(f"❌ No candidate folders found: {', '.join(map(str, missing)) or DEFAULT_ROOT}")
+        sys.exit(1)
+
+    tables, stats = score_folders(folders, args.jobs, args.force)
+    rows = [{'folder': folder.name, **entry} for folder, table in tables.items() for entry in table['candidates']]
+    # Rank against every scored folder, as radical-selector does, not just the ones scored now
+    siblings = [{'folder': folder.name, **entry} for folder, table in sibling_tables(folders).items()
+                for entry in table['candidates']]
+    rank_rows(rows + siblings)
+    if args.radical is not None:
+        rows = sorted((row for row in rows + siblings if row['radical'] == args.radical), key=lambda row: row['rank'])
+    elif args.flagged:
+        rows = sorted((row for row in rows if row['flags']), key=lambda row: (row['radical'], row['folder']))
+    else:
+        rows = None
+
+    if args.json:
+        print(json.dumps(rows if rows is not None else {'stats': stats}, indent=2))
+        return
+
+    print("Candidate Scoring")
+    print("=" * 70)
+    print(f"🖼️  {len(folders)} folders, {stats['candidates']} candidates: {stats['scored']} scored, "
+          f"{stats['reused']} reused by hash in {stats['seconds']:.1f}s")
+    flagged = {}
+    for table in tables.values():
+        for entry in table['candidates']:
+            for flag in entry['flags']:
+                flagged[flag] = flagged.get(flag, 0) + 1
+    if flagged:
+        print(f"🚩 Flagged: {', '.join(f'{count} {flag}' for flag, count in sorted(flagged.items()))}")
+
+    if rows is not None:
+        print("-" * 70)
+        for row in rows:
+            flags = f"  [{', '.join(row['flags'])}]" if row['flags'] else ''
+            print(f"{row['rank']:>3}/{row['of']:<3} {row['score']:5.1f}  radical {row['radical']:3d}  "
+                  f"{row['folder']}{flags}")
+        if not rows:
+            print("No matching candidates")
+    print(f"📋 Score tables: {SCORES_FILENAME} in each folder")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Font Subsetter
+==============
+
+Subsets the web fonts in assets/fonts to exactly the characters the site renders.
+Code points are collected from r214.yml, the Jekyll templates and ka_data.csv,
+each font is cut down to those glyphs and written as WOFF2 with a hash-stamped
+filename, alongside a JSON size report.
+
+Fonts are only regenerated when the character set (or the source font) changes.
+
+Usage:
+    python subset_fonts.py
+    python subset_fonts.py --force
+    python subset_fonts.py -o ../../assets/fonts/subset
+"""
+
+import os
+import sys
+import csv
+import json
+import glob
+import hashlib
+import argparse
+import time
+
+import yaml
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Fonts to subset: (output name, path relative to the project root)
+FONT_SOURCES = [
+    ('KosugiMaru-Regular', os.path.join('assets', 'fonts', 'kanji', 'KosugiMaru-Regular.ttf')),
+    ('Otsutome', os.path.join('assets', 'fonts', 'Otsutome', 'Otsutome.woff2')),
+    ('JapaneseRadicals-Regular', os.path.join('assets', 'fonts', 'japaneseRadicals', 'JapaneseRadicals-Regular.ttf')),
+]
+
+# Templates scanned for literal characters (relative to the project root)
+TEMPLATE_PATTERNS = [
+    'index.html',
+    os.path.join('_includes', '*.html'),
+    os.path.join('_layouts', '*.html'),
+    os.path.join('pages', '*.html'),
+    os.path.join('pages', '*.md'),
+]
+
+# Printable ASCII is always kept so Latin UI text never falls back
+BASE_CODE_POINTS = set(range(0x20, 0x7F))
+
+HASH_LENGTH = 8
+REPORT_FILENAME = 'subset_report.json'
+
+# =============================================================================
+# UTILITY FUNCTIONS
+# =============================================================================
+
+def get_project_paths():
+    """Get project root and common paths."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.join(script_dir, '..', '..')
+    return {
+        'project_root': project_root,
+        'data_file': os.path.join(project_root, '_data', 'r214.yml'),
+        'ka_data_file': os.path.join(project_root, 'resources', 'kanji-data-media-master', 'language-data', 'ka_data.csv'),
+        'output_dir': os.path.join(project_root, 'assets', 'fonts', 'subset')
+    }
+
+def code_points_from_text(text):
+    """Return the set of non-control code points used in a string."""
+    return {ord(char) for char in text if ord(char) >= 0x20}
+
+def file_digest(path):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def charset_digest(code_points):
+    """Stable SHA-256 hex digest of a set of code points."""
+    payload = ','.join(f"{cp:X}" for cp in sorted(code_points))
+    return hashlib.sha256(payload.encode('ascii')).hexdigest()
+
+# =============================================================================
+# CHARACTER COLLECTION
+# =============================================================================
+
+def collect_yaml_code_points(data_file):
+    """Collect every character used in the values of r214.yml."""
+    with open(data_file, 'r', encoding='utf-8') as f:
+        radicals_data = yaml.safe_load(f) or []
+
+    code_points = set()
+    for radical_data in radicals_data:
+        for value in radical_data.values():
+            if value is not None:
+                code_points |= code_points_from_text(str(value))
+    return code_points
+
+def collect_template_code_points(project_root):
+    """Collect every character written literally in the site templates."""
+    code_points = set()
+    for pattern in TEMPLATE_PATTERNS:
+        for template in sorted(glob.glob(os.path.join(project_root, pattern))):
+            with open(template, 'r', encoding='utf-8') as f:
+                code_points |= code_points_from_text(f.read())
+    return code_points
+
+def collect_csv_code_points(csv_file):
+    """Collect every character used in ka_data.csv."""
+    code_points = set()
+    with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            for cell in row:
+                code_points |= code_points_from_text(cell)
+    return code_points
+
+def collect_code_points(paths):
+    """
+    Collect the code points rendered by the site.
+
+    Returns:
+        dict: source name -> set of code points (includes a 'total' entry)
+    """
+    sources = {
+        'r214.yml': collect_yaml_code_points(paths['data_file']),
+        'templates': collect_template_code_points(paths['project_root']),
+        'base': set(BASE_CODE_POINTS),
+    }
+
+    if os.path.exists(paths['ka_data_file']):
+        sources['ka_data.csv'] = collect_csv_code_points(paths['ka_data_file'])
+    else:
+        print(f"⚠️  ka_data.csv not found, skipping: {paths['ka_data_file']}")
+
+    sources['total'] = set().union(*sources.values())
+    return sources
+
+# =============================================================================
+# SUBSETTING
+# =============================================================================
+
+def stamped_filename(name, code_points, source_digest):
+    """Filename stamped with a hash of the character set and source font."""
+    stamp = hashlib.sha256(f"{charset_digest(code_points)}:{source_digest}".encode('ascii')).hexdigest()
+    return f"{name}-{stamp[:HASH_LENGTH]}.woff2"
+
+def subset_font(source_path, output_path, code_points):
+    """
+    Subset a single font to the given code points and save it as WOFF2.
+
+    Returns:
+        dict: glyph counts for the source and the subset
+    """
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    options.notdef_outline = True
+    options.drop_tables += ['DSIG']
+
+    font = subset.load_font(source_path, options)
+    original_glyphs = len(font.getGlyphOrder())
+
+    subsetter = subset.Subsetter(options=options)
+    subsetter.populate(unicodes=code_points)
+    subsetter.subset(font)
+
+    subset_glyphs = len(font.getGlyphOrder())
+    subset.save_font(font, output_path, options)
+    font.close()
+
+    return {'original_glyphs': original_glyphs, 'subset_glyphs': subset_glyphs}
+
+def supported_code_points(source_path, code_points):
+    """Return the requested code points that the font actually maps."""
+    with TTFont(source_path, lazy=True) as font:
+        cmap = font.getBestCmap() or {}
+    return {cp for cp in code_points if cp in cmap}
+
+def remove_stale_outputs(output_dir, name, keep_filename):
+    """Delete earlier hash-stamped subsets of the same font."""
+    for path in glob.glob(os.path.join(output_dir, f"{name}-*.woff2")):
+        if os.path.basename(path) != keep_filename:
+            os.remove(path)
+            print(f"  🧹 Removed stale subset: {os.path.basename(path)}")
+
+def load_report(report_path):
+    """Load the previous subset report if there is one."""
+    if not os.path.exists(report_path):
+        return {}
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def process_fonts(paths, output_dir, force=False):
+    """
+    Subset every configured font and write the report.
+
+    Returns:
+        dict: The report that was written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    sources = collect_code_points(paths)
+    code_points = sources['total']
+    charset = charset_digest(code_points)
+
+    print(f"🔤 Collected {len(code_points)} code points")
+    for source_name, source_points in sources.items():
+        if source_name != 'total':
+            print(f"   {source_name}: {len(source_points)}")
+    print(f"🔑 Character set hash: {charset[:HASH_LENGTH]}")
+    print("-" * 70)
+
+    report_path = os.path.join(output_dir, REPORT_FILENAME)
+    previous_fonts = load_report(report_path).get('fonts', {})
+
+    report = {
+        'generated': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'charset_hash': charset,
+        'code_points': len(code_points),
+        'fonts': {}
+    }
+
+    for name, relative_path in FONT_SOURCES:
+        source_path = os.path.join(paths['project_root'], relative_path)
+        if not os.path.exists(source_path):
+            print(f"⚠️  Font not found, skipping: {relative_path}")
+            continue
+
+        source_digest = file_digest(source_path)
+        filename = stamped_filename(name, code_points, source_digest)
+        output_path = os.path.join(output_dir, filename)
+        original_size = os.path.getsize(source_path)
+
+        previous = previous_fonts.get(name)
+        if not force and os.path.exists(output_path) and previous and previous.get('file') == filename:
+            print(f"⏭️  {name}: up to date ({filename})")
+            report['fonts'][name] = previous
+            continue
+
+        print(f"✂️  Subsetting {name}...")
+        start_time = time.time()
+        covered = supported_code_points(source_path, code_points)
+        glyphs = subset_font(source_path, output_path, covered)
+        subset_size = os.path.getsize(output_path)
+        reduction = ((original_size - subset_size) / original_size) * 100
+
+        print(f"  Covered code points: {len(covered)}/{len(code_points)}")
+        print(f"  Glyphs: {glyphs['original_glyphs']:,} → {glyphs['subset_glyphs']:,}")
+        print(f"  Size: {original_size/1024:.1f} KB → {subset_size/1024:.1f} KB ({reduction:.1f}% reduction)")
+        print(f"  ✓ Saved: {filename} ({time.time() - start_time:.1f}s)")
+
+        remove_stale_outputs(output_dir, name, filename)
+
+        report['fonts'][name] = {
+            'source': relative_path.replace(os.sep, '/'),
+            'source_sha256': source_digest,
+            'file': filename,
+            'original_size': original_size,
+            'subset_size': subset_size,
+            'reduction_percent': round(reduction, 1),
+            'covered_code_points': len(covered),
+            **glyphs
+        }
+
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    return report
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    paths = get_project_paths()
+
+    parser = argparse.ArgumentParser(
+        description='Subset web fonts to the characters used by the site and write WOFF2',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python subset_fonts.py
+    python subset_fonts.py --force
+    python subset_fonts.py -o ../../assets/fonts/subset
+        """)
+    parser.add_argument('-o', '--output', default=paths['output_dir'],
+                        help='Output directory (default: assets/fonts/subset)')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Regenerate subsets even if the character set has not changed')
+
+    args = parser.parse_args()
+
+    print("Font Subsetter")
+    print("=" * 70)
+
+    try:
+        report = process_fonts(paths, args.output, force=args.force)
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e.filename}")
+        sys.exit(1)
+
+    print("=" * 70)
+    total_original = sum(font['original_size'] for font in report['fonts'].values())
+    total_subset = sum(font['subset_size'] for font in report['fonts'].values())
+    if total_original:
+        print(f"Original total size: {total_original/1024/1024:.2f} MB")
+        print(f"Subset total size: {total_subset/1024:.1f} KB")
+        print(f"Total size reduction: {((total_original - total_subset) / total_original) * 100:.1f}%")
+    print(f"📋 Report: {os.path.join(args.output, REPORT_FILENAME)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Generation Telemetry
+====================
+
+Structured JSON-lines event stream for the radical image generators, and a
+summariser that turns one or more event files into per-model latency and
+throughput figures.
+
+Every event is one line: {"event": ..., "time": ..., "run": ..., "model": ..., "pid": ..., ...}
+
+Events written by generate_radical_images.py:
+    run_start    output_dir, device, scheduler, steps, draft
+    model_load   seconds, source (store/hub), dtype, memory_strategy
+    image        radical, status (ok/failed/linked), seconds, generate_seconds, write_seconds, attempts, steps, step_ms
+    retry        reason (dark/nan/inf/collapsed/error), attempt
+    memory       rss_gb, device_gb, available_gb
+    recycle      level, rss_before_gb, rss_after_gb
+    run_end      mode, success, total
+
+Usage:
+    python telemetry.py logs/events_*.jsonl
+    python telemetry.py logs/events_tiny-sd_1700000000.jsonl --json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+from pathlib import Path
+
+EVENTS_ENV = 'RADICAL_EVENTS'
+RUN_ENV = 'RADICAL_RUN_ID'
+
+# =============================================================================
+# EVENT LOG
+# =============================================================================
+
+class EventLog:
+    """
+    Append-only JSON-lines writer shared by threads and worker processes.
+
+    Each event is written with a single O_APPEND write, so lines from several
+    processes logging to the same file never interleave.
+    """
+
+    def __init__(self, path, **context):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.context = context
+        self.lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        record = {'event': event, 'time': round(time.time(), 3), **self.context, 'pid': os.getpid(), **fields}
+        line = (json.dumps(record, default=str) + '\n').encode('utf-8')
+        with self.lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+def read_events(paths):
+    """All events from the given files, skipping lines cut short by a crash."""
+    events = []
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError as e:
+            print(f"⚠️  Could not read {path}: {e}")
+    return events
+
+# =============================================================================
+# SUMMARY
+# =============================================================================
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def _distribution(values, digits=3):
+    if not values:
+        return None
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 0.50), digits),
+        'p95': round(percentile(values, 0.95), digits),
+        'max': round(max(values), digits)
+    }
+
+def summarize_events(events):
+    """
+    Per-model statistics: load time, image/step/write latency, retries, memory and images/hour.
+
+    Throughput is images divided by the wall span of each run (first to last event),
+    so workers sharing a run id are counted as one run.
+    """
+    by_model = {}
+    for event in events:
+        by_model.setdefault(event.get('model', 'unknown'), []).append(event)
+
+    summary = {}
+    for model, model_events in sorted(by_model.items()):
+        images = [e for e in model_events if e['event'] == 'image' and e.get('status') == 'ok']
+        runs = {}
+        for event in model_events:
+            start, end = runs.get(event.get('run'), (event['time'], event['time']))
+            runs[event.get('run')] = (min(start, event['time']), max(end, event['time']))
+        wall_hours = sum(end - start for start, end in runs.values()) / 3600
+
+        retries = {}
+        for event in model_events:
+            if event['event'] == 'retry':
+                retries[event['reason']] = retries.get(event['reason'], 0) + 1
+
+        summary[model] = {
+            'runs': len(runs),
+            'images': len(images),
+            'linked': sum(1 for e in model_events if e['event'] == 'image' and e.get('status') == 'linked'),
+            'failed': sum(1 for e in model_events if e['event'] == 'image' and e.get('status') == 'failed'),
+            'images_per_hour': round(len(images) / wall_hours, 1) if wall_hours > 0 else None,
+            'model_load_seconds': _distribution([e['seconds'] for e in model_events if e['event'] == 'model_load'], 2),
+            'image_seconds': _distribution([e['seconds'] for e in images], 2),
+            'step_ms': _distribution([ms for e in images for ms in e.get('step_ms') or []], 1),
+            'write_ms': _distribution([e['write_seconds'] * 1000 for e in images if 'write_seconds' in e], 1),
+            'retries': retries,
+            'recycles': sum(1 for e in model_events if e['event'] == 'recycle'),
+            'peak_rss_gb': max((e['rss_gb'] for e in model_events if e['event'] == 'memory'), default=None)
+        }
+    return summary
+
+def _format(distribution, unit):
+    if not distribution:
+        return '-'
+    return f"{distribution['p50']}{unit} / {distribution['p95']}{unit}"
+
+def print_summary(summary):
+    """Print one block per model with p50/p95 latencies and throughput."""
+    if not summary:
+        print("📭 No events found")
+        return
+    for model, stats in summary.items():
+        print(f"\n🎨 {model}: {stats['images']} images ({stats['failed']} failed, {stats['linked']} linked) "
+              f"in {stats['runs']} run(s)")
+        print(f"   ⚡ Images/hour:        {stats['images_per_hour'] or '-'}")
+        print(f"   📦 Model load p50/p95: {_format(stats['model_load_seconds'], 's')}")
+        print(f"   🖼️  Image p50/p95:      {_format(stats['image_seconds'], 's')}")
+        print(f"   👣 Step p50/p95:       {_format(stats['step_ms'], 'ms')}")
+        print(f"   💾 Write p50/p95:      {_format(stats['write_ms'], 'ms')}")
+        if stats['retries']:
+            print(f"   🔄 Retries:            {stats['retries']}")
+        if stats['recycles']:
+            print(f"   ♻️  Recycles:           {stats['recycles']}")
+        if stats['peak_rss_gb'] is not None:
+            print(f"   🧠 Peak RSS:           {stats['peak_rss_gb']:.2f}GB")
+
+# =============================================================================
+# MAIN FUNCTION
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Summarise generation event logs (p50/p95 latencies and images/hour per model)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+    python telemetry.py logs/events_*.jsonl
+    python telemetry.py ../../multi_style_results/*_events.jsonl --json
+        """)
+    parser.add_argument('files', nargs='+', help='Event files (JSON lines)')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    args = parser.parse_args()
+    summary = summarize_events(read_events(args.files))
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print("Generation Telemetry")
+        print("=" * 70)
+        print_summary(summary)
+
+    if not summary:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()